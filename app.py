@@ -1,6 +1,8 @@
 
 import os
 import json
+import hashlib
+from collections.abc import Mapping
 from datetime import date, timedelta
 import requests
 import pandas as pd
@@ -8,10 +10,16 @@ import streamlit as st
 from dotenv import load_dotenv
 import plotly.graph_objects as go
 
+from backend.api.result_store import freeze, share
+from backend.utils.helpers import auto_refresh_fragment, frame_fingerprint, reuse_if_unchanged
+from backend.utils.instrumentation import Lazy, get_logger, redact_params
+
 load_dotenv()
 
-# -------- Configuração de Auto-Refresh --------
-# Configurar auto-refresh a cada 5 minutos (300 segundos)
+logger = get_logger(__name__)
+
+# -------- Configuração da Página --------
+# A atualização automática é feita por fragmento na seção de dados (ver auto_refresh_fragment)
 st.set_page_config(
     page_title="Dashboard Funil - HOUSE",
     page_icon="🏠",
@@ -24,14 +32,6 @@ st.set_page_config(
     }
 )
 
-# Adicionar meta tag para auto-refresh
-st.markdown(
-    """
-    <meta http-equiv="refresh" content="300">
-    """,
-    unsafe_allow_html=True
-)
-
 # Desabilitar menu e botão de deploy
 st.markdown(
     """
@@ -240,9 +240,10 @@ def fetch_team_pipelines(base_url: str, token: str):
     except Exception as e:
         return None
 
-@st.cache_data(ttl=30)
+# Recurso compartilhado entre as sessões (uma cópia por processo), congelado para ninguém alterá-lo
+@st.cache_resource(ttl=30)
 def fetch_house_funnel_data(base_url: str, token: str, start_date: str, end_date: str):
-    """Busca dados específicos do Funil - HOUSE"""
+    """Busca dados específicos do Funil - HOUSE (payload somente leitura)"""
     try:
         # Buscar deals do funil específico
         url = f"{base_url.rstrip('/')}/api/v1/deals"
@@ -256,23 +257,25 @@ def fetch_house_funnel_data(base_url: str, token: str, start_date: str, end_date
             "deal_pipeline_id": "689b59706e704a0024fc2374"  # ID do Funil - HOUSE
         }
         
-        print(f"DEBUG: Buscando deals do HOUSE em: {url}")
-        print(f"DEBUG: Params: {params}")
+        logger.debug("Buscando deals do HOUSE em: %s", url)
+        logger.debug("Params: %s", Lazy(lambda: redact_params(params)))
         
         response = requests.get(url, headers=headers, params=params, timeout=30)
         
-        print(f"DEBUG: Status Code: {response.status_code}")
+        logger.debug("Status Code: %s", response.status_code)
         
         if response.status_code == 200:
             data = response.json()
-            print(f"DEBUG: Deals do HOUSE encontrados: {len(data.get('deals', []))}")
-            return data
+            # Versão do conteúdo, usada como chave pelo processamento e pelo gráfico
+            data["fingerprint"] = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+            logger.debug("Deals do HOUSE encontrados: %s", len(data.get('deals', [])))
+            return freeze(data)
         else:
-            print(f"DEBUG: Erro na requisição de deals - Status: {response.status_code}")
+            logger.warning("Erro na requisição de deals - Status: %s", response.status_code)
             return None
             
     except Exception as e:
-        print(f"DEBUG: Exception: {str(e)}")
+        logger.warning("Exception: %s", e)
         return None
 
 @st.cache_data(ttl=300)
@@ -287,40 +290,39 @@ def fetch_house_funnel_stages(base_url: str, token: str):
             "deal_pipeline_id": "689b59706e704a0024fc2374"  # ID do Funil - HOUSE
         }
         
-        print(f"DEBUG: Buscando etapas do HOUSE em: {url}")
-        print(f"DEBUG: Headers: {headers}")
-        print(f"DEBUG: Params: {params}")
+        logger.debug("Buscando etapas do HOUSE em: %s", url)
+        logger.debug("Params: %s", Lazy(lambda: redact_params(params)))
         
         response = requests.get(url, headers=headers, params=params, timeout=30)
         
-        print(f"DEBUG: Status Code: {response.status_code}")
-        print(f"DEBUG: Response Text (primeiros 200 chars): {response.text[:200]}")
+        logger.debug("Status Code: %s", response.status_code)
+        logger.debug("Response Text (primeiros 200 chars): %s", Lazy(lambda: response.text[:200]))
         
         if response.status_code == 200:
             data = response.json()
-            print(f"DEBUG: Data keys: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
+            logger.debug("Data keys: %s", Lazy(lambda: list(data.keys()) if isinstance(data, dict) else 'Not a dict'))
             
             if "deal_stages" in data:
                 stages = data["deal_stages"]
-                print(f"DEBUG: Total de etapas do HOUSE encontradas: {len(stages)}")
+                logger.debug("Total de etapas do HOUSE encontradas: %s", len(stages))
                 
                 # Verificar se as etapas são realmente do HOUSE
                 for i, stage in enumerate(stages):
                     pipeline_info = stage.get("deal_pipeline", {})
                     pipeline_id = pipeline_info.get("id")
                     pipeline_name = pipeline_info.get("name", "N/A")
-                    print(f"DEBUG: Etapa {i+1}: {stage.get('name', 'N/A')} - Pipeline: {pipeline_name} (ID: {pipeline_id})")
+                    logger.debug("Etapa %s: %s - Pipeline: %s (ID: %s)", i+1, stage.get('name', 'N/A'), pipeline_name, pipeline_id)
                 
                 return stages
             else:
-                print(f"DEBUG: 'deal_stages' não encontrado nos dados")
+                logger.debug("'deal_stages' não encontrado nos dados")
                 return data
         else:
-            print(f"DEBUG: Erro na requisição - Status: {response.status_code}")
+            logger.warning("Erro na requisição - Status: %s", response.status_code)
             return None
             
     except Exception as e:
-        print(f"DEBUG: Exception: {str(e)}")
+        logger.warning("Exception: %s", e)
         return None
 
 
@@ -340,30 +342,36 @@ def fetch_all_funnel_data(base_url: str, token: str, start_date: str, end_date:
             "limit": 200  # Aumentar limite para pegar mais dados
         }
         
-        print(f"DEBUG: Buscando todos os deals em: {url}")
-        print(f"DEBUG: Params: {params}")
+        logger.debug("Buscando todos os deals em: %s", url)
+        logger.debug("Params: %s", Lazy(lambda: redact_params(params)))
         
         response = requests.get(url, headers=headers, params=params, timeout=30)
         
-        print(f"DEBUG: Status Code: {response.status_code}")
+        logger.debug("Status Code: %s", response.status_code)
         
         if response.status_code == 200:
             data = response.json()
-            print(f"DEBUG: Total de deals encontrados: {len(data.get('deals', []))}")
+            logger.debug("Total de deals encontrados: %s", len(data.get('deals', [])))
             return data
         else:
-            print(f"DEBUG: Erro na requisição - Status: {response.status_code}")
+            logger.warning("Erro na requisição - Status: %s", response.status_code)
             return None
             
     except Exception as e:
-        print(f"DEBUG: Exception: {str(e)}")
+        logger.warning("Exception: %s", e)
         return None
 
 
 
-@st.cache_data(ttl=300)
-def process_comparative_funnel_data(deals_data):
-    """Processa dados para criar gráfico comparativo por usuário"""
+@st.cache_resource(ttl=300)
+def process_comparative_funnel_data(_deals_data, fingerprint):
+    """Processa dados para criar gráfico comparativo por usuário
+    
+    O payload (`_deals_data`) fica fora da chave do cache; a chave é só a
+    versão carimbada em fetch_house_funnel_data. O DataFrame é um só para
+    todas as sessões, com as colunas somente leitura (use via share()).
+    """
+    deals_data = _deals_data
     try:
         if not deals_data or "deals" not in deals_data:
             return None
@@ -384,7 +392,8 @@ def process_comparative_funnel_data(deals_data):
         for deal in deals:
             if "user" in deal and deal["user"]:
                 user_info = deal["user"]
-                if isinstance(user_info, dict) and "name" in user_info:
+                # O payload vem congelado (MappingProxyType), não como dict
+                if isinstance(user_info, Mapping) and "name" in user_info:
                     user_name = user_info["name"]
                     
                     # Verificar se é um dos usuários de interesse
@@ -437,10 +446,10 @@ def process_comparative_funnel_data(deals_data):
                     "Quantidade": count
                 })
         
-        return pd.DataFrame(chart_data)
+        return freeze(pd.DataFrame(chart_data))
         
     except Exception as e:
-        print(f"DEBUG: Exception em process_comparative_funnel_data: {str(e)}")
+        logger.warning("Exception em process_comparative_funnel_data: %s", e)
         return None
 
 # -------- Indicador de Última Atualização --------
@@ -450,6 +459,11 @@ def show_last_update():
     now = datetime.now()
     st.caption(f"🕐 Última atualização: {now.strftime('%d/%m/%Y %H:%M:%S')}")
 
+def analysis_period():
+    """Período analisado (últimos 30 dias até hoje), recalculado a cada execução"""
+    today = date.today()
+    return today - timedelta(days=30), today
+
 # -------- Header --------
 # -------- Configurações --------
 # Configuração da API
@@ -457,10 +471,7 @@ base_url = os.getenv("API_BASE_URL", "https://crm.rdstation.com")
 token = os.getenv("API_TOKEN", "681cb285978e2f00145fb15d")
 
 # Período de análise
-today = date.today()
-start_default = today - timedelta(days=30)
-d_start = start_default
-d_end = today
+d_start, d_end = analysis_period()
 
 # Filtros
 team_filter = "Todos"
@@ -478,7 +489,8 @@ else:
 col1, col2, col3 = st.columns([1, 2, 1])
 with col2:
     if st.button("🔄 Atualizar Dados", help="Força uma atualização imediata dos dados"):
-        st.cache_data.clear()
+        # Descarta só os deals do HOUSE do período exibido; etapas, funis e equipes continuam em cache
+        fetch_house_funnel_data.clear(base_url, token, d_start.strftime("%Y-%m-%d"), d_end.strftime("%Y-%m-%d"))
         st.rerun()
 
 # -------- Tabs --------
@@ -724,7 +736,9 @@ with tab1:
 
 
 # -------- Aba 2: Comparativo por Usuário --------
-with tab2:
+@auto_refresh_fragment()
+def render_comparative_section():
+    """Seção de dados do comparativo (reexecutada sozinha a cada AUTO_REFRESH_SECONDS)"""
     if token and base_url:
         # Mostrar última atualização
         show_last_update()
@@ -732,16 +746,18 @@ with tab2:
         st.header("👥 Comparativo por Usuário - Funil HOUSE")
         st.caption("Análise comparativa de negócios entre usuários do Funil - HOUSE")
         
-        # Converter datas para string
-        start_date = d_start.strftime("%Y-%m-%d")
-        end_date = d_end.strftime("%Y-%m-%d")
+        # Período recalculado a cada execução do fragmento (não o da última execução da página)
+        period_start, period_end = analysis_period()
+        start_date = period_start.strftime("%Y-%m-%d")
+        end_date = period_end.strftime("%Y-%m-%d")
         
         # Buscar dados comparativos - APENAS do Funil HOUSE
         comparative_data = fetch_house_funnel_data(base_url, token, start_date, end_date)
         
         if comparative_data:
             # Processar dados para o gráfico comparativo
-            comparative_df = process_comparative_funnel_data(comparative_data)
+            fingerprint = comparative_data.get("fingerprint")
+            comparative_df = share(process_comparative_funnel_data(comparative_data, fingerprint))
             
             if comparative_df is not None and not comparative_df.empty:
                 # Criar gráfico de barras empilhadas
@@ -755,35 +771,42 @@ with tab2:
                     "David Cauã Ferreira de Sene": "lightorange",
                 }
                 
-                fig = go.Figure()
+                # Gráfico principal (reaproveitado enquanto os agregados não mudam)
+                def build_comparative_figure():
+                    fig = go.Figure()
                 
-                for user in comparative_df["Usuário"].unique():
-                    user_data = comparative_df[comparative_df["Usuário"] == user]
-                    fig.add_trace(go.Bar(
-                        x=user_data["Etapa"],
-                        y=user_data["Quantidade"],
-                        text=user_data["Quantidade"],  # Mostrar valores em cima das barras
-                        textposition='auto',  # Posicionamento automático
-                        name=user,
-                        marker_color=colors.get(user, "gray") # Cor padrão se não encontrada
-                    ))
+                    for user in comparative_df["Usuário"].unique():
+                        user_data = comparative_df[comparative_df["Usuário"] == user]
+                        fig.add_trace(go.Bar(
+                            x=user_data["Etapa"],
+                            y=user_data["Quantidade"],
+                            text=user_data["Quantidade"],  # Mostrar valores em cima das barras
+                            textposition='auto',  # Posicionamento automático
+                            name=user,
+                            marker_color=colors.get(user, "gray") # Cor padrão se não encontrada
+                        ))
                 
-                fig.update_layout(
-                    title="Quantidade de Negócios por Etapa por Usuário",
-                    xaxis_title="Etapas",
-                    yaxis_title="Quantidade",
-                    barmode='group', # Barras lado a lado
-                    height=500,
-                    plot_bgcolor='white',
-                    paper_bgcolor='white',
-                    font=dict(size=12),
-                    legend=dict(
-                        orientation="h",
-                        yanchor="bottom",
-                        y=1.02,
-                        xanchor="right",
-                        x=1
+                    fig.update_layout(
+                        title="Quantidade de Negócios por Etapa por Usuário",
+                        xaxis_title="Etapas",
+                        yaxis_title="Quantidade",
+                        barmode='group', # Barras lado a lado
+                        height=500,
+                        plot_bgcolor='white',
+                        paper_bgcolor='white',
+                        font=dict(size=12),
+                        legend=dict(
+                            orientation="h",
+                            yanchor="bottom",
+                            y=1.02,
+                            xanchor="right",
+                            x=1
+                        )
                     )
+                    return fig
+
+                fig = reuse_if_unchanged(
+                    "comparative_chart", fingerprint or frame_fingerprint(comparative_df), build_comparative_figure
                 )
                 st.plotly_chart(fig, use_container_width=True)
                 
@@ -848,6 +871,10 @@ with tab2:
 
 
 
+with tab2:
+    render_comparative_section()
+
+
 # -------- Informações --------
 with st.expander("ℹ️ Sobre o Dashboard"):
     st.write("""
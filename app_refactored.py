@@ -6,13 +6,14 @@ import os
 import streamlit as st
 from dotenv import load_dotenv
 
+from backend.api.deadline import request_deadline
 from frontend.pages.dashboard import render_dashboard_page
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
-# -------- Configuração de Auto-Refresh --------
-# Configurar auto-refresh a cada 5 minutos (300 segundos)
+# -------- Configuração da Página --------
+# A atualização automática é feita por fragmento na seção de dados (ver auto_refresh_fragment)
 st.set_page_config(
     page_title="Dashboard Funil - HOUSE",
     page_icon="🏠",
@@ -25,14 +26,6 @@ st.set_page_config(
     }
 )
 
-# Adicionar meta tag para auto-refresh
-st.markdown(
-    """
-    <meta http-equiv="refresh" content="300">
-    """,
-    unsafe_allow_html=True
-)
-
 # Desabilitar menu e botão de deploy
 st.markdown(
     """
@@ -57,8 +50,9 @@ token = os.getenv("API_TOKEN", "681cb285978e2f00145fb15d")
 def main():
     """Função principal da aplicação"""
     try:
-        # Renderizar página principal do dashboard
-        render_dashboard_page()
+        # Renderizar página principal do dashboard (chamadas ao CRM limitadas ao orçamento da execução)
+        with request_deadline():
+            render_dashboard_page()
         
         # (Removido) seção Sobre o Dashboard
         
@@ -0,0 +1,85 @@
+"""
+Negociação do esquema de autenticação por família de endpoints da API
+"""
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+# Esquemas aceitos pela API: token na query (?token=) ou header Authorization: Bearer
+AUTH_SCHEMES = ("query", "bearer")
+
+# Esquema tentado primeiro enquanto uma família ainda não foi negociada
+DEFAULT_AUTH_SCHEME = os.getenv("RD_AUTH_SCHEME", "query")
+
+# Respostas que indicam esquema recusado (as demais confirmam o esquema usado)
+AUTH_FAILURE_CODES = {401, 403}
+
+
+def endpoint_family(url: str) -> str:
+    """Família de um endpoint: o recurso logo após a versão (ex.: /api/v1/deal_stages/123 -> deal_stages)"""
+    parts = [part for part in urlsplit(url).path.split("/") if part]
+    if len(parts) >= 3 and parts[0] == "api":
+        return parts[2]
+    return "/".join(parts[:1])
+
+
+def apply_scheme(scheme: str, token: str, params: Optional[Dict],
+                 headers: Dict) -> Tuple[Dict, Dict]:
+    """(params, headers) da requisição autenticados só pelo esquema indicado"""
+    params = {k: v for k, v in (params or {}).items() if k != "token"}
+    headers = {k: v for k, v in headers.items() if k.lower() != "authorization"}
+    if scheme == "bearer":
+        headers["Authorization"] = f"Bearer {token}"
+    else:
+        params["token"] = token
+    return params, headers
+
+
+class AuthNegotiator:
+    """Esquema de autenticação que funcionou por (base_url, família de endpoints)
+
+    A primeira chamada de uma família tenta o esquema padrão e, se ele for
+    recusado (401/403), o outro; o que funcionar fica registrado e passa a
+    ser o único tentado nas chamadas seguintes. Se um esquema registrado
+    deixar de funcionar, o outro é tentado e assume o lugar dele.
+    """
+
+    def __init__(self, default: str = DEFAULT_AUTH_SCHEME):
+        self.default = default if default in AUTH_SCHEMES else AUTH_SCHEMES[0]
+        self._schemes: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+        self.negotiations = 0
+
+    def candidates(self, base_url: str, family: str) -> List[str]:
+        """Esquemas na ordem em que devem ser tentados (o registrado, se houver, primeiro)"""
+        with self._lock:
+            first = self._schemes.get((base_url, family), self.default)
+        return [first] + [scheme for scheme in AUTH_SCHEMES if scheme != first]
+
+    def remember(self, base_url: str, family: str, scheme: str):
+        """Registra o esquema aceito por uma família (chamar só depois de uma resposta 2xx)"""
+        with self._lock:
+            if self._schemes.get((base_url, family)) != scheme:
+                self._schemes[(base_url, family)] = scheme
+                self.negotiations += 1
+
+    def known(self, base_url: str) -> Dict[str, str]:
+        """Esquemas já negociados para uma base_url, por família"""
+        with self._lock:
+            return {family: scheme for (url, family), scheme in self._schemes.items() if url == base_url}
+
+
+_negotiator: Optional[AuthNegotiator] = None
+_negotiator_lock = threading.Lock()
+
+
+def get_auth_negotiator() -> AuthNegotiator:
+    """Negociação compartilhada por todos os clientes do processo"""
+    global _negotiator
+    if _negotiator is None:
+        with _negotiator_lock:
+            if _negotiator is None:
+                _negotiator = AuthNegotiator()
+    return _negotiator
@@ -0,0 +1,164 @@
+"""
+Circuit breaker por família de endpoints da API do RD Station CRM
+"""
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+import requests
+
+
+# Falhas seguidas (timeouts, erros de conexão ou 5xx) que abrem o circuito
+BREAKER_FAILURES = int(os.getenv("RD_BREAKER_FAILURES", "3"))
+
+# Segundos com o circuito aberto antes de deixar passar uma requisição de teste
+BREAKER_COOLDOWN = float(os.getenv("RD_BREAKER_COOLDOWN", "30"))
+
+
+# Famílias de endpoints chamadas pela carga em andamento (ver track_families)
+_families: contextvars.ContextVar[Optional[Set[str]]] = contextvars.ContextVar("rd_loaded_families", default=None)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Requisição recusada na hora porque o circuito do endpoint está aberto"""
+
+
+class CircuitBreaker:
+    """Estado de disponibilidade de um endpoint (fechado, aberto ou meio-aberto)
+
+    Fechado, tudo passa. Depois de `failure_threshold` falhas seguidas o
+    circuito abre e as requisições falham na hora, sem esperar timeouts.
+    Passado o `cooldown`, uma única requisição de teste é liberada
+    (meio-aberto): se ela funcionar o circuito fecha, se falhar volta a
+    abrir por mais um `cooldown`. `opened_at` guarda o início da
+    indisponibilidade até o circuito fechar de novo.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_failure_at = 0.0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Indica se uma requisição pode ser enviada agora (no meio-aberto, só a de teste)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.time() >= self._retry_at:
+                self.state = self.HALF_OPEN
+                return True
+            self.rejected += 1
+            self.last_failure_at = time.time()
+            return False
+
+    def record_success(self):
+        """O endpoint respondeu: fecha o circuito"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        """Timeout, erro de conexão ou 5xx: abre o circuito no limite (ou se o teste falhou)"""
+        with self._lock:
+            now = time.time()
+            self.failures += 1
+            self.last_failure_at = now
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.opened_at or now
+                self._retry_at = now + self.cooldown
+
+    def release(self):
+        """Tentativa sem resultado conclusivo: no meio-aberto, a próxima requisição pode ser o teste"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self._retry_at = time.time()
+
+    def resolve(self, outcome: Optional[bool]):
+        """Registra o fim de uma tentativa liberada por `allow` (True = sucesso, False = falha, None = inconclusiva)"""
+        if outcome is None:
+            self.release()
+        elif outcome:
+            self.record_success()
+        else:
+            self.record_failure()
+
+    @property
+    def is_closed(self) -> bool:
+        return self.state == self.CLOSED
+
+    def failing_since(self, started: float) -> bool:
+        """Indica se o circuito não está fechado e falhou ou recusou requisições a partir de `started`"""
+        with self._lock:
+            return self.state != self.CLOSED and self.last_failure_at >= started
+
+    def status(self) -> Dict[str, Any]:
+        """Estado atual (para diagnóstico)"""
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "opened_at": self.opened_at,
+                "rejected": self.rejected,
+            }
+
+
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(base_url: str, family: str) -> CircuitBreaker:
+    """Circuito compartilhado por todos os clientes de um (base_url, família de endpoints)"""
+    key = (base_url.rstrip("/"), family)
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker()
+            _breakers[key] = breaker
+        return breaker
+
+
+def circuit_breakers(base_url: str) -> Dict[str, CircuitBreaker]:
+    """Circuitos já criados para uma base_url, por família"""
+    base_url = base_url.rstrip("/")
+    with _breakers_lock:
+        return {family: breaker for (url, family), breaker in _breakers.items() if url == base_url}
+
+
+@contextmanager
+def track_families() -> Iterator[Set[str]]:
+    """Coleta as famílias de endpoints chamadas dentro do bloco (inclusive em threads com in_context)
+
+    Blocos aninhados também repassam as famílias ao bloco de fora.
+    """
+    outer = _families.get()
+    families: Set[str] = set()
+    token = _families.set(families)
+    try:
+        yield families
+    finally:
+        _families.reset(token)
+        if outer is not None:
+            outer.update(families)
+
+
+def note_family(family: str):
+    """Registra uma chamada à família na carga em andamento (se houver uma)"""
+    families = _families.get()
+    if families is not None:
+        families.add(family)
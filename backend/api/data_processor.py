@@ -1,22 +1,65 @@
 """
 Processador de dados para análise de funis de vendas
 """
+import numpy as np
 import pandas as pd
-import streamlit as st
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Union
+
+from backend.api.result_store import shared_result
+from backend.models.data_models import DEFAULT_STAGE_ORDER, DealBatch
+from backend.utils.instrumentation import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# Funil por rating: etapa de cada rating (demais valores = "Em Andamento") e ordem de exibição
+RATING_STAGES = {1: "Leads", 2: "MQL", 3: "SQL", 4: "Proposta", 5: "Negociação"}
+RATING_STAGE_ORDER = ["Leads", "MQL", "SQL", "Proposta", "Negociação", "Em Andamento"]
+
+
+def _stage_columns(stages: pd.Series) -> List[str]:
+    """Etapas padrão do Funil - HOUSE seguidas das etapas extras presentes em `stages`"""
+    present = set(stages.unique())
+    return [
+        stage for stage in stages.cat.categories
+        if stage in DEFAULT_STAGE_ORDER or stage in present
+    ]
+
+
+def _count_by_stage(frame: pd.DataFrame, group_column: str, groups: List[str],
+                    label: str) -> pd.DataFrame:
+    """Contagem de deals por grupo e etapa, em formato longo e com zeros explícitos
+
+    Grupos e etapas seguem as ordens recebidas (grupos de `groups`, etapas de
+    `_stage_columns`), como na construção linha a linha.
+    """
+    stages = _stage_columns(frame["stage"])
+    counts = (
+        frame.groupby([group_column, "stage"], observed=True).size()
+        .unstack(fill_value=0)
+        .reindex(index=pd.Index(groups, dtype=object), columns=stages, fill_value=0)
+    )
+
+    return pd.DataFrame({
+        label: np.repeat(np.array(groups, dtype=object), len(stages)),
+        "Etapa": np.tile(np.array(stages, dtype=object), len(groups)),
+        "Quantidade": counts.to_numpy(dtype=np.int64).ravel()
+    })
 
 
 class DataProcessor:
     """Processador de dados para análise de funis de vendas"""
     
-    @st.cache_data(ttl=300)
-    def process_deals_data(_self, deals_data: Dict, selected_team: str = "Todos") -> Optional[pd.DataFrame]:
+    @shared_result("deals_funnel")
+    def process_deals_data(_self, deals_data: Union[DealBatch, Dict], selected_team: str = "Todos") -> Optional[pd.DataFrame]:
         """Processa dados de negócios em formato de funil"""
         try:
-            if not deals_data or "deals" not in deals_data:
+            batch = DealBatch.from_payload(deals_data)
+            if batch is None:
                 return None
             
-            deals = deals_data["deals"]
+            frame = batch.to_frame()
             
             # Mapeamento de usuários para times
             team_mapping = {
@@ -26,148 +69,60 @@ class DataProcessor:
             
             # Filtrar negócios por time se selecionado
             if selected_team != "Todos" and selected_team in team_mapping:
-                team_users = team_mapping[selected_team]
-                filtered_deals = []
-                
-                for deal in deals:
-                    if "user" in deal and deal["user"]:
-                        user_info = deal["user"]
-                        if isinstance(user_info, dict) and "name" in user_info:
-                            user_name = user_info["name"]
-                            # Comparação mais robusta (ignora espaços extras)
-                            if any(user_name.strip() == team_user.strip() for team_user in team_users):
-                                filtered_deals.append(deal)
-                
-                deals = filtered_deals
+                # Comparação mais robusta (ignora espaços extras)
+                team_users = {team_user.strip() for team_user in team_mapping[selected_team]}
+                frame = frame[frame["user"].isin(team_users)]
             
             # Criar dados de funil baseados no rating
-            stage_counts = {}
-            for deal in deals:
-                rating = deal.get("rating", 0)
-                if rating == 1:
-                    stage = "Leads"
-                elif rating == 2:
-                    stage = "MQL"
-                elif rating == 3:
-                    stage = "SQL"
-                elif rating == 4:
-                    stage = "Proposta"
-                elif rating == 5:
-                    stage = "Negociação"
-                else:
-                    stage = "Em Andamento"
-                
-                if stage not in stage_counts:
-                    stage_counts[stage] = 0
-                stage_counts[stage] += 1
+            stage_counts = frame["rating"].map(RATING_STAGES).fillna("Em Andamento").value_counts()
+            present = [stage for stage in RATING_STAGE_ORDER if stage in stage_counts.index]
             
-            # Criar DataFrame para o gráfico
-            funnel_data = []
-            stage_order = ["Leads", "MQL", "SQL", "Proposta", "Negociação", "Em Andamento"]
+            if not present:
+                return pd.DataFrame()
             
-            for stage in stage_order:
-                if stage in stage_counts:
-                    funnel_data.append({
-                        "stage": stage,
-                        "count": stage_counts[stage]
-                    })
-            
-            return pd.DataFrame(funnel_data)
+            return pd.DataFrame({
+                "stage": present,
+                "count": stage_counts.reindex(present).to_numpy(dtype=np.int64)
+            })
             
         except Exception as e:
             return None
 
-    @st.cache_data(ttl=300)
-    def process_comparative_funnel_data(_self, deals_data: Dict, target_users: List[str] = None) -> Optional[pd.DataFrame]:
+    @shared_result("comparative_funnel")
+    def process_comparative_funnel_data(_self, deals_data: Union[DealBatch, Dict], target_users: List[str] = None) -> Optional[pd.DataFrame]:
         """Processa dados para criar gráfico comparativo por usuário"""
         try:
-            if not deals_data or "deals" not in deals_data:
+            deals = DealBatch.from_payload(deals_data)
+            if deals is None:
                 return None
             
-            deals = deals_data["deals"]
-            
             # Se não foram especificados usuários, usar todos os disponíveis
             if target_users is None:
                 target_users = _self.get_all_users_from_deals(deals)
             
-            # Estrutura para armazenar dados por usuário e etapa
-            user_stage_data = {}
-            
-            # Inicializar contadores para cada usuário
-            for user in target_users:
-                user_stage_data[user] = {}
-            
-            # Processar cada deal
-            for deal in deals:
-                if "user" in deal and deal["user"]:
-                    user_info = deal["user"]
-                    if isinstance(user_info, dict) and "name" in user_info:
-                        user_name = user_info["name"].strip()
-                        
-                        # Verificar se é um dos usuários de interesse
-                        if user_name in target_users:
-                            # Obter etapa do deal
-                            deal_stage = deal.get("deal_stage", {})
-                            stage_name = deal_stage.get("name", "Sem Etapa")
-                            
-                            # Inicializar contador se não existir
-                            if stage_name not in user_stage_data[user_name]:
-                                user_stage_data[user_name][stage_name] = 0
-                            
-                            # Incrementar contador
-                            user_stage_data[user_name][stage_name] += 1
+            if not target_users:
+                return pd.DataFrame()
             
-            # Criar dados para o gráfico
-            chart_data = []
+            # Apenas deals dos usuários de interesse
+            frame = deals.to_frame()
+            frame = frame[frame["user"].isin(target_users)]
             
-            # Coletar todas as etapas únicas
-            all_stages = set()
-            for user_data in user_stage_data.values():
-                all_stages.update(user_data.keys())
-            
-            # Definir todas as etapas do Funil - HOUSE na ordem correta
-            stage_order = [
-                "LEADs", "LIGAÇÃO 1", "MENSAGEM", "LIGAÇÃO 2", "FOLLOW UP", 
-                "AGENDAMENTO", "ATENDIMENTO REALIZADO", "NEGOCIAÇÃO", "FECHAMENTO", "PERDIDA"
-            ]
-            
-            # Remover duplicatas e garantir que apenas etapas únicas sejam incluídas
-            final_stage_order = []
-            for stage in stage_order:
-                if stage not in final_stage_order:
-                    final_stage_order.append(stage)
-            
-            # Adicionar etapas que não estão na ordem padrão (se houver)
-            for stage in all_stages:
-                if stage not in final_stage_order:
-                    final_stage_order.append(stage)
-            
-            stage_order = final_stage_order
-            
-            # Criar dados para cada usuário e etapa
-            for user in target_users:
-                for stage in stage_order:
-                    count = user_stage_data[user].get(stage, 0)
-                    chart_data.append({
-                        "Usuário": user,
-                        "Etapa": stage,
-                        "Quantidade": count
-                    })
-            
-            return pd.DataFrame(chart_data)
+            return _count_by_stage(frame, "user", target_users, "Usuário")
             
         except Exception as e:
-            print(f"DEBUG: Exception em process_comparative_funnel_data: {str(e)}")
+            logger.warning("Exception em process_comparative_funnel_data: %s", e)
             return None
 
-    @st.cache_data(ttl=300)
-    def process_team_comparative_data(_self, deals_data: Dict, teams_data: Dict) -> Optional[pd.DataFrame]:
+    @shared_result("team_comparative")
+    def process_team_comparative_data(_self, deals_data: Union[DealBatch, Dict], teams_data: Dict) -> Optional[pd.DataFrame]:
         """Processa dados para criar gráfico comparativo por equipe"""
         try:
-            if not deals_data or "deals" not in deals_data:
+            deals = DealBatch.from_payload(deals_data)
+            if deals is None:
                 return None
             
-            deals = deals_data["deals"]
+            if not teams_data:
+                return pd.DataFrame()
             
             # Criar mapeamento de usuário para equipe
             user_to_team = {}
@@ -175,80 +130,21 @@ class DataProcessor:
                 for user in team_info.get("users", []):
                     user_to_team[user] = team_name
             
-            # Estrutura para armazenar dados por equipe e etapa
-            team_stage_data = {}
-            
-            # Inicializar contadores para cada equipe
-            for team_name in teams_data.keys():
-                team_stage_data[team_name] = {}
-            
-            # Processar cada deal
-            for deal in deals:
-                if "user" in deal and deal["user"]:
-                    user_info = deal["user"]
-                    if isinstance(user_info, dict) and "name" in user_info:
-                        user_name = user_info["name"].strip()
-                        
-                        # Verificar se o usuário pertence a uma equipe
-                        if user_name in user_to_team:
-                            team_name = user_to_team[user_name]
-                            
-                            # Obter etapa do deal
-                            deal_stage = deal.get("deal_stage", {})
-                            stage_name = deal_stage.get("name", "Sem Etapa")
-                            
-                            # Inicializar contador se não existir
-                            if stage_name not in team_stage_data[team_name]:
-                                team_stage_data[team_name][stage_name] = 0
-                            
-                            # Incrementar contador
-                            team_stage_data[team_name][stage_name] += 1
+            frame = deals.to_frame()
+            frame = frame[frame["user"].isin(list(user_to_team))]
+            frame = frame.assign(team=frame["user"].astype(object).map(user_to_team))
             
-            # Criar dados para o gráfico
-            chart_data = []
-            
-            # Coletar todas as etapas únicas
-            all_stages = set()
-            for team_data in team_stage_data.values():
-                all_stages.update(team_data.keys())
-            
-            # Definir todas as etapas do Funil - HOUSE na ordem correta
-            stage_order = [
-                "LEADs", "LIGAÇÃO 1", "MENSAGEM", "LIGAÇÃO 2", "FOLLOW UP", 
-                "AGENDAMENTO", "ATENDIMENTO REALIZADO", "NEGOCIAÇÃO", "FECHAMENTO", "PERDIDA"
-            ]
-            
-            # Remover duplicatas e garantir que apenas etapas únicas sejam incluídas
-            final_stage_order = []
-            for stage in stage_order:
-                if stage not in final_stage_order:
-                    final_stage_order.append(stage)
-            
-            # Adicionar etapas que não estão na ordem padrão (se houver)
-            for stage in all_stages:
-                if stage not in final_stage_order:
-                    final_stage_order.append(stage)
-            
-            stage_order = final_stage_order
-            
-            # Criar dados para cada equipe e etapa
-            for team_name in teams_data.keys():
-                for stage in stage_order:
-                    count = team_stage_data[team_name].get(stage, 0)
-                    chart_data.append({
-                        "Equipe": team_name,
-                        "Etapa": stage,
-                        "Quantidade": count
-                    })
-            
-            return pd.DataFrame(chart_data)
+            return _count_by_stage(frame, "team", list(teams_data.keys()), "Equipe")
             
         except Exception as e:
-            print(f"DEBUG: Exception em process_team_comparative_data: {str(e)}")
+            logger.warning("Exception em process_team_comparative_data: %s", e)
             return None
 
-    def get_all_users_from_deals(self, deals: List[Dict]) -> List[str]:
+    def get_all_users_from_deals(self, deals: Union[DealBatch, List[Dict]]) -> List[str]:
         """Extrai todos os usuários únicos dos deals"""
+        if isinstance(deals, DealBatch):
+            return deals.user_names()
+        
         users = set()
         
         for deal in deals:
@@ -293,10 +189,7 @@ class DataProcessor:
 
     def get_stage_order(self) -> List[str]:
         """Retorna a ordem padrão das etapas do Funil - HOUSE"""
-        return [
-            "LEADs", "LIGAÇÃO 1", "MENSAGEM", "LIGAÇÃO 2", "FOLLOW UP", 
-            "AGENDAMENTO", "ATENDIMENTO REALIZADO", "NEGOCIAÇÃO", "FECHAMENTO", "PERDIDA"
-        ]
+        return list(DEFAULT_STAGE_ORDER)
 
     def get_team_mapping(self) -> Dict[str, List[str]]:
         """Retorna o mapeamento de times para usuários"""
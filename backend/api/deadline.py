@@ -0,0 +1,77 @@
+"""
+Prazo (orçamento de tempo) de uma execução da página, propagado pelas chamadas ao CRM
+"""
+import contextvars
+import functools
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+import requests
+
+
+# Orçamento (segundos) de cada execução do script ou fragmento do dashboard; 0 desliga
+PAGE_BUDGET_SECONDS = float(os.getenv("RD_PAGE_BUDGET_SECONDS", "20"))
+
+# Abaixo disso não vale a pena abrir uma requisição
+MIN_REQUEST_TIMEOUT = 0.05
+
+# Prazo (time.monotonic) da execução atual; None = sem prazo (ex.: threads de pré-carregamento)
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("rd_request_deadline", default=None)
+
+
+class DeadlineExceeded(requests.Timeout):
+    """O orçamento de tempo da execução acabou antes (ou durante) a requisição"""
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float] = PAGE_BUDGET_SECONDS) -> Iterator[None]:
+    """Define o prazo das chamadas feitas dentro do bloco (se já houver um menor, ele continua valendo)"""
+    if not seconds:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Segundos que ainda restam do orçamento; None se não houver prazo"""
+    deadline = _deadline.get()
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def expired() -> bool:
+    """Indica se o orçamento da execução atual acabou"""
+    left = remaining()
+    return left is not None and left <= MIN_REQUEST_TIMEOUT
+
+
+def bounded_timeout(timeout: float) -> Tuple[float, bool]:
+    """(timeout limitado ao tempo restante, se foi encurtado); DeadlineExceeded se não sobrar tempo"""
+    left = remaining()
+    if left is None or left >= timeout:
+        return timeout, False
+    if left <= MIN_REQUEST_TIMEOUT:
+        raise DeadlineExceeded("Orçamento de tempo da página esgotado")
+    return left, True
+
+
+def in_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """`fn` presa ao contexto atual (com o prazo), para rodar em threads de executores
+
+    Cada chamada roda em uma cópia do contexto, então a mesma função pode ser
+    usada por várias threads ao mesmo tempo (ex.: executor.map).
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
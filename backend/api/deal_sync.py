@@ -0,0 +1,206 @@
+"""
+Sincronização incremental de deals baseada em updated_at
+"""
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from backend.models.data_models import DealBatch
+
+
+# Intervalo (segundos) entre sincronizações completas, para capturar deals removidos
+FULL_SYNC_INTERVAL = int(os.getenv("RD_FULL_SYNC_INTERVAL", "3600"))
+
+# Permite desligar o modo incremental (volta a baixar a janela inteira a cada atualização)
+INCREMENTAL_SYNC_ENABLED = os.getenv("RD_INCREMENTAL_SYNC", "1") == "1"
+
+# Cache de deals por dia de criação (consultas com start_date/end_date reaproveitam os dias já baixados)
+DAY_BUCKETS_ENABLED = os.getenv("RD_DAY_BUCKETS", "1") == "1"
+
+# Dias mais recentes sempre rebaixados quando a API não suporta a sincronização incremental
+RECENT_DAYS = 1
+
+# Primeira página da busca por alterações; dobra enquanto todos os deals da página forem novos
+CHANGED_FIRST_PAGE_SIZE = 10
+
+# Maior página aceita pela API do RD Station CRM
+API_MAX_PAGE_SIZE = 200
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Converte timestamps ISO 8601 da API (ex.: 2025-08-12T10:00:00.000-03:00)"""
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def deal_key(deal: Dict) -> Any:
+    """Identificador de um deal na resposta da API"""
+    return deal.get("id") or deal.get("_id")
+
+
+def deal_day(deal: Dict) -> Optional[str]:
+    """Dia de criação (YYYY-MM-DD, no fuso do próprio timestamp) de um deal da API"""
+    created_at = deal.get("created_at")
+    if not isinstance(created_at, str) or len(created_at) < 10:
+        return None
+    return created_at[:10]
+
+
+def day_range(start: date, end: date) -> List[date]:
+    """Dias de `start` a `end`, inclusive"""
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def contiguous_runs(days: List[date]) -> List[Tuple[date, date]]:
+    """Agrupa dias ordenados em intervalos contíguos [(primeiro, último), ...]"""
+    runs: List[Tuple[date, date]] = []
+    for day in days:
+        if runs and day - runs[-1][1] == timedelta(days=1):
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
+
+class DealSyncState:
+    """Resultado acumulado de uma consulta de deals e sua marca d'água de updated_at"""
+
+    def __init__(self):
+        self.batch = DealBatch()
+        self.high_water_mark: Optional[datetime] = None
+        self.last_full_sync = 0.0
+        self.lock = threading.Lock()
+
+    def needs_full_sync(self) -> bool:
+        """Indica se é hora de baixar a consulta inteira novamente"""
+        return self.high_water_mark is None or time.time() - self.last_full_sync > FULL_SYNC_INTERVAL
+
+    def replace(self, deals: List[Dict]):
+        """Substitui o estado pelo resultado de uma sincronização completa"""
+        self.batch = DealBatch()
+        self.high_water_mark = None
+        self.merge(deals)
+        self.last_full_sync = time.time()
+
+    def merge(self, deals: List[Dict]) -> int:
+        """Mescla deals alterados pelo id e avança a marca d'água; retorna quantos foram mesclados"""
+        for deal in deals:
+            if deal_key(deal) is None:
+                continue
+            self.batch.upsert(deal)
+
+            updated_at = parse_timestamp(deal.get("updated_at"))
+            if updated_at and (self.high_water_mark is None or updated_at > self.high_water_mark):
+                self.high_water_mark = updated_at
+
+        return len(deals)
+
+    def snapshot(self) -> DealBatch:
+        """Cópia do resultado atual (o lote interno continua recebendo alterações)"""
+        batch = self.batch.copy()
+        batch.meta = {"total": len(batch), "has_more": False}
+        batch.fingerprint()
+        return batch
+
+
+class DayBucketState:
+    """Deals de uma consulta agrupados pelo dia de criação
+
+    Cada dia baixado por inteiro guarda quando isso aconteceu; dias além de
+    FULL_SYNC_INTERVAL voltam a ser considerados ausentes (para capturar
+    deals removidos). Alterações em dias já baixados chegam pela
+    sincronização incremental (marca d'água de updated_at).
+    """
+
+    def __init__(self):
+        self.batch = DealBatch()
+        self.day_ids: Dict[str, Set[Any]] = {}
+        self.deal_days: Dict[Any, str] = {}
+        self.fetched_at: Dict[str, float] = {}
+        self.high_water_mark: Optional[datetime] = None
+        self.incremental_supported = True
+        self.lock = threading.Lock()
+
+    def missing_days(self, start: date, end: date) -> List[date]:
+        """Dias do intervalo que ainda não foram baixados (ou venceram)"""
+        now = time.time()
+        return [
+            day for day in day_range(start, end)
+            if now - self.fetched_at.get(day.isoformat(), 0.0) > FULL_SYNC_INTERVAL
+        ]
+
+    def covered_span(self) -> Optional[Tuple[date, date]]:
+        """Primeiro e último dia já baixados"""
+        if not self.fetched_at:
+            return None
+        return date.fromisoformat(min(self.fetched_at)), date.fromisoformat(max(self.fetched_at))
+
+    def _place(self, deal: Dict):
+        deal_id = deal_key(deal)
+        day = deal_day(deal)
+        previous = self.deal_days.get(deal_id)
+        if previous is not None and previous != day:
+            self.day_ids.get(previous, set()).discard(deal_id)
+        if day is None:
+            self.deal_days.pop(deal_id, None)
+            return
+        self.deal_days[deal_id] = day
+        self.day_ids.setdefault(day, set()).add(deal_id)
+        self.batch.upsert(deal)
+
+    def fill(self, first: date, last: date, deals: List[Dict]):
+        """Substitui os dias de `first` a `last` pelo resultado de uma busca completa deles"""
+        for day in day_range(first, last):
+            for deal_id in self.day_ids.pop(day.isoformat(), set()):
+                self.deal_days.pop(deal_id, None)
+
+        track_updates = not self.fetched_at
+        for deal in deals:
+            if deal_key(deal) is not None:
+                self._place(deal)
+                if track_updates:
+                    self._advance(deal)
+
+        now = time.time()
+        for day in day_range(first, last):
+            self.fetched_at[day.isoformat()] = now
+        self._compact()
+
+    def merge(self, deals: List[Dict]) -> int:
+        """Mescla deals alterados (de qualquer dia) e avança a marca d'água"""
+        for deal in deals:
+            if deal_key(deal) is None:
+                continue
+            self._place(deal)
+            self._advance(deal)
+        return len(deals)
+
+    def _advance(self, deal: Dict):
+        updated_at = parse_timestamp(deal.get("updated_at"))
+        if updated_at and (self.high_water_mark is None or updated_at > self.high_water_mark):
+            self.high_water_mark = updated_at
+
+    def _compact(self):
+        """Descarta do lote as linhas que não pertencem mais a nenhum dia"""
+        if len(self.batch) <= 2 * len(self.deal_days) + 1000:
+            return
+        positions = sorted(self.batch.position(deal_id) for deal_id in self.deal_days)
+        self.batch = self.batch.take(positions)
+
+    def assemble(self, start: date, end: date) -> DealBatch:
+        """Lote com os deals criados entre `start` e `end` (inclusive)"""
+        positions = sorted(
+            self.batch.position(deal_id)
+            for day in day_range(start, end)
+            for deal_id in self.day_ids.get(day.isoformat(), ())
+        )
+        batch = self.batch.take(positions)
+        batch.meta = {"total": len(batch), "has_more": False}
+        batch.fingerprint()
+        return batch
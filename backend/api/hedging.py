@@ -0,0 +1,223 @@
+"""
+Requisições de reserva (hedging) para reduzir a cauda de latência dos GETs da API
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+
+# Liga o envio de uma requisição de reserva quando a original demora (opt-in)
+HEDGING_ENABLED = os.getenv("RD_HEDGING", "0") == "1"
+
+# Percentil da latência do endpoint a partir do qual a reserva é enviada
+HEDGE_QUANTILE = float(os.getenv("RD_HEDGE_QUANTILE", "0.95"))
+
+# Máximo de requisições de reserva por requisição original (0.1 = até 10% a mais)
+HEDGE_MAX_RATIO = float(os.getenv("RD_HEDGE_MAX_RATIO", "0.1"))
+
+# Reservas que podem ser acumuladas para uso seguido
+HEDGE_BURST = 3
+
+# Latências guardadas por endpoint e mínimo delas para confiar no percentil
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+# Espera mínima antes da reserva (evita duplicar endpoints que respondem muito rápido)
+MIN_HEDGE_DELAY = 0.02
+
+# Threads das requisições acompanhadas (original e reserva)
+HEDGE_WORKERS = 32
+
+
+class LatencyTracker:
+    """Latências recentes de uma família de endpoints e o percentil usado como gatilho da reserva
+
+    Cada amostra é o tempo que quem chamou esperou, contado do envio da
+    requisição original (com reserva, até a primeira resposta, qualquer
+    que seja). Em GETs com stream=True (páginas de deals) a amostra vai
+    só até a chegada dos cabeçalhos: o corpo é lido depois, fora da
+    medição, então o p95 dessas famílias é o tempo até os cabeçalhos.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW, quantile: float = HEDGE_QUANTILE):
+        self.quantile = quantile
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def timed(self, fn: Callable[[], Any]) -> Any:
+        """Executa `fn` registrando a latência se ela terminar sem erro"""
+        started = time.monotonic()
+        result = fn()
+        self.record(time.monotonic() - started)
+        return result
+
+    def percentile(self) -> Optional[float]:
+        """Latência (segundos) no percentil configurado; None enquanto houver poucas amostras"""
+        with self._lock:
+            if len(self._samples) < MIN_LATENCY_SAMPLES:
+                return None
+            samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, math.ceil(self.quantile * len(samples)) - 1)]
+
+    def hedge_delay(self) -> Optional[float]:
+        """Quanto esperar pela requisição original antes de enviar a reserva"""
+        threshold = self.percentile()
+        return None if threshold is None else max(threshold, MIN_HEDGE_DELAY)
+
+
+class HedgeBudget:
+    """Limite de requisições de reserva em proporção às requisições originais
+
+    Cada requisição original acumula `ratio` de crédito (até `burst`) e
+    cada reserva gasta 1, então as reservas nunca passam de `ratio` do
+    tráfego, além de também consumirem o token bucket do token.
+    """
+
+    def __init__(self, ratio: float = HEDGE_MAX_RATIO, burst: int = HEDGE_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self._credit = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+        self.denied = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+            self._credit = min(self.burst, self._credit + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Reserva crédito para uma requisição de reserva; False se o limite foi atingido"""
+        with self._lock:
+            if self._credit < 1:
+                self.denied += 1
+                return False
+            self._credit -= 1
+            self.hedges += 1
+            return True
+
+    def refund(self):
+        """Devolve o crédito de uma reserva que não chegou a ser enviada"""
+        with self._lock:
+            self._credit = min(self.burst, self._credit + 1)
+            self.hedges -= 1
+            self.denied += 1
+
+    def record_win(self):
+        with self._lock:
+            self.wins += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"requests": self.requests, "hedges": self.hedges, "wins": self.wins, "denied": self.denied}
+
+
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_executor_lock = threading.Lock()
+
+
+def get_hedge_executor() -> ThreadPoolExecutor:
+    """Executor próprio das requisições acompanhadas (separado do de fan-out para não disputar workers)"""
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="crm-hedge")
+    return _hedge_executor
+
+
+def _discard(future: Future):
+    """Descarta a requisição perdedora: cancela se não começou, senão fecha a resposta quando chegar"""
+    if future.cancel():
+        return
+
+    def close(done: Future):
+        if not done.cancelled() and done.exception() is None:
+            close_result = getattr(done.result(), "close", None)
+            if close_result is not None:
+                close_result()
+
+    future.add_done_callback(close)
+
+
+def hedged(send: Callable[[], Any], delay: float, budget: HedgeBudget,
+           acquire_token: Callable[[], bool], tracker: LatencyTracker) -> Any:
+    """Resultado de `send`, duplicando a chamada se ela não terminar em `delay` segundos
+
+    A reserva só é enviada se houver crédito no `budget` e um token livre
+    (`acquire_token`, sem esperar). Vale a primeira resposta que chegar sem
+    erro; a outra é descartada. Se as duas falharem, o erro da primeira é
+    propagado. A latência registrada no `tracker` conta desde o envio da
+    original, mesmo quando a reserva vence.
+    """
+    executor = get_hedge_executor()
+    started = time.monotonic()
+    primary = executor.submit(send)
+    hedge: Optional[Future] = None
+    done, _ = wait([primary], timeout=delay)
+    if not done and budget.try_spend():
+        if acquire_token():
+            hedge = executor.submit(send)
+        else:
+            budget.refund()
+
+    pending = {primary} if hedge is None else {primary, hedge}
+    errors: Dict[Future, BaseException] = {}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                errors[future] = future.exception()
+                continue
+            for loser in pending:
+                _discard(loser)
+            # Uma amostra por chamada: o tempo de espera de quem chamou, desde o envio da original
+            tracker.record(time.monotonic() - started)
+            if future is hedge:
+                budget.record_win()
+            return future.result()
+    raise errors.get(primary) or errors[hedge]
+
+
+_trackers: Dict[Tuple[str, str], LatencyTracker] = {}
+_budgets: Dict[Tuple[str, str], HedgeBudget] = {}
+_registry_lock = threading.Lock()
+
+
+def get_latency_tracker(base_url: str, family: str) -> LatencyTracker:
+    """Latências compartilhadas por todos os clientes de um (base_url, família de endpoints)"""
+    key = (base_url.rstrip("/"), family)
+    with _registry_lock:
+        tracker = _trackers.get(key)
+        if tracker is None:
+            tracker = LatencyTracker()
+            _trackers[key] = tracker
+        return tracker
+
+
+def latency_trackers(base_url: str) -> Dict[str, LatencyTracker]:
+    """Latências já registradas para uma base_url, por família"""
+    base_url = base_url.rstrip("/")
+    with _registry_lock:
+        return {family: tracker for (url, family), tracker in _trackers.items() if url == base_url}
+
+
+def get_hedge_budget(base_url: str, token: str) -> HedgeBudget:
+    """Limite de reservas do processo para o par (base_url, token), como o token bucket"""
+    key = (base_url, token)
+    with _registry_lock:
+        budget = _budgets.get(key)
+        if budget is None:
+            budget = HedgeBudget()
+            _budgets[key] = budget
+        return budget
@@ -0,0 +1,45 @@
+"""
+Sessão HTTP compartilhada para a API do RD Station CRM
+"""
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Optional
+
+
+# Tamanho do pool de conexões por host (configurável via ambiente)
+DEFAULT_POOL_SIZE = int(os.getenv("RD_HTTP_POOL_SIZE", "10"))
+
+# Headers enviados em todas as requisições da sessão
+DEFAULT_HEADERS = {
+    "accept": "application/json",
+    "Connection": "keep-alive"
+}
+
+_shared_session: Optional[requests.Session] = None
+_shared_session_lock = threading.Lock()
+
+
+def create_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """Cria uma sessão com pool de conexões keep-alive e headers padrão"""
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+def get_shared_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """Retorna a sessão única do processo, criando-a na primeira chamada"""
+    global _shared_session
+
+    if _shared_session is None:
+        with _shared_session_lock:
+            if _shared_session is None:
+                _shared_session = create_session(pool_size)
+
+    return _shared_session
@@ -0,0 +1,141 @@
+"""
+Decodificação incremental de JSON com projeção de campos
+"""
+import codecs
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Tamanho dos blocos lidos do corpo da resposta
+CHUNK_SIZE = 64 * 1024
+
+# Campos de um deal usados pelo dashboard; para objetos aninhados, apenas as subchaves listadas
+USER_FIELDS = ("id", "name", "full_name", "display_name", "username", "email")
+DEAL_FIELDS: Dict[str, Optional[Tuple[str, ...]]] = {
+    "id": None,
+    "_id": None,
+    "name": None,
+    "rating": None,
+    "status": None,
+    "win": None,
+    "hold": None,
+    "amount_total": None,
+    "created_at": None,
+    "updated_at": None,
+    "closed_at": None,
+    "user": USER_FIELDS,
+    "owner": USER_FIELDS,
+    "assigned_user": USER_FIELDS,
+    "deal_stage": ("id", "name", "nickname", "order"),
+    "deal_pipeline": ("id", "name"),
+}
+
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+
+def project_record(record: Any, fields: Dict[str, Optional[Tuple[str, ...]]] = DEAL_FIELDS) -> Any:
+    """Mantém apenas os campos de interesse de um registro"""
+    if not isinstance(record, dict):
+        return record
+
+    projected = {}
+    for field, subfields in fields.items():
+        if field in record:
+            value = record[field]
+            if subfields is not None and isinstance(value, dict):
+                value = {key: value[key] for key in subfields if key in value}
+            projected[field] = value
+    return projected
+
+
+def _iter_text(chunks: Iterable[bytes]) -> Iterable[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        if chunk:
+            yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def decode_projected(chunks: Iterable[bytes], array_key: str,
+                     project: Callable[[Any], Any] = project_record) -> Any:
+    """Decodifica um documento JSON em blocos, projetando os itens de `array_key`
+
+    Cada item do array é decodificado assim que termina de chegar e
+    imediatamente reduzido por `project`, então o pico de memória é limitado
+    pelos itens projetados mais um item bruto, e não pelo documento inteiro.
+    O restante do documento (ex.: `total`, `has_more`) é preservado.
+    Se o documento for uma lista, ela é tratada como o próprio array.
+    """
+    text = _iter_text(chunks)
+    key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(array_key))
+    buffer = ""
+    exhausted = False
+
+    def read_more() -> bool:
+        nonlocal buffer, exhausted
+        if exhausted:
+            return False
+        try:
+            buffer += next(text)
+        except StopIteration:
+            exhausted = True
+            return False
+        return True
+
+    # 1. Localizar o início do array (documento em lista ou chave do envelope)
+    while True:
+        stripped = buffer.lstrip(_WHITESPACE)
+        if stripped.startswith("["):
+            prefix = None
+            pos = len(buffer) - len(stripped) + 1
+            break
+        match = key_pattern.search(buffer)
+        if match:
+            prefix = buffer[:match.end() - 1]
+            pos = match.end()
+            break
+        if not read_more():
+            # Array não encontrado (ex.: resposta de erro): decodificar normalmente
+            return json.loads(buffer)
+
+    # 2. Decodificar e projetar os itens um a um
+    items: List[Any] = []
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE + ",":
+            pos += 1
+
+        if pos >= len(buffer):
+            if not read_more():
+                raise json.JSONDecodeError("Array incompleto", buffer, pos)
+            continue
+
+        if buffer[pos] == "]":
+            pos += 1
+            break
+
+        try:
+            item, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if not read_more():
+                raise
+            continue
+
+        items.append(project(item))
+        pos = end
+
+        # Descartar o texto já consumido
+        if pos > CHUNK_SIZE:
+            buffer = buffer[pos:]
+            pos = 0
+
+    if prefix is None:
+        return items
+
+    # 3. Decodificar o envelope sem o array
+    while read_more():
+        pass
+    envelope = json.loads(prefix + "[]" + buffer[pos:])
+    envelope[array_key] = items
+    return envelope
@@ -0,0 +1,169 @@
+"""
+Pré-carregamento periódico dos dados do dashboard em segundo plano
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Callable, List, Optional, Tuple
+
+from backend.api.rd_station_client import RDStationClient
+from backend.models.data_models import DEFAULT_WINDOW_DAYS
+from backend.utils.instrumentation import get_logger
+
+
+logger = get_logger(__name__)
+
+# Liga/desliga o pré-carregamento
+PREFETCH_ENABLED = os.getenv("RD_PREFETCH_ENABLED", "1") == "1"
+
+# Intervalos (segundos): deals um pouco abaixo do TTL de 30s; dados de referência abaixo de 300s
+PREFETCH_DEALS_INTERVAL = float(os.getenv("RD_PREFETCH_DEALS_INTERVAL", "25"))
+PREFETCH_REFERENCE_INTERVAL = float(os.getenv("RD_PREFETCH_REFERENCE_INTERVAL", "240"))
+
+# Sem leituras do dashboard por esse tempo (segundos), o agendador para até a próxima leitura
+PREFETCH_IDLE_SECONDS = float(os.getenv("RD_PREFETCH_IDLE_SECONDS", "600"))
+
+# Quantidade máxima de agendadores (um por base_url/token) rodando no processo
+MAX_SCHEDULERS = 4
+
+
+def configured_tenant() -> Tuple[str, str]:
+    """(base_url, token) configurados no ambiente (API_BASE_URL/API_TOKEN); só eles são pré-carregados"""
+    return os.getenv("API_BASE_URL", "https://crm.rdstation.com").rstrip("/"), os.getenv("API_TOKEN", "")
+
+
+def default_window() -> Tuple[str, str]:
+    """Período padrão do dashboard (mesmo de FilterComponents.render_date_filters)"""
+    today = date.today()
+    return (today - timedelta(days=DEFAULT_WINDOW_DAYS)).strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d")
+
+
+class _Job:
+    __slots__ = ("name", "fn", "interval", "next_run", "runs", "failures", "last_duration")
+
+    def __init__(self, name: str, fn: Callable[[], object], interval: float):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.next_run = 0.0
+        self.runs = 0
+        self.failures = 0
+        self.last_duration: Optional[float] = None
+
+
+class PrefetchScheduler:
+    """Thread que recarrega os dados do dashboard em intervalos fixos
+
+    Cada tarefa usa `refresh` do cache de respostas, então quem abre o
+    dashboard lê do cache aquecido e a taxa de chamadas à API depende só dos
+    intervalos, não da quantidade de usuários. Sem leituras (`touch`) por
+    `idle_timeout` segundos a thread termina; a próxima leitura a reinicia.
+    """
+
+    def __init__(self, client: RDStationClient, deals_interval: float = PREFETCH_DEALS_INTERVAL,
+                 reference_interval: float = PREFETCH_REFERENCE_INTERVAL,
+                 idle_timeout: float = PREFETCH_IDLE_SECONDS):
+        self.client = client
+        self.idle_timeout = idle_timeout
+        self.last_read = time.monotonic()
+        cls = type(client)
+        self.jobs: List[_Job] = [
+            _Job("house_deals", lambda: cls.fetch_house_funnel_data.refresh(client, *default_window()), deals_interval),
+            _Job("house_stages", lambda: cls.fetch_house_funnel_stages.refresh(client), reference_interval),
+            _Job("users", lambda: cls.fetch_users_directly.refresh(client), reference_interval),
+            _Job("teams", lambda: cls.fetch_teams_directly.refresh(client), reference_interval),
+        ]
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "PrefetchScheduler":
+        """Inicia a thread (daemon) do agendador, se ainda não estiver rodando"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="crm-prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        """Pede a parada da thread e aguarda até `timeout` segundos"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def touch(self):
+        """Registra uma leitura do dashboard (mantém o agendador ativo por mais `idle_timeout` segundos)"""
+        self.last_read = time.monotonic()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now - self.last_read > self.idle_timeout:
+                logger.debug("Pré-carregamento parado: dashboard sem leituras há %.0fs", now - self.last_read)
+                return
+            for job in self.jobs:
+                if self._stop.is_set():
+                    return
+                if job.next_run <= now:
+                    self._run_job(job)
+
+            next_run = min(min(job.next_run for job in self.jobs), self.last_read + self.idle_timeout)
+            self._stop.wait(max(next_run - time.monotonic(), 0.1))
+
+    def _run_job(self, job: _Job):
+        started = time.monotonic()
+        try:
+            job.fn()
+        except Exception as e:
+            job.failures += 1
+            logger.warning("Falha no pré-carregamento de %s: %s", job.name, e)
+        job.runs += 1
+        job.last_duration = time.monotonic() - started
+        # O intervalo conta a partir do fim da execução (sem acumular atrasos)
+        job.next_run = time.monotonic() + job.interval
+        logger.debug("Pré-carregamento de %s em %.2fs", job.name, job.last_duration)
+
+    def stats(self) -> List[dict]:
+        """Execuções, falhas e duração da última execução de cada tarefa"""
+        return [
+            {"name": job.name, "interval": job.interval, "runs": job.runs,
+             "failures": job.failures, "last_duration": job.last_duration}
+            for job in self.jobs
+        ]
+
+
+_schedulers: "OrderedDict[str, PrefetchScheduler]" = OrderedDict()
+_schedulers_lock = threading.Lock()
+
+
+def start_prefetch(client: RDStationClient) -> Optional[PrefetchScheduler]:
+    """Registra uma leitura do dashboard e garante o agendador do tenant rodando (None se não houver)
+
+    Só o tenant configurado no ambiente (configured_tenant) é pré-carregado:
+    clientes de outros tokens ou URLs (ex.: digitados na sidebar) são
+    atendidos sob demanda. Chamada a cada execução da seção de dados, ela
+    mantém o agendador ativo enquanto alguém estiver vendo o dashboard.
+    """
+    if not PREFETCH_ENABLED or not client.base_url or not client.token:
+        return None
+    if (client.base_url, client.token) != configured_tenant():
+        return None
+
+    with _schedulers_lock:
+        scheduler = _schedulers.get(client.cache_tenant)
+        if scheduler is None:
+            scheduler = PrefetchScheduler(client)
+            _schedulers[client.cache_tenant] = scheduler
+        _schedulers.move_to_end(client.cache_tenant)
+        scheduler.touch()
+
+        while len(_schedulers) > MAX_SCHEDULERS:
+            _, oldest = _schedulers.popitem(last=False)
+            oldest.stop(timeout=0)
+
+        return scheduler.start()
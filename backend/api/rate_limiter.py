@@ -0,0 +1,130 @@
+"""
+Controle de taxa de requisições para a API do RD Station CRM
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+
+# Orçamento de requisições por token (configurável via ambiente)
+RATE_LIMIT_PER_MINUTE = int(os.getenv("RD_RATE_LIMIT_PER_MINUTE", "120"))
+RATE_LIMIT_BURST = int(os.getenv("RD_RATE_LIMIT_BURST", "10"))
+
+# Política de novas tentativas
+MAX_RETRIES = int(os.getenv("RD_MAX_RETRIES", "3"))
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+
+
+class TokenBucket:
+    """Token bucket bloqueante compartilhado por todas as threads do processo"""
+
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Aguarda até haver um token disponível; retorna False se estourar o timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+
+                    wait = self._paused_until - now
+                    if wait <= 0:
+                        if self._tokens >= 1:
+                            self._tokens -= 1
+                            return True
+                        wait = (1 - self._tokens) / self.rate
+
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            return False
+                        wait = min(wait, remaining)
+
+                    self._cond.wait(wait)
+            finally:
+                self._waiting -= 1
+
+    def pause_for(self, seconds: float):
+        """Suspende a liberação de tokens (ex.: após um 429 com Retry-After)"""
+        with self._cond:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0.0
+            self._updated_at = now
+
+    @property
+    def queue_depth(self) -> int:
+        """Quantidade de requisições aguardando um token"""
+        return self._waiting
+
+    @property
+    def available_tokens(self) -> float:
+        """Tokens disponíveis no momento"""
+        with self._cond:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Converte o header Retry-After (segundos ou data HTTP) em segundos"""
+    if not value:
+        return None
+
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Backoff exponencial com jitter completo para a tentativa `attempt` (0, 1, 2...)"""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+_limiters: Dict[Tuple[str, str], TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(base_url: str, token: str) -> TokenBucket:
+    """Retorna o token bucket do processo para o par (base_url, token)"""
+    key = (base_url, token)
+
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = TokenBucket(RATE_LIMIT_PER_MINUTE / 60.0, RATE_LIMIT_BURST)
+            _limiters[key] = limiter
+
+    return limiter
@@ -1,26 +1,815 @@
 """
 Cliente para API do RD Station CRM
 """
+import logging
+import math
+import os
+import threading
+import time
 import requests
-import streamlit as st
-from typing import Optional, Dict, List, Any
+from datetime import date, timedelta
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from backend.api.auth_negotiation import (
+    AUTH_FAILURE_CODES, AuthNegotiator, apply_scheme, endpoint_family, get_auth_negotiator
+)
+from backend.api.circuit_breaker import (
+    CircuitBreaker, CircuitOpenError, circuit_breakers, get_circuit_breaker, note_family
+)
+from backend.api.deadline import (
+    MIN_REQUEST_TIMEOUT, DeadlineExceeded, bounded_timeout, in_context, remaining, request_deadline
+)
+from backend.api.hedging import HEDGING_ENABLED, get_hedge_budget, get_latency_tracker, hedged, latency_trackers
+from backend.api.http_session import get_shared_session
+from backend.api.single_flight import FlightTimeout, SingleFlight, make_request_key
+from backend.api.rate_limiter import (
+    MAX_RETRIES, RETRYABLE_STATUS_CODES, TokenBucket, backoff_delay, get_rate_limiter, parse_retry_after
+)
+from backend.api.response_cache import ResponseCache, cached, get_response_cache, tenant_fingerprint
+from backend.api.json_stream import CHUNK_SIZE, decode_projected
+from backend.api.deal_sync import (
+    API_MAX_PAGE_SIZE, CHANGED_FIRST_PAGE_SIZE, DAY_BUCKETS_ENABLED, INCREMENTAL_SYNC_ENABLED, RECENT_DAYS,
+    DayBucketState, DealSyncState, contiguous_runs, day_range, parse_timestamp
+)
+from backend.storage.deal_store import DealStore, get_deal_store
+from backend.models.data_models import DealBatch, ProbeResult
+from backend.utils.instrumentation import Lazy, LogSampler, get_logger, redact_params
+
+
+logger = get_logger(__name__)
+
+# Número máximo de páginas de deals buscadas em paralelo
+MAX_PAGE_WORKERS = 4
+
+# Parâmetros de /api/v1/deals que o banco local sabe reproduzir
+STORE_QUERY_PARAMS = {"token", "limit", "page", "order", "direction", "deal_pipeline_id", "start_date", "end_date"}
+
+# Quantidade máxima de consultas de deals com estado de sincronização incremental
+MAX_SYNC_STATES = 16
+
+# Recursos listáveis por `RDStationClient.iter`: caminho, chave dos registros na resposta e gravação no banco local
+LIST_RESOURCES = {
+    "deals": ("/api/v1/deals", "deals", "upsert_deals"),
+    "deal_stages": ("/api/v1/deal_stages", "deal_stages", "upsert_stages"),
+    "deal_pipelines": ("/api/v1/deal_pipelines", "deal_pipelines", None),
+    "users": ("/api/v1/users", "users", "upsert_users"),
+    "teams": ("/api/v1/teams", "teams", None),
+    "team_users": ("/api/v1/teams/{team_id}/users", "users", None),
+}
+
+# Campos onde a API pode trazer o nome de um usuário (na ordem de preferência)
+NAME_FIELDS = ["name", "full_name", "display_name", "username"]
+
+# Executor compartilhado (pré-busca de páginas e chamadas independentes em paralelo) e prazo total do fan-out
+FANOUT_WORKERS = int(os.getenv("RD_FANOUT_WORKERS", "8"))
+FANOUT_DEADLINE = float(os.getenv("RD_FANOUT_DEADLINE", "45"))
+
+# Tempo máximo (segundos) para abrir a conexão com a API (um host fora do ar falha nesse prazo, não no timeout de leitura)
+CONNECT_TIMEOUT = float(os.getenv("RD_CONNECT_TIMEOUT", "5"))
+
+# Diagnóstico de endpoints: tempo máximo de cada teste e prazo total do conjunto
+PROBE_TIMEOUT = 10
+PROBE_DEADLINE = float(os.getenv("RD_PROBE_DEADLINE", "20"))
+
+
+def extract_records(data: Any, key: str) -> Optional[List]:
+    """Lista de registros de uma resposta: {key: [...]}, {"data": [...]} ou a própria lista (None se outro formato)"""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        for candidate in (key, "data"):
+            if isinstance(data.get(candidate), list):
+                return data[candidate]
+    return None
+
+
+def record_name(record: Any, fields: List[str] = NAME_FIELDS) -> Optional[str]:
+    """Nome (sem espaços nas pontas) do primeiro campo preenchido de um usuário da API"""
+    if isinstance(record, str):
+        return record.strip()
+    if not isinstance(record, dict):
+        return None
+    for field in fields:
+        if field in record and record[field]:
+            return record[field].strip()
+    return None
+
+
+_shared_executor: Optional[ThreadPoolExecutor] = None
+_shared_executor_lock = threading.Lock()
+
+
+def get_shared_executor() -> ThreadPoolExecutor:
+    """Executor limitado compartilhado por todos os clientes do processo"""
+    global _shared_executor
+    if _shared_executor is None:
+        with _shared_executor_lock:
+            if _shared_executor is None:
+                _shared_executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="crm-fanout")
+    return _shared_executor
+
+
+def _resolve(future: Future, fallback: Callable[[], Any]) -> Any:
+    """Resultado de uma tarefa do executor; se ela ainda estiver na fila, roda `fallback` aqui mesmo
+
+    Evita que uma tarefa do próprio executor fique esperando outra que não
+    consegue começar porque todos os workers estão ocupados.
+    """
+    if future.cancel():
+        return fallback()
+    return future.result()
+
+# Requisições idênticas e simultâneas (de qualquer sessão) compartilham uma única execução
+_request_flights = SingleFlight()
 
 
 class RDStationClient:
     """Cliente para interagir com a API do RD Station CRM"""
     
     
-    def __init__(self, base_url: str, token: str):
+    def __init__(self, base_url: str, token: str, session: Optional[requests.Session] = None,
+                 rate_limiter: Optional[TokenBucket] = None, deal_store: Optional[DealStore] = None,
+                 response_cache: Optional[ResponseCache] = None, auth: Optional[AuthNegotiator] = None):
         self.base_url = base_url.rstrip('/')
         self.token = token
         self.headers = {"accept": "application/json"}
+        # Sessão com pool keep-alive compartilhada por todos os clientes do processo
+        self.session = session or get_shared_session()
+        # Orçamento de requisições compartilhado por todos os clientes do mesmo token
+        self.rate_limiter = rate_limiter or get_rate_limiter(self.base_url, token)
+        # Limite de requisições de reserva (hedging) do mesmo token
+        self.hedge_budget = get_hedge_budget(self.base_url, token)
+        # Banco local com os últimos dados recebidos (consultas indexadas e fallback em quedas da API)
+        self.deal_store = deal_store if deal_store is not None else get_deal_store(self.base_url, token)
+        # Estado da sincronização incremental por consulta de deals
+        self._sync_states: "OrderedDict[tuple, DealSyncState]" = OrderedDict()
+        self._sync_states_lock = threading.Lock()
+        # Cache de respostas (compartilhado; as entradas são separadas por base_url/token)
+        self.response_cache = response_cache or get_response_cache()
+        self.cache_tenant = tenant_fingerprint(self.base_url, token)
+        # Esquema de autenticação (query ou Bearer) negociado por família de endpoints
+        self.auth = auth or get_auth_negotiator()
+        # Famílias de endpoints usadas na última carga de cada dataset do cache (ver `cached`)
+        self.dataset_families: Dict[str, Set[str]] = {}
+
+    def get_request_stats(self) -> Dict[str, Any]:
+        """Estado atual do controle de taxa (fila e tokens disponíveis), esquemas de autenticação, circuitos e hedging"""
+        return {
+            "queue_depth": self.rate_limiter.queue_depth,
+            "available_tokens": round(self.rate_limiter.available_tokens, 2),
+            "auth_schemes": self.auth.known(self.base_url),
+            "circuits": {family: breaker.status() for family, breaker in circuit_breakers(self.base_url).items()},
+            "hedging": dict(self.hedge_budget.stats(), enabled=HEDGING_ENABLED),
+            "latency_p95": {family: tracker.percentile() for family, tracker in latency_trackers(self.base_url).items()}
+        }
+
+    def _breakers(self, families: Optional[Iterable[str]] = None) -> List[CircuitBreaker]:
+        """Circuitos da base_url (só os das `families`, se informadas)"""
+        breakers = circuit_breakers(self.base_url)
+        if families is None:
+            return list(breakers.values())
+        return [breakers[family] for family in families if family in breakers]
+
+    def api_failing_since(self, started: float, families: Optional[Iterable[str]] = None) -> bool:
+        """Indica se algum circuito (das `families` usadas pela carga) falhou desde `started` e segue aberto"""
+        return any(breaker.failing_since(started) for breaker in self._breakers(families))
+
+    def unavailable_since(self, method_name: Optional[str] = None) -> Optional[float]:
+        """Momento (epoch) em que a API ficou indisponível; None se os circuitos estiverem fechados
+        
+        Com `method_name` (ex.: "fetch_house_funnel_data"), só contam os
+        endpoints usados pela última carga daquele dataset.
+        """
+        families = None
+        if method_name is not None:
+            families = self.dataset_families.get(getattr(type(self), method_name).cache_dataset, set())
+        opened = [breaker.opened_at for breaker in self._breakers(families)
+                  if not breaker.is_closed and breaker.opened_at]
+        return min(opened) if opened else None
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Contadores do cache de respostas (acertos, erros, entradas)"""
+        return self.response_cache.stats()
+
+    def get_data_age(self, method_name: str, *args, **kwargs) -> Optional[float]:
+        """Idade (segundos) do valor em cache de um método, ex.: ("fetch_house_funnel_data", inicio, fim)"""
+        method = getattr(type(self), method_name)
+        return self.response_cache.age(method.cache_key(self, *args, **kwargs))
+
+    def invalidate_dataset(self, method_name: str, *args, **kwargs) -> bool:
+        """Descarta do cache o valor de uma chamada específica de um método"""
+        method = getattr(type(self), method_name)
+        return self.response_cache.discard(method.cache_key(self, *args, **kwargs))
+
+    def refresh_dataset(self, method_name: str, *args, **kwargs) -> Any:
+        """Recarrega agora o valor em cache de uma chamada (ex.: deals do HOUSE de um período)
+
+        Se a busca falhar, a entrada anterior é mantida.
+        """
+        method = getattr(type(self), method_name)
+        return method.refresh(self, *args, **kwargs)
+
+    def _persist(self, method: str, *args):
+        """Grava dados no banco local sem deixar falhas de disco afetarem a requisição"""
+        if self.deal_store is None:
+            return
+        try:
+            getattr(self.deal_store, method)(*args)
+        except Exception as e:
+            logger.warning("Falha ao gravar no banco local (%s): %s", method, e)
+
+    def _stored_deals(self, params: Dict) -> Optional[Dict]:
+        """Deals do banco local equivalentes à consulta (usado quando a API falha)"""
+        if self.deal_store is None or set(params) - STORE_QUERY_PARAMS:
+            return None
+        
+        deals = self.deal_store.get_deals(
+            pipeline_id=params.get("deal_pipeline_id"),
+            start_date=params.get("start_date"),
+            end_date=params.get("end_date")
+        )
+        if not deals:
+            return None
+        
+        logger.warning("API indisponível - usando %s deals do banco local", len(deals))
+        return {"deals": deals, "total": len(deals), "has_more": False, "source": "local_store"}
+
+    def _synced_deal_store(self) -> Optional[DealStore]:
+        """Banco local com todos os deals em dia, para as análises consultarem pelos índices
+        
+        A sincronização de todos os deals é incremental (só a primeira, e uma
+        a cada FULL_SYNC_INTERVAL, baixa tudo) e grava no banco o que mudou.
+        Se a API falhar, o banco fica como está (último estado conhecido).
+        None se não houver banco local.
+        """
+        if self.deal_store is None:
+            return None
+        try:
+            self.sync_deals({"token": self.token, "limit": 1000})
+        except requests.RequestException as e:
+            logger.warning("Falha ao sincronizar deals para o banco local: %s", e)
+        return self.deal_store
+
+    def _stored_stages(self, pipeline_id: Optional[str] = None) -> Optional[List]:
+        """Etapas do banco local (None se não houver nenhuma gravada)"""
+        if self.deal_store is None:
+            return None
+        return self.deal_store.get_stages(pipeline_id) or None
+
+    def _stored_user_names(self) -> List[str]:
+        """Nomes de usuários do banco local"""
+        if self.deal_store is None:
+            return []
+        return self.deal_store.get_user_names()
+
+    def _stored_teams(self) -> Dict:
+        """Diretório de equipes do banco local"""
+        if self.deal_store is None:
+            return {}
+        return self.deal_store.get_teams()
+
+    def _send(self, url: str, params: Optional[Dict], headers: Dict, timeout: int,
+              stream: bool = False) -> requests.Response:
+        """Envia o GET autenticado pelo esquema negociado para a família do endpoint
+        
+        Enquanto a família não tem esquema registrado (ou se o registrado for
+        recusado com 401/403), o outro esquema é tentado em seguida; o que
+        receber uma resposta 2xx fica registrado e as chamadas seguintes
+        fazem uma única requisição. Outros status (429, 5xx, ...) não dizem
+        se o esquema foi aceito e não alteram o registro.
+        """
+        family = endpoint_family(url)
+        note_family(family)
+        breaker = get_circuit_breaker(self.base_url, family)
+        candidates = self.auth.candidates(self.base_url, family)
+        for scheme in candidates:
+            auth_params, auth_headers = apply_scheme(scheme, self.token, params, headers)
+            response = self._send_attempts(url, auth_params, auth_headers, timeout, stream, breaker)
+            if response.status_code not in AUTH_FAILURE_CODES:
+                if 200 <= response.status_code < 300:
+                    self.auth.remember(self.base_url, family, scheme)
+                return response
+            if scheme == candidates[-1]:
+                return response
+            logger.debug("Esquema '%s' recusado em %s (status %s)", scheme, family, response.status_code)
+            response.close()
+
+    def _send_attempts(self, url: str, params: Dict, headers: Dict, timeout: int,
+                       stream: bool, breaker: CircuitBreaker) -> requests.Response:
+        """Envia o GET respeitando o orçamento de requisições, o circuito do endpoint e o prazo da execução
+        
+        Respostas 429/5xx e falhas de conexão são repetidas com backoff
+        exponencial com jitter, respeitando o header Retry-After. Com o
+        circuito aberto a tentativa falha na hora com CircuitOpenError. O
+        timeout de cada tentativa é encurtado para o que resta do prazo
+        (request_deadline) e, sem tempo para mais uma tentativa, a chamada
+        termina com DeadlineExceeded.
+        """
+        attempt = 0
+        while True:
+            # Circuito antes do controle de taxa: quem falha na hora não gasta token dos endpoints saudáveis
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuito aberto para {endpoint_family(url)}: API indisponível")
+            try:
+                if not self.rate_limiter.acquire(timeout=remaining()):
+                    raise DeadlineExceeded("Orçamento de tempo esgotado aguardando o controle de taxa")
+                request_timeout, shortened = bounded_timeout(timeout)
+            except DeadlineExceeded:
+                # Liberada pelo circuito mas não enviada: o teste do meio-aberto fica para a próxima
+                breaker.release()
+                raise
+            
+            # Resultado da tentativa para o circuito: True = respondeu, False = falha do endpoint, None = inconclusivo
+            outcome: Optional[bool] = None
+            error: Optional[requests.RequestException] = None
+            try:
+                response = self._session_get(url, params, headers, request_timeout, stream, breaker)
+                outcome = response.status_code < 500
+            except requests.RequestException as e:
+                error = e
+                # Estourou o prazo da página, não necessariamente o do endpoint (só conta para o teste do meio-aberto)
+                if not (shortened and isinstance(e, requests.Timeout) and breaker.is_closed):
+                    outcome = False
+            finally:
+                # Também com exceções inesperadas: o teste do meio-aberto nunca fica pendurado
+                breaker.resolve(outcome)
+            
+            if error is not None:
+                if shortened and isinstance(error, requests.Timeout):
+                    raise DeadlineExceeded(f"Orçamento de tempo esgotado em {endpoint_family(url)}") from error
+                if attempt >= MAX_RETRIES or not isinstance(error, (requests.ConnectionError, requests.Timeout)):
+                    raise error
+                delay = backoff_delay(attempt)
+                if not self._can_wait(delay):
+                    raise error
+                time.sleep(delay)
+                attempt += 1
+                continue
+            
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= MAX_RETRIES:
+                return response
+            
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                delay = retry_after
+                if response.status_code == 429:
+                    # O orçamento do token acabou: segurar todas as requisições do processo
+                    self.rate_limiter.pause_for(delay)
+            else:
+                delay = backoff_delay(attempt)
+            if not self._can_wait(delay):
+                return response
+            
+            logger.debug("Status %s em %s - nova tentativa em %.2fs", response.status_code, url, delay)
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def _session_get(self, url: str, params: Dict, headers: Dict, timeout: float,
+                     stream: bool, breaker: CircuitBreaker) -> requests.Response:
+        """Uma tentativa do GET, com requisição de reserva se ela passar do p95 do endpoint (RD_HEDGING=1)
+        
+        A reserva sai por outra conexão do pool e vale a resposta que chegar
+        primeiro. Só há reserva com o circuito fechado, prazo suficiente,
+        crédito no limite de reservas e um token livre no controle de taxa.
+        A latência registrada conta desde o envio da original; com
+        stream=True ela vai só até os cabeçalhos (o corpo é lido depois).
+        """
+        tracker = get_latency_tracker(self.base_url, endpoint_family(url))
+        send = lambda: self.session.get(
+            url, headers=headers, params=params, timeout=(min(CONNECT_TIMEOUT, timeout), timeout), stream=stream
+        )
+        if not HEDGING_ENABLED:
+            return tracker.timed(send)
+        
+        self.hedge_budget.record_request()
+        delay = tracker.hedge_delay()
+        # `timeout` já está limitado ao prazo da execução: reserva só se ainda houver tempo depois do p95
+        if delay is None or delay >= timeout or not breaker.is_closed:
+            return tracker.timed(send)
+        return hedged(send, delay, self.hedge_budget, lambda: self.rate_limiter.acquire(timeout=0), tracker)
+
+    @staticmethod
+    def _can_wait(delay: float) -> bool:
+        """Indica se o prazo da execução comporta esperar `delay` segundos e tentar de novo"""
+        left = remaining()
+        return left is None or left > delay + MIN_REQUEST_TIMEOUT
+
+    @staticmethod
+    def _shared_request(key: tuple, fn: Callable[[], Any]) -> Any:
+        """Requisição compartilhada entre chamadas simultâneas, aguardando no máximo o que resta do prazo"""
+        try:
+            return _request_flights.do(key, fn, timeout=remaining())
+        except FlightTimeout as e:
+            raise DeadlineExceeded("Orçamento de tempo esgotado aguardando requisição em andamento") from e
+
+    def _get(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None, timeout: int = 30) -> requests.Response:
+        """Executa um GET reaproveitando as conexões da sessão compartilhada
+        
+        Chamadas concorrentes para o mesmo (endpoint, parâmetros) aguardam a
+        requisição em andamento e recebem a mesma resposta.
+        """
+        headers = headers or self.headers
+        # Quem só aguarda a requisição de outra chamada também depende desta família
+        note_family(endpoint_family(url))
+        key = ("GET",) + make_request_key(url, params, headers)
+        return self._shared_request(
+            key,
+            lambda: self._send(url, params, headers, timeout)
+        )
+
+    def _fetch_deals_page(self, params: Dict, page: int) -> Optional[Dict]:
+        """Busca uma única página do endpoint /api/v1/deals
+        
+        O corpo é lido em blocos e cada deal é reduzido aos campos usados pelo
+        dashboard durante a decodificação (ver backend/api/json_stream.py).
+        """
+        url = f"{self.base_url}/api/v1/deals"
+        page_params = dict(params)
+        page_params["page"] = page
+        
+        def fetch_page() -> Optional[Dict]:
+            response = self._send(url, page_params, self.headers, 30, stream=True)
+            try:
+                if response.status_code != 200:
+                    logger.warning("Erro ao buscar página %s de deals - Status: %s", page, response.status_code)
+                    logger.debug("Response: %s", Lazy(lambda: response.text[:200]))
+                    return None
+                
+                data = decode_projected(response.iter_content(CHUNK_SIZE), "deals")
+            finally:
+                response.close()
+            
+            if isinstance(data, list):
+                return {"deals": data, "total": len(data), "has_more": False}
+            return data
+        
+        note_family(endpoint_family(url))
+        key = ("GET", "deals_page") + make_request_key(url, page_params, self.headers)
+        return self._shared_request(key, fetch_page)
+
+    def _fetch_deals_paginated(self, params: Dict, max_workers: int = MAX_PAGE_WORKERS) -> Optional[Dict]:
+        """Busca todas as páginas de deals, com as páginas restantes em paralelo
+        
+        A primeira página informa `total`/`has_more`; as demais são buscadas
+        concorrentemente e os deals são deduplicados pelo id. Buscas
+        simultâneas com os mesmos parâmetros compartilham o mesmo resultado
+        (quem só aguarda espera no máximo o que resta do próprio prazo).
+        """
+        key = ("deals",) + make_request_key(f"{self.base_url}/api/v1/deals", params)
+        try:
+            data = self._shared_request(key, lambda: self._paginate_deals(params, max_workers))
+        except requests.RequestException as e:
+            logger.warning("Falha na paginação de deals: %s", e)
+            data = None
+        
+        if data is None:
+            return self._stored_deals(params)
+        return data
+
+    def _paginate_deals(self, params: Dict, max_workers: int) -> Optional[Dict]:
+        """Executa a paginação concorrente de /api/v1/deals
+        
+        Se alguma página falhar (mesmo depois das novas tentativas do _send),
+        retorna None: nada parcial é gravado nem cacheado, e quem chamou usa
+        o banco local ou o último resultado bom.
+        """
+        first_page = self._fetch_deals_page(params, 1)
+        if first_page is None:
+            return None
+        
+        first_deals = first_page.get("deals", [])
+        total = first_page.get("total")
+        has_more = first_page.get("has_more", False)
+        pages = [first_deals]
+        
+        if has_more and first_deals:
+            # A API pode limitar o `limit` pedido, então o tamanho real da página vem da resposta
+            page_size = len(first_deals)
+            
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                if isinstance(total, int) and total > page_size:
+                    # Total conhecido: todas as páginas restantes de uma vez
+                    last_page = math.ceil(total / page_size)
+                    results = list(executor.map(in_context(lambda page: self._fetch_deals_page(params, page)), range(2, last_page + 1)))
+                    if not all(results):
+                        # Página que falhou (já com as novas tentativas do _send): nada de resultado parcial
+                        logger.warning("Paginação de deals incompleta - %s de %s páginas falharam",
+                                       results.count(None), len(results) + 1)
+                        return None
+                    pages.extend(result.get("deals", []) for result in results)
+                else:
+                    # Sem total: buscar em lotes de `max_workers` páginas até acabar
+                    next_page = 2
+                    while has_more:
+                        batch = range(next_page, next_page + max_workers)
+                        results = list(executor.map(in_context(lambda page: self._fetch_deals_page(params, page)), batch))
+                        next_page += max_workers
+                        
+                        for result in results:
+                            if result is None:
+                                logger.warning("Paginação de deals incompleta - falha em uma página do lote")
+                                return None
+                            page_deals = result.get("deals", [])
+                            pages.append(page_deals)
+                            if not page_deals or not result.get("has_more", False):
+                                has_more = False
+                                break
+        
+        # Deduplicar pelo id mantendo a ordem de chegada
+        deals_by_id = {}
+        for page_deals in pages:
+            for deal in page_deals:
+                deal_id = deal.get("id") or deal.get("_id") or id(deal)
+                deals_by_id.setdefault(deal_id, deal)
+        
+        deals = list(deals_by_id.values())
+        logger.debug("Paginação de deals concluída - %s páginas, %s deals únicos", len(pages), len(deals))
+        self._persist("upsert_deals", deals)
+        
+        data = dict(first_page)
+        data["deals"] = deals
+        data["total"] = len(deals)
+        data["has_more"] = False
+        return data
+
+    def _fetch_deals_changed_since(self, params: Dict, since) -> Optional[List[Dict]]:
+        """Busca apenas os deals alterados desde `since`
+        
+        Percorre as páginas ordenadas por updated_at decrescente e para no
+        primeiro deal anterior à marca d'água. A primeira página tem
+        CHANGED_FIRST_PAGE_SIZE deals e o tamanho dobra enquanto todos ainda
+        forem novos, então o tráfego acompanha a quantidade de alterações e
+        não o `limit` da consulta. Retorna None se a API não respeitar a
+        ordenação ou o tamanho pedido (o chamador faz a busca completa);
+        uma página que falhar levanta HTTPError, como em _fetch_list_page.
+        """
+        changed_params = dict(params)
+        changed_params["order"] = "updated_at"
+        changed_params["direction"] = "desc"
+        
+        # Tamanhos first * 2^k: cada página começa exatamente onde a anterior terminou
+        limit = min(int(params.get("limit") or API_MAX_PAGE_SIZE), API_MAX_PAGE_SIZE)
+        size = max_size = min(CHANGED_FIRST_PAGE_SIZE, limit)
+        while max_size * 2 <= limit:
+            max_size *= 2
+        
+        changed = []
+        seen = 0
+        while True:
+            changed_params["limit"] = size
+            data = self._fetch_deals_page(changed_params, seen // size + 1)
+            if data is None:
+                # Falha da API (429/5xx/...), não falta de suporte à ordenação
+                raise requests.HTTPError(f"Falha ao buscar a página {seen // size + 1} de deals alterados")
+            
+            page_deals = data.get("deals", [])
+            has_more = data.get("has_more", False)
+            timestamps = [parse_timestamp(deal.get("updated_at")) for deal in page_deals]
+            if None in timestamps or timestamps != sorted(timestamps, reverse=True):
+                logger.debug("Ordenação por updated_at não suportada - fazendo sincronização completa")
+                return None
+            
+            for deal, updated_at in zip(page_deals, timestamps):
+                if updated_at < since:
+                    return changed
+                changed.append(deal)
+            
+            if not page_deals or not has_more:
+                return changed
+            if len(page_deals) != size:
+                logger.debug("API limitou a página a %s deals - fazendo sincronização completa", len(page_deals))
+                return None
+            seen += len(page_deals)
+            size = min(seen, max_size)
+
+    def _fetch_list_page(self, resource: str, url: str, params: Dict, page: int) -> Tuple[List, bool, Optional[int]]:
+        """(registros, has_more, total) de uma página de um recurso listável; HTTPError se a API falhar"""
+        _, key, persist = LIST_RESOURCES[resource]
+        if resource == "deals":
+            data = self._fetch_deals_page(params, page)
+            if data is None:
+                raise requests.HTTPError(f"Falha ao buscar a página {page} de deals")
+        else:
+            response = self._get(url, params=dict(params, page=page) if page > 1 else params)
+            if response.status_code != 200:
+                logger.debug("Response: %s", Lazy(lambda: response.text[:200]))
+                raise requests.HTTPError(f"Status {response.status_code} em {url}", response=response)
+            data = response.json()
+        
+        records = extract_records(data, key)
+        if records is None:
+            logger.debug("Formato de resposta inesperado em %s: %s", url, Lazy(lambda: type(data).__name__))
+            records = []
+        if persist and records:
+            self._persist(persist, records)
+        
+        has_more = bool(records) and isinstance(data, dict) and bool(data.get("has_more", False))
+        total = data.get("total") if isinstance(data, dict) and isinstance(data.get("total"), int) else None
+        return records, has_more, total
+
+    def iter(self, resource: str, **filters) -> Iterator[Dict]:
+        """Percorre os registros de um recurso listável página a página (ex.: iter("deals", limit=200))
+        
+        Os registros de cada página são entregues assim que ela chega, enquanto
+        as páginas seguintes já são buscadas no executor compartilhado (no
+        máximo MAX_PAGE_WORKERS adiante); quem consome pode agregar antes da
+        última página e a listagem nunca precisa ficar inteira em memória. Filtros que aparecem no caminho (ex.: team_id em
+        "team_users") vão para a URL, os demais para a query. O formato da
+        resposta é reconhecido por `extract_records` e as páginas são gravadas
+        no banco local quando o recurso tem tabela. Se a primeira página de
+        deals falhar, os deals equivalentes do banco local são entregues; nos
+        demais casos a falha sobe como requests.HTTPError.
+        """
+        path, _, _ = LIST_RESOURCES[resource]
+        path_params = {name: filters.pop(name) for name in list(filters) if "{" + name + "}" in path}
+        url = self.base_url + path.format(**path_params)
+        params = {"token": self.token, **filters}
+        
+        def fetch(page: int) -> Tuple[List, bool, Optional[int]]:
+            return self._fetch_list_page(resource, url, params, page)
+        
+        try:
+            records, has_more, total = fetch(1)
+        except requests.RequestException:
+            stored = self._stored_deals(params) if resource == "deals" else None
+            if stored is None:
+                raise
+            yield from stored["deals"]
+            return
+        
+        # Com o total conhecido, até MAX_PAGE_WORKERS páginas seguintes ficam em andamento; sem ele, só a próxima
+        last_page = math.ceil(total / len(records)) if total and records else None
+        ahead = MAX_PAGE_WORKERS if last_page else 1
+        executor = get_shared_executor()
+        queued: "deque[Tuple[int, Future]]" = deque()
+        page, next_page = 1, 2
+        try:
+            while True:
+                while has_more and len(queued) < ahead and (last_page is None or next_page <= last_page):
+                    queued.append((next_page, executor.submit(in_context(fetch), next_page)))
+                    next_page += 1
+                logger.debug("%s: página %s com %s registros", resource, page, len(records))
+                yield from records
+                if not has_more or not queued:
+                    return
+                page, future = queued.popleft()
+                records, has_more, _ = _resolve(future, lambda: fetch(page))
+        finally:
+            for _, future in queued:
+                future.cancel()
+
+    def fan_out(self, calls: Dict[str, Callable[[], Any]],
+                deadline: float = FANOUT_DEADLINE) -> Tuple[Dict[str, Any], Dict[str, BaseException]]:
+        """Executa chamadas independentes em paralelo e devolve (resultados, erros) por nome
+        
+        As chamadas rodam no executor compartilhado, então o tempo total é o
+        da mais lenta (limitado a `deadline` segundos, ou ao que resta do
+        prazo da execução, se for menor) e não a soma. Uma
+        chamada que falha ou não termina no prazo aparece só em `erros` e as
+        demais são devolvidas normalmente (resultado parcial).
+        """
+        executor = get_shared_executor()
+        futures = {executor.submit(in_context(call)): name for name, call in calls.items()}
+        left = remaining()
+        if left is not None:
+            deadline = min(deadline, left)
+        done, not_done = wait(futures, timeout=deadline)
+        
+        results: Dict[str, Any] = {}
+        errors: Dict[str, BaseException] = {}
+        for future in done:
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                errors[name] = e
+                logger.warning("Falha na consulta '%s': %s", name, e)
+        for future in not_done:
+            future.cancel()
+            name = futures[future]
+            errors[name] = TimeoutError(f"prazo de {deadline:g}s esgotado")
+            logger.warning("Consulta '%s' não terminou em %gs", name, deadline)
+        
+        return results, errors
+
+    def sync_deals(self, params: Dict) -> Optional[DealBatch]:
+        """Sincroniza incrementalmente os deals de uma consulta
+        
+        A primeira chamada (e a cada FULL_SYNC_INTERVAL) baixa a consulta
+        inteira; as seguintes pedem apenas os deals com updated_at a partir da
+        maior marca já vista e os mesclam pelo id no resultado anterior.
+        """
+        if not INCREMENTAL_SYNC_ENABLED:
+            return self._stamped(DealBatch.from_payload(self._fetch_deals_paginated(params)))
+        
+        if DAY_BUCKETS_ENABLED and params.get("start_date") and params.get("end_date"):
+            return self._sync_deals_by_day(params)
+        
+        state = self._sync_state(("deals",) + make_request_key(f"{self.base_url}/api/v1/deals", params), DealSyncState)
+        
+        with state.lock:
+            changed = None
+            if not state.needs_full_sync():
+                try:
+                    changed = self._fetch_deals_changed_since(params, state.high_water_mark)
+                except requests.RequestException as e:
+                    logger.warning("Falha na sincronização incremental: %s", e)
+            
+            if changed is not None:
+                state.merge(changed)
+                self._persist("upsert_deals", changed)
+                logger.debug("Sincronização incremental - %s deals alterados", len(changed))
+            else:
+                data = self._fetch_deals_paginated(params)
+                if data is None or data.get("source") == "local_store":
+                    # Dados do banco local não substituem o estado sincronizado
+                    return self._stamped(DealBatch.from_payload(data))
+                state.replace(data.get("deals", []))
+            
+            return state.snapshot()
     
-    @st.cache_data(ttl=300)
-    def fetch_crm_data(_self, start_date: str, end_date: str) -> Optional[Dict]:
+    @staticmethod
+    def _stamped(batch: Optional[DealBatch]) -> Optional[DealBatch]:
+        """Carimba a versão do conteúdo no lote buscado (ver DealBatch.fingerprint)"""
+        if batch is not None:
+            batch.fingerprint()
+        return batch
+
+    def _sync_state(self, key: tuple, factory):
+        """Estado de sincronização da consulta `key` (os menos usados são descartados)"""
+        with self._sync_states_lock:
+            state = self._sync_states.get(key)
+            if state is None:
+                state = factory()
+                self._sync_states[key] = state
+                while len(self._sync_states) > MAX_SYNC_STATES:
+                    self._sync_states.popitem(last=False)
+            self._sync_states.move_to_end(key)
+        return state
+
+    def _sync_deals_by_day(self, params: Dict) -> Optional[DealBatch]:
+        """Sincroniza um intervalo de datas a partir do cache de deals por dia de criação
+        
+        Os dias já baixados de qualquer intervalo anterior são reaproveitados;
+        só os dias ausentes (ou vencidos) são buscados, em blocos contíguos, e
+        as alterações nos demais chegam pela sincronização incremental. Assim
+        a virada do dia na janela deslizante custa um ou dois dias de tráfego.
+        """
+        start = date.fromisoformat(str(params["start_date"])[:10])
+        end = date.fromisoformat(str(params["end_date"])[:10])
+        base_params = {k: v for k, v in params.items() if k not in ("start_date", "end_date")}
+        state = self._sync_state(
+            ("deal_days",) + make_request_key(f"{self.base_url}/api/v1/deals", base_params), DayBucketState
+        )
+        
+        with state.lock:
+            # 1. Alterações nos dias já baixados (antes de baixar dias novos, para não pular a marca d'água)
+            span = state.covered_span()
+            refetch_recent = span is not None
+            if span is not None and state.incremental_supported and state.high_water_mark is not None:
+                changed, failed = None, False
+                try:
+                    changed_params = dict(base_params, start_date=span[0].isoformat(), end_date=span[1].isoformat())
+                    changed = self._fetch_deals_changed_since(changed_params, state.high_water_mark)
+                except requests.RequestException as e:
+                    failed = True
+                    logger.warning("Falha na sincronização incremental por dia: %s", e)
+                
+                if changed is not None:
+                    state.merge(changed)
+                    self._persist("upsert_deals", changed)
+                    refetch_recent = False
+                    logger.debug("Sincronização incremental por dia - %s deals alterados", len(changed))
+                elif not failed:
+                    # API sem ordenação por updated_at: daqui em diante só os dias recentes são rebaixados
+                    state.incremental_supported = False
+            
+            # 2. Dias ausentes (e, sem incremental, os mais recentes) buscados em blocos contíguos
+            missing = set(state.missing_days(start, end))
+            if refetch_recent:
+                recent_start = max(start, date.today() - timedelta(days=RECENT_DAYS))
+                missing.update(day_range(recent_start, end) if recent_start <= end else [])
+            
+            for first, last in contiguous_runs(sorted(missing)):
+                run_params = dict(base_params, start_date=first.isoformat(), end_date=last.isoformat())
+                data = self._fetch_deals_paginated(run_params)
+                if data is None or data.get("source") == "local_store":
+                    # Sem a API, o intervalo inteiro vem do banco local (sem alterar o cache por dia)
+                    return self._stamped(DealBatch.from_payload(self._stored_deals(params)))
+                state.fill(first, last, data.get("deals", []))
+            
+            if missing:
+                logger.debug("Deals por dia - %s de %s dias buscados na API", len(missing), (end - start).days + 1)
+            
+            return state.assemble(start, end)
+
+    @cached("crm_deals")
+    def fetch_crm_data(_self, start_date: str, end_date: str) -> Optional[DealBatch]:
         """Busca dados do RD Station CRM"""
         try:
-            url = f"{_self.base_url}/api/v1/deals"
-            
             params = {
                 "token": _self.token,
                 "start_date": start_date,
@@ -28,58 +817,28 @@ class RDStationClient:
                 "limit": 1000  # Aumentar de 100 para 1000 para dados completos
             }
             
-            response = requests.get(url, headers=_self.headers, params=params, timeout=30)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return None
+            return _self.sync_deals(params)
                 
         except Exception as e:
             return None
 
-    @st.cache_data(ttl=300)
+    @cached("stages")
     def fetch_real_stages(_self) -> Optional[List]:
         """Busca as etapas reais dos funis de vendas"""
         try:
-            url = f"{_self.base_url}/api/v1/deal_stages"
-            params = {"token": _self.token}
-            
-            response = requests.get(url, headers=_self.headers, params=params, timeout=30)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if "deal_stages" in data:
-                    return data["deal_stages"]
-                else:
-                    return data
-            else:
-                return None
-                
+            return list(_self.iter("deal_stages"))
         except Exception as e:
-            return None
+            logger.warning("Exception em fetch_real_stages: %s", e)
+            return _self._stored_stages()
 
-    @st.cache_data(ttl=300)
+    @cached("pipeline_stages")
     def fetch_pipeline_stages(_self) -> Optional[Dict]:
         """Busca funis e etapas do RD Station CRM"""
         try:
             url = f"{_self.base_url}/api/v1/deal_pipelines"
             
-            # Tentar primeiro com Authorization header
-            headers = {
-                "accept": "application/json",
-                "Authorization": f"Bearer {_self.token}"
-            }
-            
-            response = requests.get(url, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                return response.json()
-            
-            # Se falhou, tentar com token como parâmetro
-            params = {"token": _self.token}
-            
-            response = requests.get(url, headers=_self.headers, params=params, timeout=30)
+            # O esquema de autenticação (Bearer ou token como parâmetro) é negociado em _send
+            response = _self._get(url)
             
             if response.status_code == 200:
                 return response.json()
@@ -89,17 +848,13 @@ class RDStationClient:
         except Exception as e:
             return None
 
-    @st.cache_data(ttl=300)
+    @cached("stage_details")
     def fetch_stage_details(_self, stage_id: str) -> Optional[Dict]:
         """Busca detalhes de uma etapa específica"""
         try:
             url = f"{_self.base_url}/api/v1/deal_stages/{stage_id}"
-            headers = {
-                "accept": "application/json",
-                "Authorization": f"Bearer {_self.token}"
-            }
             
-            response = requests.get(url, headers=headers, timeout=30)
+            response = _self._get(url)
             
             if response.status_code == 200:
                 return response.json()
@@ -109,14 +864,14 @@ class RDStationClient:
         except Exception as e:
             return None
 
-    @st.cache_data(ttl=300)
+    @cached("team_pipelines")
     def fetch_team_pipelines(_self) -> Optional[List]:
         """Busca funis específicos das equipes Bulls e Fenix"""
         try:
             url = f"{_self.base_url}/api/v1/deal_pipelines"
             params = {"token": _self.token}
             
-            response = requests.get(url, headers=_self.headers, params=params, timeout=30)
+            response = _self._get(url, params=params)
             
             if response.status_code == 200:
                 all_pipelines = response.json()
@@ -135,8 +890,8 @@ class RDStationClient:
         except Exception as e:
             return None
 
-    @st.cache_data(ttl=30)
-    def fetch_house_funnel_data(_self, start_date: str, end_date: str) -> Optional[Dict]:
+    @cached("house_deals")
+    def fetch_house_funnel_data(_self, start_date: str, end_date: str) -> Optional[DealBatch]:
         """Busca dados específicos do Funil - HOUSE"""
         try:
             url = f"{_self.base_url}/api/v1/deals"
@@ -149,42 +904,38 @@ class RDStationClient:
                 "deal_pipeline_id": "689b59706e704a0024fc2374"  # ID do Funil - HOUSE
             }
             
-            print(f"🔍 DEBUG: Buscando deals do FUNIL HOUSE específico")
-            print(f"🔍 DEBUG: URL: {url}")
-            print(f"🔍 DEBUG: Params: {params}")
-            print(f"🔍 DEBUG: Funil ID: 689b59706e704a0024fc2374 (HOUSE)")
+            logger.debug("Buscando deals do FUNIL HOUSE específico")
+            logger.debug("URL: %s", url)
+            logger.debug("Params: %s", Lazy(lambda: redact_params(params)))
+            logger.debug("Funil ID: 689b59706e704a0024fc2374 (HOUSE)")
             
-            response = requests.get(url, headers=_self.headers, params=params, timeout=30)
+            data = _self.sync_deals(params)
             
-            print(f"🔍 DEBUG: Status Code: {response.status_code}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                deals_count = len(data.get('deals', []))
-                print(f"🔍 DEBUG: Deals do FUNIL HOUSE encontrados: {deals_count}")
+            if data is not None:
+                deals_count = len(data)
+                logger.debug("Deals do FUNIL HOUSE encontrados: %s", deals_count)
                 
                 # Verificar se os deals realmente pertencem ao funil HOUSE
                 if deals_count > 0:
-                    first_deal = data['deals'][0]
-                    pipeline_info = first_deal.get('deal_pipeline', {})
-                    pipeline_id = pipeline_info.get('id')
-                    pipeline_name = pipeline_info.get('name', 'N/A')
-                    print(f"🔍 DEBUG: Primeiro deal - Pipeline: {pipeline_name} (ID: {pipeline_id})")
-                    print(f"🔍 DEBUG: Confirmação: Este deal pertence ao funil HOUSE? {'SIM' if pipeline_id == '689b59706e704a0024fc2374' else 'NÃO'}")
+                    first_deal = data[0]
+                    pipeline_id = first_deal.pipeline_id
+                    pipeline_name = first_deal.pipeline_name or 'N/A'
+                    logger.debug("Primeiro deal - Pipeline: %s (ID: %s)", pipeline_name, pipeline_id)
+                    logger.debug("Confirmação: Este deal pertence ao funil HOUSE? %s", 'SIM' if pipeline_id == '689b59706e704a0024fc2374' else 'NÃO')
                 
                 return data
             else:
-                print(f"🔍 DEBUG: Erro na requisição de deals HOUSE - Status: {response.status_code}")
-                print(f"🔍 DEBUG: Response: {response.text[:200]}")
+                logger.warning("Erro na requisição de deals HOUSE")
                 return None
                 
         except Exception as e:
-            print(f"🔍 DEBUG: Exception: {str(e)}")
+            logger.warning("Exception: %s", e)
             return None
 
-    @st.cache_data(ttl=300)
+    @cached("house_stages")
     def fetch_house_funnel_stages(_self) -> Optional[List]:
         """Busca etapas específicas do Funil - HOUSE"""
+        sample = LogSampler(logger)
         try:
             url = f"{_self.base_url}/api/v1/deal_stages"
             params = {
@@ -192,44 +943,45 @@ class RDStationClient:
                 "deal_pipeline_id": "689b59706e704a0024fc2374"  # ID do Funil - HOUSE
             }
             
-            print(f"DEBUG: Buscando etapas do HOUSE em: {url}")
-            print(f"DEBUG: Headers: {_self.headers}")
-            print(f"DEBUG: Params: {params}")
+            logger.debug("Buscando etapas do HOUSE em: %s", url)
+            logger.debug("Params: %s", Lazy(lambda: redact_params(params)))
             
-            response = requests.get(url, headers=_self.headers, params=params, timeout=30)
+            response = _self._get(url, params=params)
             
-            print(f"DEBUG: Status Code: {response.status_code}")
-            print(f"DEBUG: Response Text (primeiros 200 chars): {response.text[:200]}")
+            logger.debug("Status Code: %s", response.status_code)
+            logger.debug("Response Text (primeiros 200 chars): %s", Lazy(lambda: response.text[:200]))
             
             if response.status_code == 200:
                 data = response.json()
-                print(f"DEBUG: Data keys: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
+                logger.debug("Data keys: %s", Lazy(lambda: list(data.keys()) if isinstance(data, dict) else 'Not a dict'))
                 
                 if "deal_stages" in data:
                     stages = data["deal_stages"]
-                    print(f"DEBUG: Total de etapas do HOUSE encontradas: {len(stages)}")
+                    logger.debug("Total de etapas do HOUSE encontradas: %s", len(stages))
                     
                     # Verificar se as etapas são realmente do HOUSE
                     for i, stage in enumerate(stages):
                         pipeline_info = stage.get("deal_pipeline", {})
                         pipeline_id = pipeline_info.get("id")
                         pipeline_name = pipeline_info.get("name", "N/A")
-                        print(f"DEBUG: Etapa {i+1}: {stage.get('name', 'N/A')} - Pipeline: {pipeline_name} (ID: {pipeline_id})")
+                        sample.debug("Etapa %s: %s - Pipeline: %s (ID: %s)", i+1, stage.get('name', 'N/A'), pipeline_name, pipeline_id)
+                    sample.summary()
                     
+                    _self._persist("upsert_stages", stages)
                     return stages
                 else:
-                    print(f"DEBUG: 'deal_stages' não encontrado nos dados")
+                    logger.debug("'deal_stages' não encontrado nos dados")
                     return data
             else:
-                print(f"DEBUG: Erro na requisição - Status: {response.status_code}")
-                return None
+                logger.warning("Erro na requisição - Status: %s", response.status_code)
+                return _self._stored_stages("689b59706e704a0024fc2374")
                 
         except Exception as e:
-            print(f"DEBUG: Exception: {str(e)}")
-            return None
+            logger.warning("Exception: %s", e)
+            return _self._stored_stages("689b59706e704a0024fc2374")
 
-    @st.cache_data(ttl=30)
-    def fetch_all_funnel_data(_self, start_date: str, end_date: str) -> Optional[Dict]:
+    @cached("all_deals")
+    def fetch_all_funnel_data(_self, start_date: str, end_date: str) -> Optional[DealBatch]:
         """Busca dados de todos os funis para comparar usuários"""
         try:
             url = f"{_self.base_url}/api/v1/deals"
@@ -241,998 +993,520 @@ class RDStationClient:
                 "limit": 500  # Aumentar limite para pegar mais dados
             }
             
-            print(f"🔍 DEBUG: Buscando TODOS os deals (SEM filtro de funil)")
-            print(f"🔍 DEBUG: URL: {url}")
-            print(f"🔍 DEBUG: Params: {params}")
-            print(f"🔍 DEBUG: ⚠️  ATENÇÃO: Esta função busca deals de TODOS os funis, não apenas HOUSE!")
-            
-            response = requests.get(url, headers=_self.headers, params=params, timeout=30)
+            logger.debug("Buscando TODOS os deals (SEM filtro de funil)")
+            logger.debug("URL: %s", url)
+            logger.debug("Params: %s", Lazy(lambda: redact_params(params)))
+            logger.debug("⚠️  ATENÇÃO: Esta função busca deals de TODOS os funis, não apenas HOUSE!")
             
-            print(f"🔍 DEBUG: Status Code: {response.status_code}")
+            data = _self.sync_deals(params)
             
-            if response.status_code == 200:
-                data = response.json()
-                deals_count = len(data.get('deals', []))
-                print(f"🔍 DEBUG: Total de deals encontrados (TODOS os funis): {deals_count}")
+            if data is not None:
+                deals_count = len(data)
+                logger.debug("Total de deals encontrados (TODOS os funis): %s", deals_count)
                 
                 # Verificar a distribuição dos deals por funil
                 if deals_count > 0:
                     pipeline_counts = {}
-                    for deal in data['deals'][:10]:  # Verificar apenas os primeiros 10
-                        pipeline_info = deal.get('deal_pipeline', {})
-                        pipeline_name = pipeline_info.get('name', 'Sem nome')
+                    for i in range(min(deals_count, 10)):  # Verificar apenas os primeiros 10
+                        pipeline_name = data[i].pipeline_name or 'Sem nome'
                         pipeline_counts[pipeline_name] = pipeline_counts.get(pipeline_name, 0) + 1
                     
-                    print(f"🔍 DEBUG: Distribuição dos primeiros 10 deals por funil:")
+                    logger.debug("Distribuição dos primeiros 10 deals por funil:")
                     for pipeline_name, count in pipeline_counts.items():
-                        print(f"🔍 DEBUG:   - {pipeline_name}: {count} deals")
+                        logger.debug("  - %s: %s deals", pipeline_name, count)
                 
                 return data
             else:
-                print(f"🔍 DEBUG: Erro na requisição - Status: {response.status_code}")
+                logger.warning("Erro na requisição de todos os deals")
                 return None
                 
         except Exception as e:
-            print(f"🔍 DEBUG: Exception: {str(e)}")
+            logger.warning("Exception: %s", e)
             return None
 
-    @st.cache_data(ttl=300)
+    @cached("all_users")
     def fetch_all_users(_self, start_date: str, end_date: str) -> Optional[List[str]]:
         """Descobre todos os usuários disponíveis no funil HOUSE"""
         try:
             # Buscar dados de todos os deals
             deals_data = _self.fetch_house_funnel_data(start_date, end_date)
             
-            if not deals_data or "deals" not in deals_data:
-                print(f"DEBUG: Nenhum dado de deals encontrado")
+            if deals_data is None or len(deals_data) == 0:
+                logger.debug("Nenhum dado de deals encontrado")
                 return []
             
-            deals = deals_data["deals"]
-            print(f"DEBUG: Total de deals encontrados: {len(deals)}")
-            
-            users = set()
+            logger.debug("Total de deals encontrados: %s", len(deals_data))
             
             # Extrair todos os usuários únicos
-            for i, deal in enumerate(deals):
-                if "user" in deal and deal["user"]:
-                    user_info = deal["user"]
-                    if isinstance(user_info, dict) and "name" in user_info:
-                        user_name = user_info["name"].strip()
-                        if user_name:  # Só adicionar se não for vazio
-                            users.add(user_name)
-                            print(f"DEBUG: Usuário {i+1}: '{user_name}'")
-                    else:
-                        print(f"DEBUG: Deal {i+1} - user_info inválido: {user_info}")
-                else:
-                    print(f"DEBUG: Deal {i+1} - sem usuário ou usuário vazio")
-            
-            # Ordenar usuários alfabeticamente
-            sorted_users = sorted(list(users))
-            print(f"DEBUG: Total de usuários únicos encontrados: {len(sorted_users)}")
-            print(f"DEBUG: Lista completa de usuários: {sorted_users}")
+            sorted_users = deals_data.user_names()
+            logger.debug("Total de usuários únicos encontrados: %s", len(sorted_users))
+            logger.debug("Lista completa de usuários: %s", sorted_users)
             
             return sorted_users
             
         except Exception as e:
-            print(f"DEBUG: Exception em fetch_all_users: {str(e)}")
+            logger.warning("Exception em fetch_all_users: %s", e)
             return []
 
-    @st.cache_data(ttl=300)
+    @cached("house_users")
     def fetch_house_users(_self, start_date: str, end_date: str) -> Optional[List[str]]:
         """Descobre todos os usuários do Funil - HOUSE"""
         try:
             # Buscar dados específicos do Funil - HOUSE
             deals_data = _self.fetch_house_funnel_data(start_date, end_date)
             
-            if not deals_data or "deals" not in deals_data:
-                print(f"DEBUG: Nenhum dado de deals do HOUSE encontrado")
+            if deals_data is None or len(deals_data) == 0:
+                logger.debug("Nenhum dado de deals do HOUSE encontrado")
                 return []
             
-            deals = deals_data["deals"]
-            print(f"DEBUG: Total de deals do HOUSE encontrados: {len(deals)}")
-            
-            users = set()
+            logger.debug("Total de deals do HOUSE encontrados: %s", len(deals_data))
             
             # Extrair todos os usuários únicos do HOUSE
-            for i, deal in enumerate(deals):
-                if "user" in deal and deal["user"]:
-                    user_info = deal["user"]
-                    if isinstance(user_info, dict) and "name" in user_info:
-                        user_name = user_info["name"].strip()
-                        if user_name:  # Só adicionar se não for vazio
-                            users.add(user_name)
-                            print(f"DEBUG: Usuário HOUSE {i+1}: '{user_name}'")
-                    else:
-                        print(f"DEBUG: Deal HOUSE {i+1} - user_info inválido: {user_info}")
-                else:
-                    print(f"DEBUG: Deal HOUSE {i+1} - sem usuário ou usuário vazio")
-            
-            # Ordenar usuários alfabeticamente
-            sorted_users = sorted(list(users))
-            print(f"DEBUG: Total de usuários únicos do HOUSE: {len(sorted_users)}")
-            print(f"DEBUG: Lista completa de usuários do HOUSE: {sorted_users}")
+            sorted_users = deals_data.user_names()
+            logger.debug("Total de usuários únicos do HOUSE: %s", len(sorted_users))
+            logger.debug("Lista completa de usuários do HOUSE: %s", sorted_users)
             
             return sorted_users
             
         except Exception as e:
-            print(f"DEBUG: Exception em fetch_house_users: {str(e)}")
+            logger.warning("Exception em fetch_house_users: %s", e)
             return []
 
-    @st.cache_data(ttl=300)
+    @cached("team_users")
     def fetch_team_users(_self, team_id: str) -> Optional[List[str]]:
         """Busca usuários de uma equipe específica"""
+        sample = LogSampler(logger)
         try:
-            url = f"{_self.base_url}/api/v1/teams/{team_id}/users"
-            
-            params = {
-                "token": _self.token
-            }
-            
-            print(f"DEBUG: Buscando usuários da equipe {team_id} em: {url}")
-            print(f"DEBUG: Params: {params}")
-            
-            response = requests.get(url, headers=_self.headers, params=params, timeout=30)
+            logger.debug("Buscando usuários da equipe %s", team_id)
+            
+            users = []
+            for i, user in enumerate(_self.iter("team_users", team_id=team_id)):
+                user_name = record_name(user) if isinstance(user, dict) else None
+                if user_name:
+                    users.append(user_name)
+                    sample.debug("Usuário da equipe %s: '%s'", i+1, user_name)
+                else:
+                    sample.debug("Usuário da equipe %s - sem nome válido ou formato inválido: %s", i+1, user)
+            sample.summary()
             
-            print(f"DEBUG: Status Code: {response.status_code}")
+            # Ordenar usuários alfabeticamente
+            sorted_users = sorted(list(set(users)))  # Remove duplicatas
+            logger.debug("Total de usuários únicos da equipe %s: %s", team_id, len(sorted_users))
+            logger.debug("Lista completa de usuários da equipe: %s", sorted_users)
             
-            if response.status_code == 200:
-                data = response.json()
-                print(f"DEBUG: Data keys: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
-                
-                users = []
-                
-                # Verificar diferentes estruturas possíveis da resposta
-                if isinstance(data, dict):
-                    if "users" in data:
-                        users_data = data["users"]
-                        print(f"DEBUG: Encontrados {len(users_data)} usuários na chave 'users'")
-                    elif "data" in data:
-                        users_data = data["data"]
-                        print(f"DEBUG: Encontrados {len(users_data)} usuários na chave 'data'")
-                    else:
-                        users_data = data
-                        print(f"DEBUG: Usando dados diretos, chaves: {list(data.keys())}")
-                elif isinstance(data, list):
-                    users_data = data
-                    print(f"DEBUG: Dados são uma lista com {len(data)} itens")
-                else:
-                    print(f"DEBUG: Tipo de dados inesperado: {type(data)}")
-                    return []
-                
-                # Extrair nomes dos usuários
-                for i, user in enumerate(users_data):
-                    if isinstance(user, dict):
-                        # Tentar diferentes campos possíveis para o nome
-                        user_name = None
-                        for field in ["name", "full_name", "display_name", "username"]:
-                            if field in user and user[field]:
-                                user_name = user[field].strip()
-                                break
-                        
-                        if user_name:
-                            users.append(user_name)
-                            print(f"DEBUG: Usuário da equipe {i+1}: '{user_name}'")
-                        else:
-                            print(f"DEBUG: Usuário da equipe {i+1} - sem nome válido: {user}")
-                    else:
-                        print(f"DEBUG: Usuário da equipe {i+1} - formato inválido: {user}")
-                
-                # Ordenar usuários alfabeticamente
-                sorted_users = sorted(list(set(users)))  # Remove duplicatas
-                print(f"DEBUG: Total de usuários únicos da equipe {team_id}: {len(sorted_users)}")
-                print(f"DEBUG: Lista completa de usuários da equipe: {sorted_users}")
-                
-                return sorted_users
-            else:
-                print(f"DEBUG: Erro na requisição - Status: {response.status_code}")
-                print(f"DEBUG: Response: {response.text}")
-                return []
+            return sorted_users
                 
         except Exception as e:
-            print(f"DEBUG: Exception em fetch_team_users: {str(e)}")
+            logger.warning("Exception em fetch_team_users: %s", e)
             return []
 
-    @st.cache_data(ttl=300)
+    @cached("teams")
     def fetch_teams_directly(_self) -> Optional[Dict]:
         """Busca todas as equipes diretamente do endpoint /api/v1/teams"""
+        sample = LogSampler(logger)
         try:
-            url = f"{_self.base_url}/api/v1/teams"
-            
-            params = {
-                "token": _self.token
-            }
-            
-            print(f"DEBUG: Buscando equipes diretamente em: {url}")
-            print(f"DEBUG: Params: {params}")
-            print(f"DEBUG: Headers: {_self.headers}")
-            
-            response = requests.get(url, headers=_self.headers, params=params, timeout=30)
-            
-            print(f"DEBUG: Status Code: {response.status_code}")
-            print(f"DEBUG: Response Headers: {dict(response.headers)}")
-            print(f"DEBUG: Response Text (primeiros 1000 chars): {response.text[:1000]}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                print(f"DEBUG: Data type: {type(data)}")
-                print(f"DEBUG: Data keys: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
-                
-                # Verificar diferentes estruturas possíveis da resposta
-                if isinstance(data, dict):
-                    if "teams" in data:
-                        teams_data = data["teams"]
-                        print(f"DEBUG: Encontradas {len(teams_data)} equipes na chave 'teams'")
-                    elif "data" in data:
-                        teams_data = data["data"]
-                        print(f"DEBUG: Encontradas {len(teams_data)} equipes na chave 'data'")
-                    else:
-                        teams_data = data
-                        print(f"DEBUG: Usando dados diretos, chaves: {list(data.keys())}")
-                elif isinstance(data, list):
-                    teams_data = data
-                    print(f"DEBUG: Dados são uma lista com {len(data)} itens")
-                else:
-                    print(f"DEBUG: Tipo de dados inesperado: {type(data)}")
-                    return {}
+            logger.debug("Buscando equipes diretamente em: %s/api/v1/teams", _self.base_url)
+            
+            # Processar equipes à medida que as páginas chegam
+            teams_info = {}
+            for i, team in enumerate(_self.iter("teams")):
+                if not isinstance(team, dict):
+                    sample.debug("Equipe %s - formato inválido: %s", i+1, team)
+                    continue
                 
-                # Processar equipes
-                teams_info = {}
-                print(f"DEBUG: Iniciando processamento de {len(teams_data)} equipes")
+                team_id = team.get("id", f"team_{i}")
+                team_name = team.get("name", f"Equipe {i+1}")
                 
-                for i, team in enumerate(teams_data):
-                    print(f"DEBUG: Processando equipe {i+1}: {team}")
-                    
-                    if isinstance(team, dict):
-                        team_id = team.get("id", f"team_{i}")
-                        team_name = team.get("name", f"Equipe {i+1}")
-                        
-                        print(f"DEBUG: Equipe {i+1} - ID: {team_id}, Nome: {team_name}")
-                        
-                        # Extrair usuários da equipe
-                        users = []
-                        if "team_users" in team:
-                            print(f"DEBUG: Equipe {i+1} tem campo 'team_users': {team['team_users']}")
-                            if isinstance(team["team_users"], list):
-                                print(f"DEBUG: Equipe {i+1} tem {len(team['team_users'])} usuários na lista")
-                                for j, user in enumerate(team["team_users"]):
-                                    print(f"DEBUG: Processando usuário {j+1} da equipe {i+1}: {user}")
-                                    if isinstance(user, dict):
-                                        user_name = None
-                                        for field in ["name", "full_name", "display_name", "username"]:
-                                            if field in user and user[field]:
-                                                user_name = user[field].strip()
-                                                print(f"DEBUG: Usuário {j+1} - campo '{field}': '{user_name}'")
-                                                break
-                                        
-                                        if user_name:
-                                            users.append(user_name)
-                                            print(f"DEBUG: Usuário {j+1} adicionado: '{user_name}'")
-                                        else:
-                                            print(f"DEBUG: Usuário {j+1} - sem nome válido: {user}")
-                                    else:
-                                        print(f"DEBUG: Usuário {j+1} - formato inválido: {user}")
-                            else:
-                                print(f"DEBUG: Equipe {i+1} - campo 'team_users' não é lista: {type(team['team_users'])}")
-                        elif "users" in team:
-                            print(f"DEBUG: Equipe {i+1} tem campo 'users': {team['users']}")
-                            if isinstance(team["users"], list):
-                                print(f"DEBUG: Equipe {i+1} tem {len(team['users'])} usuários na lista")
-                                for j, user in enumerate(team["users"]):
-                                    print(f"DEBUG: Processando usuário {j+1} da equipe {i+1}: {user}")
-                                    if isinstance(user, dict):
-                                        user_name = None
-                                        for field in ["name", "full_name", "display_name", "username"]:
-                                            if field in user and user[field]:
-                                                user_name = user[field].strip()
-                                                print(f"DEBUG: Usuário {j+1} - campo '{field}': '{user_name}'")
-                                                break
-                                        
-                                        if user_name:
-                                            users.append(user_name)
-                                            print(f"DEBUG: Usuário {j+1} adicionado: '{user_name}'")
-                                        else:
-                                            print(f"DEBUG: Usuário {j+1} - sem nome válido: {user}")
-                                    else:
-                                        print(f"DEBUG: Usuário {j+1} - formato inválido: {user}")
-                            else:
-                                print(f"DEBUG: Equipe {i+1} - campo 'users' não é lista: {type(team['users'])}")
+                # Extrair usuários da equipe (campo 'team_users' ou 'users')
+                users = []
+                field = "team_users" if "team_users" in team else "users" if "users" in team else None
+                if field is None:
+                    sample.debug("Equipe %s - sem campo 'team_users' ou 'users'", i+1)
+                elif not isinstance(team[field], list):
+                    sample.debug("Equipe %s - campo '%s' não é lista: %s", i+1, field, type(team[field]))
+                else:
+                    for j, user in enumerate(team[field]):
+                        user_name = record_name(user) if isinstance(user, dict) else None
+                        if user_name:
+                            users.append(user_name)
                         else:
-                            print(f"DEBUG: Equipe {i+1} - sem campo 'team_users' ou 'users'")
-                        
-                        teams_info[team_name] = {
-                            "id": team_id,
-                            "name": team_name,
-                            "users": users
-                        }
-                        
-                        print(f"DEBUG: Equipe {i+1} finalizada: '{team_name}' (ID: {team_id}) - {len(users)} usuários")
-                        for j, user in enumerate(users, 1):
-                            print(f"  - Usuário {j}: '{user}'")
-                    else:
-                        print(f"DEBUG: Equipe {i+1} - formato inválido: {team}")
-                
-                print(f"DEBUG: Total de equipes processadas: {len(teams_info)}")
-                print(f"DEBUG: Equipes encontradas: {list(teams_info.keys())}")
-                
-                # Verificar se há usuários
-                total_users = sum(len(team_info['users']) for team_info in teams_info.values())
-                print(f"DEBUG: Total de usuários em todas as equipes: {total_users}")
+                            sample.debug("Usuário %s da equipe %s - sem nome válido ou formato inválido: %s", j+1, i+1, user)
                 
-                return teams_info
-            else:
-                print(f"DEBUG: Erro na requisição - Status: {response.status_code}")
-                print(f"DEBUG: Response: {response.text}")
-                return {}
+                teams_info[team_name] = {
+                    "id": team_id,
+                    "name": team_name,
+                    "users": users
+                }
+                sample.debug("Equipe %s: '%s' (ID: %s) - %s usuários: %s", i+1, team_name, team_id, len(users), users)
+            sample.summary()
+            
+            logger.debug("Total de equipes processadas: %s", len(teams_info))
+            logger.debug("Equipes encontradas: %s", Lazy(lambda: list(teams_info.keys())))
+            logger.debug("Total de usuários em todas as equipes: %s",
+                         Lazy(lambda: sum(len(team_info['users']) for team_info in teams_info.values())))
+            
+            _self._persist("replace_teams", teams_info)
+            return teams_info
                 
         except Exception as e:
-            print(f"DEBUG: Exception em fetch_teams_directly: {str(e)}")
-            import traceback
-            print(f"DEBUG: Traceback: {traceback.format_exc()}")
-            return {}
+            logger.warning("Exception em fetch_teams_directly: %s", e, exc_info=True)
+            return _self._stored_teams()
 
-    @st.cache_data(ttl=300)
+    @cached("users")
     def fetch_users_directly(_self) -> Optional[List[str]]:
         """Busca todos os usuários diretamente do endpoint /api/v1/users"""
+        sample = LogSampler(logger)
         try:
-            url = f"{_self.base_url}/api/v1/users"
-            
-            params = {
-                "token": _self.token
-            }
-            
-            print(f"DEBUG: Buscando usuários diretamente em: {url}")
-            print(f"DEBUG: Params: {params}")
-            
-            response = requests.get(url, headers=_self.headers, params=params, timeout=30)
+            logger.debug("Buscando usuários diretamente em: %s/api/v1/users", _self.base_url)
+            
+            # Extrair nomes dos usuários à medida que as páginas chegam
+            users = []
+            for i, user in enumerate(_self.iter("users")):
+                user_name = record_name(user) if isinstance(user, dict) else None
+                if user_name:
+                    users.append(user_name)
+                    sample.debug("Usuário %s: '%s'", i+1, user_name)
+                else:
+                    sample.debug("Usuário %s - sem nome válido ou formato inválido: %s", i+1, user)
+            sample.summary()
             
-            print(f"DEBUG: Status Code: {response.status_code}")
-            print(f"DEBUG: Response Text (primeiros 500 chars): {response.text[:500]}")
+            # Ordenar usuários alfabeticamente
+            sorted_users = sorted(list(set(users)))  # Remove duplicatas
+            logger.debug("Total de usuários únicos encontrados: %s", len(sorted_users))
+            logger.debug("Lista completa de usuários: %s", sorted_users)
             
-            if response.status_code == 200:
-                data = response.json()
-                print(f"DEBUG: Data keys: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
-                
-                users = []
-                
-                # Verificar diferentes estruturas possíveis da resposta
-                if isinstance(data, dict):
-                    if "users" in data:
-                        users_data = data["users"]
-                        print(f"DEBUG: Encontrados {len(users_data)} usuários na chave 'users'")
-                    elif "data" in data:
-                        users_data = data["data"]
-                        print(f"DEBUG: Encontrados {len(users_data)} usuários na chave 'data'")
-                    else:
-                        users_data = data
-                        print(f"DEBUG: Usando dados diretos, chaves: {list(data.keys())}")
-                elif isinstance(data, list):
-                    users_data = data
-                    print(f"DEBUG: Dados são uma lista com {len(data)} itens")
-                else:
-                    print(f"DEBUG: Tipo de dados inesperado: {type(data)}")
-                    return []
-                
-                # Extrair nomes dos usuários
-                for i, user in enumerate(users_data):
-                    if isinstance(user, dict):
-                        # Tentar diferentes campos possíveis para o nome
-                        user_name = None
-                        for field in ["name", "full_name", "display_name", "username"]:
-                            if field in user and user[field]:
-                                user_name = user[field].strip()
-                                break
-                        
-                        if user_name:
-                            users.append(user_name)
-                            print(f"DEBUG: Usuário {i+1}: '{user_name}'")
-                        else:
-                            print(f"DEBUG: Usuário {i+1} - sem nome válido: {user}")
-                    else:
-                        print(f"DEBUG: Usuário {i+1} - formato inválido: {user}")
-                
-                # Ordenar usuários alfabeticamente
-                sorted_users = sorted(list(set(users)))  # Remove duplicatas
-                print(f"DEBUG: Total de usuários únicos encontrados: {len(sorted_users)}")
-                print(f"DEBUG: Lista completa de usuários: {sorted_users}")
-                
-                return sorted_users
-            else:
-                print(f"DEBUG: Erro na requisição - Status: {response.status_code}")
-                print(f"DEBUG: Response: {response.text}")
-                return []
+            return sorted_users
                 
         except Exception as e:
-            print(f"DEBUG: Exception em fetch_users_directly: {str(e)}")
-            return []
+            logger.warning("Exception em fetch_users_directly: %s", e)
+            return _self._stored_user_names()
 
-    @st.cache_data(ttl=300)
+    @cached("all_users_no_date_limit")
     def fetch_all_users_no_date_limit(_self) -> Optional[List[str]]:
         """Descobre todos os usuários disponíveis no funil sem limite de data"""
+        sample = LogSampler(logger)
         try:
-            url = f"{_self.base_url}/api/v1/deals"
-            
-            params = {
-                "token": _self.token,
-                "limit": 1000  # Limite máximo para pegar todos os dados
-            }
+            logger.debug("Buscando TODOS os deals sem limite de data")
             
-            print(f"DEBUG: Buscando TODOS os deals sem limite de data em: {url}")
-            print(f"DEBUG: Params: {params}")
-            
-            response = requests.get(url, headers=_self.headers, params=params, timeout=30)
+            users = set()
+            total = 0
+            
+            # Extrair os usuários à medida que as páginas chegam (sem guardar os deals)
+            for i, deal in enumerate(_self.iter("deals", limit=1000)):
+                total += 1
+                user_info = deal.get("user")
+                if not user_info:
+                    sample.debug("Deal %s (sem data) - sem usuário ou usuário vazio", i+1)
+                elif isinstance(user_info, dict) and "name" in user_info:
+                    user_name = user_info["name"].strip()
+                    if user_name:  # Só adicionar se não for vazio
+                        users.add(user_name)
+                        sample.debug("Usuário %s (sem data): '%s'", i+1, user_name)
+                else:
+                    sample.debug("Deal %s (sem data) - user_info inválido: %s", i+1, user_info)
+            sample.summary()
             
-            print(f"DEBUG: Status Code: {response.status_code}")
+            # Ordenar usuários alfabeticamente
+            sorted_users = sorted(list(users))
+            logger.debug("Total de deals encontrados (sem limite de data): %s", total)
+            logger.debug("Total de usuários únicos (sem data): %s", len(sorted_users))
+            logger.debug("Lista completa de usuários (sem data): %s", sorted_users)
             
-            if response.status_code == 200:
-                data = response.json()
-                deals = data.get('deals', [])
-                print(f"DEBUG: Total de deals encontrados (sem limite de data): {len(deals)}")
-                
-                users = set()
-                
-                # Extrair todos os usuários únicos
-                for i, deal in enumerate(deals):
-                    if "user" in deal and deal["user"]:
-                        user_info = deal["user"]
-                        if isinstance(user_info, dict) and "name" in user_info:
-                            user_name = user_info["name"].strip()
-                            if user_name:  # Só adicionar se não for vazio
-                                users.add(user_name)
-                                print(f"DEBUG: Usuário {i+1} (sem data): '{user_name}'")
-                        else:
-                            print(f"DEBUG: Deal {i+1} (sem data) - user_info inválido: {user_info}")
-                    else:
-                        print(f"DEBUG: Deal {i+1} (sem data) - sem usuário ou usuário vazio")
-                
-                # Ordenar usuários alfabeticamente
-                sorted_users = sorted(list(users))
-                print(f"DEBUG: Total de usuários únicos (sem data): {len(sorted_users)}")
-                print(f"DEBUG: Lista completa de usuários (sem data): {sorted_users}")
-                
-                return sorted_users
-            else:
-                print(f"DEBUG: Erro na requisição (sem data) - Status: {response.status_code}")
-                return []
+            return sorted_users
                 
         except Exception as e:
-            print(f"DEBUG: Exception em fetch_all_users_no_date_limit: {str(e)}")
+            logger.warning("Exception em fetch_all_users_no_date_limit: %s", e)
             return []
 
-    @st.cache_data(ttl=300)
+    @cached("house_users_no_date_limit")
     def fetch_house_users_no_date_limit(_self) -> List[str]:
         """Busca usuários do funil HOUSE sem limite de data"""
+        sample = LogSampler(logger)
         try:
-            print(f"DEBUG: Iniciando busca de usuários HOUSE sem limite de data")
+            logger.debug("Iniciando busca de usuários HOUSE sem limite de data")
             
-            # Buscar todos os deals do funil HOUSE usando pipeline_name
-            url = f"{_self.base_url}/api/v1/deals"
-            params = {
-                "token": _self.token,
-                "limit": 1000,  # Aumentar limite para pegar mais deals
-                "pipeline_name": "HOUSE"  # Usar pipeline_name em vez de deal_pipeline_id
-            }
-            
-            print(f"DEBUG: URL para deals HOUSE: {url}")
-            print(f"DEBUG: Params para deals HOUSE: {params}")
-            
-            response = requests.get(url, headers=_self.headers, params=params, timeout=30)
-            
-            print(f"DEBUG: Status Code para deals HOUSE: {response.status_code}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                print(f"DEBUG: Tipo de dados HOUSE: {type(data)}")
-                print(f"DEBUG: Chaves dos dados HOUSE: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
-                
-                # Extrair deals
-                if isinstance(data, dict):
-                    deals = data.get("deals", [])
-                    total_deals = data.get("total", 0)
-                    has_more = data.get("has_more", False)
-                    print(f"DEBUG: Total de deals na resposta: {total_deals}")
-                    print(f"DEBUG: Has more deals: {has_more}")
-                elif isinstance(data, list):
-                    deals = data
-                    total_deals = len(deals)
-                    has_more = False
-                else:
-                    deals = []
-                    total_deals = 0
-                    has_more = False
-                
-                print(f"DEBUG: Total de deals HOUSE encontrados: {len(deals)}")
-                
-                # Se há mais deals, buscar mais páginas
-                if has_more and len(deals) < total_deals:
-                    print(f"DEBUG: Há mais deals disponíveis. Buscando páginas adicionais...")
-                    all_deals = deals.copy()
-                    
-                    # Buscar páginas adicionais
-                    page = 1
-                    while has_more and len(all_deals) < total_deals:
-                        page += 1
-                        params["page"] = page
-                        print(f"DEBUG: Buscando página {page}...")
-                        
-                        response = requests.get(url, headers=_self.headers, params=params, timeout=30)
-                        if response.status_code == 200:
-                            page_data = response.json()
-                            if isinstance(page_data, dict):
-                                page_deals = page_data.get("deals", [])
-                                all_deals.extend(page_deals)
-                                has_more = page_data.get("has_more", False)
-                                print(f"DEBUG: Página {page}: {len(page_deals)} deals adicionados")
-                            else:
-                                break
-                        else:
-                            print(f"DEBUG: Erro ao buscar página {page}: {response.status_code}")
-                            break
-                    
-                    deals = all_deals
-                    print(f"DEBUG: Total final de deals HOUSE após todas as páginas: {len(deals)}")
+            # Extrair usuários únicos à medida que as páginas chegam (pipeline_name em vez de deal_pipeline_id)
+            users = set()
+            total = 0
+            deals_without_users = 0
+            deals_with_users = 0
+            deals_by_user = {}  # Contar deals por usuário
+            
+            for i, deal in enumerate(_self.iter("deals", limit=1000, pipeline_name="HOUSE")):
+                total += 1
+                sample.debug("Processando deal HOUSE %s: %s - %s", i+1, deal.get('id', 'sem_id'), deal.get('name', 'sem_nome'))
                 
-                # Extrair usuários únicos
-                users = set()
-                deals_without_users = 0
-                deals_with_users = 0
-                deals_by_user = {}  # Contar deals por usuário
+                # Verificar os campos onde o usuário pode estar ('owner', 'user' ou 'assigned_user', nessa ordem)
+                user_name = None
+                for field in ["owner", "user", "assigned_user"]:
+                    if field in deal and deal[field]:
+                        user_name = record_name(deal[field])
+                        sample.debug("Deal %s - %s: %s -> '%s'", i+1, field, deal[field], user_name)
+                        break
                 
-                for i, deal in enumerate(deals):
-                    print(f"DEBUG: Processando deal HOUSE {i+1}: {deal.get('id', 'sem_id')}")
-                    print(f"DEBUG: Deal {i+1} - Nome: {deal.get('name', 'sem_nome')}")
-                    
-                    # Verificar diferentes campos onde o usuário pode estar
-                    user_name = None
-                    
-                    # Campo 'owner'
-                    if "owner" in deal and deal["owner"]:
-                        owner = deal["owner"]
-                        print(f"DEBUG: Deal {i+1} tem owner: {owner}")
-                        if isinstance(owner, dict):
-                            for field in ["name", "full_name", "display_name", "username"]:
-                                if field in owner and owner[field]:
-                                    user_name = owner[field].strip()
-                                    print(f"DEBUG: Deal {i+1} - owner campo '{field}': '{user_name}'")
-                                    break
-                        elif isinstance(owner, str):
-                            user_name = owner.strip()
-                            print(f"DEBUG: Deal {i+1} - owner string: '{user_name}'")
-                    
-                    # Campo 'user'
-                    elif "user" in deal and deal["user"]:
-                        user = deal["user"]
-                        print(f"DEBUG: Deal {i+1} tem user: {user}")
-                        if isinstance(user, dict):
-                            for field in ["name", "full_name", "display_name", "username"]:
-                                if field in user and user[field]:
-                                    user_name = user[field].strip()
-                                    print(f"DEBUG: Deal {i+1} - user campo '{field}': '{user_name}'")
-                                    break
-                        elif isinstance(user, str):
-                            user_name = user.strip()
-                            print(f"DEBUG: Deal {i+1} - user string: '{user_name}'")
-                    
-                    # Campo 'assigned_user'
-                    elif "assigned_user" in deal and deal["assigned_user"]:
-                        assigned_user = deal["assigned_user"]
-                        print(f"DEBUG: Deal {i+1} tem assigned_user: {assigned_user}")
-                        if isinstance(assigned_user, dict):
-                            for field in ["name", "full_name", "display_name", "username"]:
-                                if field in assigned_user and assigned_user[field]:
-                                    user_name = assigned_user[field].strip()
-                                    print(f"DEBUG: Deal {i+1} - assigned_user campo '{field}': '{user_name}'")
-                                    break
-                        elif isinstance(assigned_user, str):
-                            user_name = assigned_user.strip()
-                            print(f"DEBUG: Deal {i+1} - assigned_user string: '{user_name}'")
-                    
-                    # Verificar se encontrou usuário
-                    if user_name:
-                        users.add(user_name)
-                        deals_with_users += 1
-                        deals_by_user[user_name] = deals_by_user.get(user_name, 0) + 1
-                        print(f"DEBUG: Deal {i+1} - usuário adicionado: '{user_name}'")
-                    else:
-                        deals_without_users += 1
-                        print(f"DEBUG: Deal {i+1} - SEM usuário encontrado")
-                        print(f"DEBUG: Deal {i+1} - campos disponíveis: {list(deal.keys())}")
-                        # Mostrar alguns campos para debug
+                # Verificar se encontrou usuário
+                if user_name:
+                    users.add(user_name)
+                    deals_with_users += 1
+                    deals_by_user[user_name] = deals_by_user.get(user_name, 0) + 1
+                else:
+                    deals_without_users += 1
+                    sample.debug("Deal %s - SEM usuário encontrado", i+1)
+                    # Mostrar alguns campos para debug
+                    if sample.enabled:
+                        sample.debug("Deal %s - campos disponíveis: %s", i+1, list(deal.keys()))
                         for key in ["owner", "user", "assigned_user", "name", "title", "status"]:
                             if key in deal:
-                                print(f"DEBUG: Deal {i+1} - campo '{key}': {deal[key]}")
-                
-                print(f"DEBUG: Resumo HOUSE:")
-                print(f"  - Total de deals: {len(deals)}")
-                print(f"  - Deals com usuários: {deals_with_users}")
-                print(f"  - Deals sem usuários: {deals_without_users}")
-                print(f"  - Usuários únicos encontrados: {len(users)}")
-                print(f"  - Lista de usuários HOUSE: {sorted(list(users))}")
-                print(f"  - Deals por usuário:")
+                                sample.debug("Deal %s - campo '%s': %s", i+1, key, deal[key])
+            sample.summary("mensagens de deals")
+            
+            logger.debug("Resumo HOUSE:")
+            logger.debug("  - Total de deals: %s", total)
+            logger.debug("  - Deals com usuários: %s", deals_with_users)
+            logger.debug("  - Deals sem usuários: %s", deals_without_users)
+            logger.debug("  - Usuários únicos encontrados: %s", len(users))
+            logger.debug("  - Lista de usuários HOUSE: %s", Lazy(lambda: sorted(list(users))))
+            logger.debug("  - Deals por usuário:")
+            if logger.isEnabledFor(logging.DEBUG):
                 for user, count in sorted(deals_by_user.items()):
-                    print(f"    - {user}: {count} deals")
-                
-                return sorted(list(users))
-            else:
-                print(f"DEBUG: Erro na requisição HOUSE - Status: {response.status_code}")
-                print(f"DEBUG: Response HOUSE: {response.text}")
-                return []
+                    logger.debug("    - %s: %s deals", user, count)
+            
+            return sorted(list(users))
                 
         except Exception as e:
-            print(f"DEBUG: Exception em fetch_house_users_no_date_limit: {str(e)}")
-            import traceback
-            print(f"DEBUG: Traceback: {traceback.format_exc()}")
+            logger.warning("Exception em fetch_house_users_no_date_limit: %s", e, exc_info=True)
             return []
 
-    def test_all_house_endpoints(_self) -> Dict[str, Any]:
+    def _house_probes(self) -> List[Tuple[str, str, Dict, str, Callable[[List], Dict[str, Any]]]]:
+        """Testes do diagnóstico HOUSE: (nome, caminho, parâmetros, chave dos registros, resumo dos registros)"""
+        def deals_summary(deals: List) -> Dict[str, Any]:
+            # Usuário do primeiro campo preenchido entre 'owner', 'user' e 'assigned_user'
+            users = set()
+            for deal in deals:
+                for field in ["owner", "user", "assigned_user"]:
+                    if field in deal and deal[field]:
+                        user_name = record_name(deal[field], ["name", "full_name", "display_name"])
+                        if user_name:
+                            users.add(user_name)
+                        break
+            return {"total_deals": len(deals), "users_found": sorted(list(users))}
+        
+        def names(label: str, fields: List[str] = ["name"]) -> Callable[[List], Dict[str, Any]]:
+            return lambda records: {label: [name for name in (record_name(r, fields) for r in records) if name]}
+        
+        house_id = "689b59706e704a0024fc2374"
+        return [
+            ("deals_house_pipeline", "/api/v1/deals", {"deal_pipeline_id": house_id}, "deals", deals_summary),
+            ("deals_house_stage", "/api/v1/deals", {"deal_stage_id": house_id}, "deals", deals_summary),
+            ("deals_house_name", "/api/v1/deals", {"pipeline_name": "HOUSE"}, "deals", deals_summary),
+            ("deals_all", "/api/v1/deals", {"limit": 1000}, "deals", deals_summary),
+            ("stages_house", "/api/v1/deal_stages", {"deal_pipeline_id": house_id}, "deal_stages", names("stages_found")),
+            ("stages_all", "/api/v1/deal_stages", {}, "deal_stages", names("stages_found")),
+            ("pipelines_all", "/api/v1/deal_pipelines", {}, "deal_pipelines", names("pipelines_found")),
+            ("users_all", "/api/v1/users", {}, "users", names("users_found", ["name", "full_name", "display_name"])),
+        ]
+
+    def _probe(self, name: str, path: str, params: Dict, key: str,
+               summarize: Callable[[List], Dict[str, Any]], timeout: float) -> ProbeResult:
+        """Uma única tentativa em um endpoint, medindo latência, status, tamanho e registros
+        
+        Sem novas tentativas nem requisições compartilhadas: o diagnóstico
+        precisa ver a resposta da API como ela está agora (com o esquema de
+        autenticação já negociado para o endpoint, sem tentar o outro). A
+        espera pelo controle de taxa e a requisição respeitam o prazo do
+        diagnóstico.
+        """
+        url = f"{self.base_url}{path}"
+        result = ProbeResult(name=name, url=url, details=summarize([]))
+        if not self.rate_limiter.acquire(timeout=remaining()):
+            result.error = "prazo esgotado aguardando o controle de taxa"
+            return result
+        started = time.perf_counter()
+        try:
+            request_timeout, _ = bounded_timeout(timeout)
+            scheme = self.auth.candidates(self.base_url, endpoint_family(url))[0]
+            auth_params, auth_headers = apply_scheme(scheme, self.token, params, self.headers)
+            response = self.session.get(url, headers=auth_headers, params=auth_params, timeout=request_timeout)
+            result.latency_ms = (time.perf_counter() - started) * 1000
+            result.status_code = response.status_code
+            result.success = response.status_code == 200
+            result.size_bytes = len(response.content)
+            if result.success:
+                records = extract_records(response.json(), key) or []
+                result.records = len(records)
+                result.details = summarize(records)
+        except Exception as e:
+            if result.latency_ms is None:
+                result.latency_ms = (time.perf_counter() - started) * 1000
+            result.error = str(e)
+        return result
+
+    def probe_house_endpoints(self, deadline: float = PROBE_DEADLINE) -> Iterator[ProbeResult]:
+        """Testa em paralelo os endpoints do funil HOUSE, entregando cada resultado assim que fica pronto
+        
+        Cada teste tem no máximo PROBE_TIMEOUT segundos (menos, se o prazo
+        total estiver acabando) e o conjunto termina em `deadline` segundos:
+        os testes que não responderam a tempo saem com o erro de prazo
+        esgotado, então um endpoint lento ou mudo não trava o diagnóstico.
+        """
+        left = remaining()
+        if left is not None:
+            deadline = min(deadline, left)
+        executor = get_shared_executor()
+        timeout = min(PROBE_TIMEOUT, deadline)
+        # Os testes levam o prazo do diagnóstico (inclusive a espera pelo controle de taxa)
+        with request_deadline(deadline):
+            futures = {
+                executor.submit(in_context(self._probe), name, path, params, key, summarize, timeout): (name, path, summarize)
+                for name, path, params, key, summarize in self._house_probes()
+            }
+        pending = set(futures)
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                pending.discard(future)
+                result = future.result()
+                logger.debug("%s - status %s em %.0f ms", result.name, result.status_code, result.latency_ms or 0)
+                yield result
+        except TimeoutError:
+            for future in list(pending):
+                future.cancel()
+                pending.discard(future)
+                name, path, summarize = futures[future]
+                logger.warning("Teste %s não terminou em %gs", name, deadline)
+                yield ProbeResult(name=name, url=f"{self.base_url}{path}",
+                                  error=f"prazo de {deadline:g}s esgotado", details=summarize([]))
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def test_all_house_endpoints(_self, deadline: float = PROBE_DEADLINE) -> Dict[str, Any]:
         """Testa todos os endpoints possíveis relacionados ao funil HOUSE"""
         try:
-            print(f"DEBUG: Iniciando teste de todos os endpoints HOUSE")
-            
-            results = {}
-            
-            # 1. Testar endpoint de deals com diferentes parâmetros
-            deals_tests = [
-                {
-                    "name": "deals_house_pipeline",
-                    "url": f"{_self.base_url}/api/v1/deals",
-                    "params": {
-                        "token": _self.token,
-                        "deal_pipeline_id": "689b59706e704a0024fc2374"
-                    }
-                },
-                {
-                    "name": "deals_house_stage",
-                    "url": f"{_self.base_url}/api/v1/deals",
-                    "params": {
-                        "token": _self.token,
-                        "deal_stage_id": "689b59706e704a0024fc2374"
-                    }
-                },
-                {
-                    "name": "deals_house_name",
-                    "url": f"{_self.base_url}/api/v1/deals",
-                    "params": {
-                        "token": _self.token,
-                        "pipeline_name": "HOUSE"
-                    }
-                },
-                {
-                    "name": "deals_all",
-                    "url": f"{_self.base_url}/api/v1/deals",
-                    "params": {
-                        "token": _self.token,
-                        "limit": 1000  # Aumentar de 100 para 1000 para dados completos
-                    }
-                }
-            ]
-            
-            for test in deals_tests:
-                print(f"DEBUG: Testando {test['name']}...")
-                try:
-                    response = requests.get(test["url"], headers=_self.headers, params=test["params"], timeout=10)
-                    results[test["name"]] = {
-                        "status_code": response.status_code,
-                        "success": response.status_code == 200,
-                        "total_deals": 0,
-                        "users_found": []
-                    }
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        deals = data.get("deals", [])
-                        results[test["name"]]["total_deals"] = len(deals)
-                        
-                        # Extrair usuários
-                        users = set()
-                        for deal in deals:
-                            for field in ["owner", "user", "assigned_user"]:
-                                if field in deal and deal[field]:
-                                    user_info = deal[field]
-                                    if isinstance(user_info, dict):
-                                        for name_field in ["name", "full_name", "display_name"]:
-                                            if name_field in user_info and user_info[name_field]:
-                                                users.add(user_info[name_field].strip())
-                                                break
-                                    elif isinstance(user_info, str):
-                                        users.add(user_info.strip())
-                                    break
-                        
-                        results[test["name"]]["users_found"] = sorted(list(users))
-                        print(f"DEBUG: {test['name']} - {len(deals)} deals, {len(users)} usuários")
-                    
-                except Exception as e:
-                    results[test["name"]] = {
-                        "status_code": 0,
-                        "success": False,
-                        "error": str(e),
-                        "total_deals": 0,
-                        "users_found": []
-                    }
-                    print(f"DEBUG: Erro em {test['name']}: {str(e)}")
-            
-            # 2. Testar endpoint de stages do funil HOUSE
-            stages_tests = [
-                {
-                    "name": "stages_house",
-                    "url": f"{_self.base_url}/api/v1/deal_stages",
-                    "params": {
-                        "token": _self.token,
-                        "deal_pipeline_id": "689b59706e704a0024fc2374"
-                    }
-                },
-                {
-                    "name": "stages_all",
-                    "url": f"{_self.base_url}/api/v1/deal_stages",
-                    "params": {
-                        "token": _self.token
-                    }
-                }
-            ]
+            logger.debug("Iniciando teste de todos os endpoints HOUSE")
             
-            for test in stages_tests:
-                print(f"DEBUG: Testando {test['name']}...")
-                try:
-                    response = requests.get(test["url"], headers=_self.headers, params=test["params"], timeout=10)
-                    results[test["name"]] = {
-                        "status_code": response.status_code,
-                        "success": response.status_code == 200,
-                        "stages_found": []
-                    }
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        stages = data.get("deal_stages", [])
-                        stage_names = [stage.get("name", "") for stage in stages if stage.get("name")]
-                        results[test["name"]]["stages_found"] = stage_names
-                        print(f"DEBUG: {test['name']} - {len(stages)} stages encontrados")
-                    
-                except Exception as e:
-                    results[test["name"]] = {
-                        "status_code": 0,
-                        "success": False,
-                        "error": str(e),
-                        "stages_found": []
-                    }
-                    print(f"DEBUG: Erro em {test['name']}: {str(e)}")
-            
-            # 3. Testar endpoint de pipelines
-            pipeline_tests = [
-                {
-                    "name": "pipelines_all",
-                    "url": f"{_self.base_url}/api/v1/deal_pipelines",
-                    "params": {
-                        "token": _self.token
-                    }
-                }
-            ]
+            results = {result.name: result.to_dict() for result in _self.probe_house_endpoints(deadline)}
             
-            for test in pipeline_tests:
-                print(f"DEBUG: Testando {test['name']}...")
-                try:
-                    response = requests.get(test["url"], headers=_self.headers, params=test["params"], timeout=10)
-                    results[test["name"]] = {
-                        "status_code": response.status_code,
-                        "success": response.status_code == 200,
-                        "pipelines_found": []
-                    }
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        pipelines = data if isinstance(data, list) else data.get("deal_pipelines", [])
-                        pipeline_names = [pipeline.get("name", "") for pipeline in pipelines if pipeline.get("name")]
-                        results[test["name"]]["pipelines_found"] = pipeline_names
-                        print(f"DEBUG: {test['name']} - {len(pipelines)} pipelines encontrados")
-                    
-                except Exception as e:
-                    results[test["name"]] = {
-                        "status_code": 0,
-                        "success": False,
-                        "error": str(e),
-                        "pipelines_found": []
-                    }
-                    print(f"DEBUG: Erro em {test['name']}: {str(e)}")
-            
-            # 4. Testar endpoint de usuários
-            users_tests = [
-                {
-                    "name": "users_all",
-                    "url": f"{_self.base_url}/api/v1/users",
-                    "params": {
-                        "token": _self.token
-                    }
-                }
-            ]
-            
-            for test in users_tests:
-                print(f"DEBUG: Testando {test['name']}...")
-                try:
-                    response = requests.get(test["url"], headers=_self.headers, params=test["params"], timeout=10)
-                    results[test["name"]] = {
-                        "status_code": response.status_code,
-                        "success": response.status_code == 200,
-                        "users_found": []
-                    }
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        users = data.get("users", []) if isinstance(data, dict) else data
-                        user_names = []
-                        for user in users:
-                            if isinstance(user, dict):
-                                for name_field in ["name", "full_name", "display_name"]:
-                                    if name_field in user and user[name_field]:
-                                        user_names.append(user[name_field].strip())
-                                        break
-                        results[test["name"]]["users_found"] = user_names
-                        print(f"DEBUG: {test['name']} - {len(users)} usuários encontrados")
-                    
-                except Exception as e:
-                    results[test["name"]] = {
-                        "status_code": 0,
-                        "success": False,
-                        "error": str(e),
-                        "users_found": []
-                    }
-                    print(f"DEBUG: Erro em {test['name']}: {str(e)}")
-            
-            print(f"DEBUG: Resumo dos testes:")
+            logger.debug("Resumo dos testes:")
             for test_name, result in results.items():
-                print(f"  - {test_name}: {'✅' if result['success'] else '❌'} (Status: {result['status_code']})")
+                logger.debug("  - %s: %s (Status: %s)", test_name, '✅' if result['success'] else '❌', result['status_code'])
             
             return results
             
         except Exception as e:
-            print(f"DEBUG: Exception em test_all_house_endpoints: {str(e)}")
-            import traceback
-            print(f"DEBUG: Traceback: {traceback.format_exc()}")
+            logger.warning("Exception em test_all_house_endpoints: %s", e, exc_info=True)
             return {}
 
     def fetch_house_users_comprehensive(_self) -> Dict[str, Any]:
         """Busca usuários do funil HOUSE de forma mais abrangente"""
+        sample = LogSampler(logger)
         try:
-            print(f"DEBUG: Iniciando busca abrangente de usuários HOUSE")
-            
-            # 1. Buscar deals do funil HOUSE
-            deals_url = f"{_self.base_url}/api/v1/deals"
-            deals_params = {
-                "token": _self.token,
-                "limit": 1000,
-                "deal_pipeline_id": "689b59706e704a0024fc2374"
-            }
-            
-            print(f"DEBUG: Buscando deals do HOUSE...")
-            deals_response = requests.get(deals_url, headers=_self.headers, params=deals_params, timeout=30)
-            
-            deals_users = set()
-            if deals_response.status_code == 200:
-                deals_data = deals_response.json()
-                deals = deals_data.get("deals", [])
-                print(f"DEBUG: Deals do HOUSE encontrados: {len(deals)}")
+            logger.debug("Iniciando busca abrangente de usuários HOUSE")
+            
+            # 1. Usuários dos deals do funil HOUSE: (usuários, total de deals)
+            def deals_users() -> Tuple[set, int]:
+                store = _self._synced_deal_store()
+                if store is not None:
+                    # Consultas pelo índice de pipeline_id no banco local sincronizado
+                    house_id = "689b59706e704a0024fc2374"
+                    return set(store.get_deal_user_names(house_id)), store.count_deals(house_id)
                 
-                for deal in deals:
+                users = set()
+                total = 0
+                for deal in _self.iter("deals", limit=1000, deal_pipeline_id="689b59706e704a0024fc2374"):
+                    total += 1
                     # Extrair usuário do deal
-                    user_name = None
                     for field in ["owner", "user", "assigned_user"]:
                         if field in deal and deal[field]:
-                            user_info = deal[field]
-                            if isinstance(user_info, dict):
-                                for name_field in ["name", "full_name", "display_name"]:
-                                    if name_field in user_info and user_info[name_field]:
-                                        user_name = user_info[name_field].strip()
-                                        break
-                            elif isinstance(user_info, str):
-                                user_name = user_info.strip()
+                            user_name = record_name(deal[field], ["name", "full_name", "display_name"])
                             if user_name:
+                                users.add(user_name)
                                 break
-                    
-                    if user_name:
-                        deals_users.add(user_name)
-            
-            print(f"DEBUG: Usuários encontrados via deals: {sorted(list(deals_users))}")
-            
-            # 2. Buscar todos os usuários da API
-            users_url = f"{_self.base_url}/api/v1/users"
-            users_params = {"token": _self.token}
+                return users, total
             
-            print(f"DEBUG: Buscando todos os usuários...")
-            users_response = requests.get(users_url, headers=_self.headers, params=users_params, timeout=30)
-            
-            all_users = []
-            if users_response.status_code == 200:
-                users_data = users_response.json()
-                if isinstance(users_data, dict) and "users" in users_data:
-                    all_users = users_data["users"]
-                elif isinstance(users_data, list):
-                    all_users = users_data
-                
-                print(f"DEBUG: Total de usuários na API: {len(all_users)}")
-            
-            # 3. Buscar equipes para ver se há usuários associados ao HOUSE
-            teams_url = f"{_self.base_url}/api/v1/teams"
-            teams_params = {"token": _self.token}
-            
-            print(f"DEBUG: Buscando equipes...")
-            teams_response = requests.get(teams_url, headers=_self.headers, params=teams_params, timeout=30)
+            # 2. Nomes de todos os usuários da API
+            def all_users() -> set:
+                names = set()
+                for user in _self.iter("users"):
+                    user_name = record_name(user, ["name", "full_name", "display_name"]) if isinstance(user, dict) else None
+                    if user_name:
+                        names.add(user_name)
+                return names
             
-            teams_users = set()
-            if teams_response.status_code == 200:
-                teams_data = teams_response.json()
-                teams = teams_data.get("teams", [])
-                print(f"DEBUG: Equipes encontradas: {len(teams)}")
-                
-                for team in teams:
+            # 3. Usuários das equipes relacionadas ao HOUSE: (usuários, total de equipes)
+            def teams_users() -> Tuple[set, int]:
+                users = set()
+                total = 0
+                for team in _self.iter("teams"):
+                    total += 1
                     team_name = team.get("name", "")
-                    print(f"DEBUG: Verificando equipe: {team_name}")
+                    sample.debug("Verificando equipe: %s", team_name)
                     
                     # Verificar se a equipe tem relação com HOUSE
-                    if "house" in team_name.lower():
-                        print(f"DEBUG: Equipe relacionada ao HOUSE encontrada: {team_name}")
-                        if "team_users" in team:
-                            for user in team["team_users"]:
-                                if isinstance(user, dict) and "name" in user:
-                                    teams_users.add(user["name"].strip())
-                                    print(f"DEBUG: Usuário da equipe HOUSE: {user['name']}")
-            
-            print(f"DEBUG: Usuários encontrados via equipes HOUSE: {sorted(list(teams_users))}")
-            
-            # 4. Comparar e analisar
-            all_users_names = set()
-            for user in all_users:
-                if isinstance(user, dict):
-                    for field in ["name", "full_name", "display_name"]:
-                        if field in user and user[field]:
-                            all_users_names.add(user[field].strip())
-                            break
-            
-            print(f"DEBUG: Todos os usuários da API: {sorted(list(all_users_names))}")
-            
-            # 5. Análise final
-            house_users_via_deals = sorted(list(deals_users))
-            house_users_via_teams = sorted(list(teams_users))
+                    if "house" in team_name.lower() and "team_users" in team:
+                        for user in team["team_users"]:
+                            if isinstance(user, dict) and "name" in user:
+                                users.add(user["name"].strip())
+                                sample.debug("Usuário da equipe HOUSE %s: %s", team_name, user['name'])
+                sample.summary()
+                return users, total
+            
+            # As três consultas são independentes: rodam em paralelo e as que falharem ficam vazias
+            results, errors = _self.fan_out({"deals": deals_users, "users": all_users, "teams": teams_users})
+            deals_users_set, total_deals = results.get("deals", (set(), 0))
+            all_users_names = results.get("users", set())
+            teams_users_set, total_teams = results.get("teams", (set(), 0))
+            
+            logger.debug("Usuários encontrados via deals: %s", Lazy(lambda: sorted(list(deals_users_set))))
+            logger.debug("Usuários encontrados via equipes HOUSE: %s", Lazy(lambda: sorted(list(teams_users_set))))
+            logger.debug("Todos os usuários da API: %s", Lazy(lambda: sorted(list(all_users_names))))
+            
+            # 4. Análise final
+            house_users_via_deals = sorted(list(deals_users_set))
+            house_users_via_teams = sorted(list(teams_users_set))
             all_users_list = sorted(list(all_users_names))
             
             # Usuários que estão na API mas não aparecem nos deals do HOUSE
             missing_users = [user for user in all_users_list if user not in house_users_via_deals]
             
-            print(f"DEBUG: Análise final:")
-            print(f"  - Usuários via deals HOUSE: {house_users_via_deals}")
-            print(f"  - Usuários via equipes HOUSE: {house_users_via_teams}")
-            print(f"  - Todos os usuários: {all_users_list}")
-            print(f"  - Usuários que não aparecem nos deals HOUSE: {missing_users}")
+            logger.debug("Análise final:")
+            logger.debug("  - Usuários via deals HOUSE: %s", house_users_via_deals)
+            logger.debug("  - Usuários via equipes HOUSE: %s", house_users_via_teams)
+            logger.debug("  - Todos os usuários: %s", all_users_list)
+            logger.debug("  - Usuários que não aparecem nos deals HOUSE: %s", missing_users)
             
             return {
                 "house_users_via_deals": house_users_via_deals,
                 "house_users_via_teams": house_users_via_teams,
                 "all_users": all_users_list,
                 "missing_users": missing_users,
-                "total_deals": len(deals) if deals_response.status_code == 200 else 0,
+                "total_deals": total_deals,
                 "total_users": len(all_users_list),
-                "total_teams": len(teams) if teams_response.status_code == 200 else 0
+                "total_teams": total_teams,
+                "errors": {name: str(error) for name, error in errors.items()}
             }
             
         except Exception as e:
-            print(f"DEBUG: Exception em fetch_house_users_comprehensive: {str(e)}")
-            import traceback
-            print(f"DEBUG: Traceback: {traceback.format_exc()}")
+            logger.warning("Exception em fetch_house_users_comprehensive: %s", e, exc_info=True)
             return {}
 
     def fetch_all_pipelines(_self) -> Dict[str, Any]:
         """Busca todos os funis disponíveis para verificar IDs"""
+        sample = LogSampler(logger)
         try:
             url = f"{_self.base_url}/api/v1/deal_pipelines"
             params = {"token": _self.token}
             
-            print(f"DEBUG: Buscando todos os funis em: {url}")
-            print(f"DEBUG: Params: {params}")
+            logger.debug("Buscando todos os funis em: %s", url)
+            logger.debug("Params: %s", Lazy(lambda: redact_params(params)))
             
-            response = requests.get(url, headers=_self.headers, params=params, timeout=10)
+            response = _self._get(url, params=params, timeout=10)
             
-            print(f"DEBUG: Status Code para funis: {response.status_code}")
+            logger.debug("Status Code para funis: %s", response.status_code)
             
             if response.status_code == 200:
                 data = response.json()
-                print(f"DEBUG: Tipo de dados funis: {type(data)}")
-                print(f"DEBUG: Chaves dos dados funis: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
+                logger.debug("Tipo de dados funis: %s", type(data))
+                logger.debug("Chaves dos dados funis: %s", Lazy(lambda: list(data.keys()) if isinstance(data, dict) else 'Not a dict'))
                 
                 # Extrair funis
                 if isinstance(data, dict):
@@ -1242,7 +1516,7 @@ class RDStationClient:
                 else:
                     pipelines = []
                 
-                print(f"DEBUG: Total de funis encontrados: {len(pipelines)}")
+                logger.debug("Total de funis encontrados: %s", len(pipelines))
                 
                 # Processar cada funil
                 pipelines_info = {}
@@ -1251,15 +1525,16 @@ class RDStationClient:
                         pipeline_id = pipeline.get("id", f"pipeline_{i}")
                         pipeline_name = pipeline.get("name", f"Funnel {i+1}")
                         
-                        print(f"DEBUG: Funil {i+1}: '{pipeline_name}' (ID: {pipeline_id})")
+                        sample.debug("Funil %s: '%s' (ID: %s)", i+1, pipeline_name, pipeline_id)
                         
                         pipelines_info[pipeline_name] = {
                             "id": pipeline_id,
                             "name": pipeline_name,
                             "raw_data": pipeline
                         }
+                sample.summary()
                 
-                print(f"DEBUG: Funis processados: {list(pipelines_info.keys())}")
+                logger.debug("Funis processados: %s", Lazy(lambda: list(pipelines_info.keys())))
                 
                 return {
                     "success": True,
@@ -1267,8 +1542,8 @@ class RDStationClient:
                     "total": len(pipelines)
                 }
             else:
-                print(f"DEBUG: Erro na requisição de funis - Status: {response.status_code}")
-                print(f"DEBUG: Response funis: {response.text}")
+                logger.warning("Erro na requisição de funis - Status: %s", response.status_code)
+                logger.debug("Response funis: %s", Lazy(lambda: response.text))
                 return {
                     "success": False,
                     "error": f"Status {response.status_code}",
@@ -1276,9 +1551,7 @@ class RDStationClient:
                 }
                 
         except Exception as e:
-            print(f"DEBUG: Exception em fetch_all_pipelines: {str(e)}")
-            import traceback
-            print(f"DEBUG: Traceback: {traceback.format_exc()}")
+            logger.warning("Exception em fetch_all_pipelines: %s", e, exc_info=True)
             return {
                 "success": False,
                 "error": str(e)
@@ -1290,10 +1563,10 @@ class RDStationClient:
             url = f"{self.base_url}/api/v1/teams"
             params = {"token": self.token}
             
-            print(f"DEBUG: Testando conectividade com equipes em: {url}")
-            print(f"DEBUG: Params: {params}")
+            logger.debug("Testando conectividade com equipes em: %s", url)
+            logger.debug("Params: %s", Lazy(lambda: redact_params(params)))
             
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
+            response = self._get(url, params=params, timeout=10)
             
             return {
                 "success": response.status_code == 200,
@@ -1316,7 +1589,7 @@ class RDStationClient:
             url = f"{self.base_url}/api/v1/deal_stages"
             params = {"token": self.token}
             
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
+            response = self._get(url, params=params, timeout=10)
             
             return {
                 "success": response.status_code == 200,
@@ -1332,11 +1605,12 @@ class RDStationClient:
                 "url": f"{self.base_url}/api/v1/deal_stages"
             } 
 
-    @st.cache_data(ttl=300)
+    @cached("paola_investigation")
     def investigate_paola_chagas_data(_self) -> Dict:
         """Investiga especificamente os dados da Paola Chagas para comparar com o CRM"""
+        sample = LogSampler(logger)
         try:
-            print(f"DEBUG: 🔍 Iniciando investigação específica da Paola Chagas")
+            logger.debug("🔍 Iniciando investigação específica da Paola Chagas")
             
             results = {
                 "paola_deals": [],
@@ -1346,106 +1620,19 @@ class RDStationClient:
                 "comparison": {}
             }
             
-            # 1. Buscar deals específicos da Paola Chagas
-            print(f"DEBUG: 1. Buscando deals específicos da Paola Chagas...")
-            
-            # Buscar todos os deals
-            url = f"{_self.base_url}/api/v1/deals"
-            params = {
-                "token": _self.token,
-                "limit": 1000
-            }
-            
-            response = requests.get(url, headers=_self.headers, params=params, timeout=30)
-            
-            if response.status_code == 200:
-                data = response.json()
-                all_deals = data.get("deals", [])
-                
-                # Filtrar deals da Paola
-                paola_deals = []
-                for deal in all_deals:
+            def paola_deals(deals, detailed: bool) -> List[Dict]:
+                """Deals da Paola (pelo campo 'user' ou, na falta dele, 'owner')"""
+                found = []
+                for deal in deals:
                     user_name = None
-                    
-                    # Verificar campo 'user'
                     if "user" in deal and deal["user"]:
-                        user_info = deal["user"]
-                        if isinstance(user_info, dict) and "name" in user_info:
-                            user_name = user_info["name"].strip()
-                        elif isinstance(user_info, str):
-                            user_name = user_info.strip()
-                    
-                    # Verificar campo 'owner'
+                        user_name = record_name(deal["user"], ["name"])
                     elif "owner" in deal and deal["owner"]:
-                        owner = deal["owner"]
-                        if isinstance(owner, dict) and "name" in owner:
-                            user_name = owner["name"].strip()
-                        elif isinstance(owner, str):
-                            user_name = owner.strip()
+                        user_name = record_name(deal["owner"], ["name"])
                     
                     # Se é a Paola, adicionar ao resultado
                     if user_name and "paola" in user_name.lower():
-                        paola_deals.append({
-                            "id": deal.get("id"),
-                            "name": deal.get("name"),
-                            "user": user_name,
-                            "pipeline": deal.get("deal_pipeline", {}).get("name"),
-                            "stage": deal.get("deal_stage", {}).get("name"),
-                            "status": deal.get("status"),
-                            "rating": deal.get("rating"),
-                            "created_at": deal.get("created_at"),
-                            "updated_at": deal.get("updated_at")
-                        })
-                
-                results["paola_all_deals"] = paola_deals
-                print(f"DEBUG: Encontrados {len(paola_deals)} deals da Paola Chagas")
-                
-                # Mostrar detalhes de cada deal
-                for i, deal in enumerate(paola_deals):
-                    print(f"DEBUG: Deal {i+1} da Paola:")
-                    print(f"  - ID: {deal['id']}")
-                    print(f"  - Nome: {deal['name']}")
-                    print(f"  - Pipeline: {deal['pipeline']}")
-                    print(f"  - Stage: {deal['stage']}")
-                    print(f"  - Status: {deal['status']}")
-                    print(f"  - Rating: {deal['rating']}")
-            
-            # 2. Buscar deals do funil HOUSE da Paola
-            print(f"DEBUG: 2. Buscando deals do funil HOUSE da Paola...")
-            
-            params_house = {
-                "token": _self.token,
-                "limit": 1000,
-                "pipeline_name": "HOUSE"
-            }
-            
-            response_house = requests.get(url, headers=_self.headers, params=params_house, timeout=30)
-            
-            if response_house.status_code == 200:
-                data_house = response_house.json()
-                house_deals = data_house.get("deals", [])
-                
-                # Filtrar deals da Paola no HOUSE
-                paola_house_deals = []
-                for deal in house_deals:
-                    user_name = None
-                    
-                    if "user" in deal and deal["user"]:
-                        user_info = deal["user"]
-                        if isinstance(user_info, dict) and "name" in user_info:
-                            user_name = user_info["name"].strip()
-                        elif isinstance(user_info, str):
-                            user_name = user_info.strip()
-                    
-                    elif "owner" in deal and deal["owner"]:
-                        owner = deal["owner"]
-                        if isinstance(owner, dict) and "name" in owner:
-                            user_name = owner["name"].strip()
-                        elif isinstance(owner, str):
-                            user_name = owner.strip()
-                    
-                    if user_name and "paola" in user_name.lower():
-                        paola_house_deals.append({
+                        entry = {
                             "id": deal.get("id"),
                             "name": deal.get("name"),
                             "user": user_name,
@@ -1453,39 +1640,67 @@ class RDStationClient:
                             "stage": deal.get("deal_stage", {}).get("name"),
                             "status": deal.get("status"),
                             "rating": deal.get("rating")
-                        })
-                
-                results["paola_house_deals"] = paola_house_deals
-                print(f"DEBUG: Encontrados {len(paola_house_deals)} deals da Paola no funil HOUSE")
-            
-            # 3. Buscar informações da equipe da Paola
-            print(f"DEBUG: 3. Buscando informações da equipe da Paola...")
-            
-            teams_url = f"{_self.base_url}/api/v1/teams"
-            teams_params = {"token": _self.token}
-            
-            teams_response = requests.get(teams_url, headers=_self.headers, params=teams_params, timeout=30)
+                        }
+                        if detailed:
+                            entry["created_at"] = deal.get("created_at")
+                            entry["updated_at"] = deal.get("updated_at")
+                        found.append(entry)
+                return found
+            
+            def paola_team() -> Dict:
+                """Equipe em que a Paola aparece"""
+                for team in _self.iter("teams"):
+                    for user in team.get("team_users", []):
+                        if "paola" in user.get("name", "").lower():
+                            logger.debug("Paola encontrada na equipe: %s", team.get('name'))
+                            return {
+                                "team_name": team.get("name"),
+                                "team_id": team.get("id"),
+                                "user_name": user.get("name"),
+                                "user_email": user.get("email"),
+                                "user_id": user.get("id")
+                            }
+                return {}
             
-            if teams_response.status_code == 200:
-                teams_data = teams_response.json()
-                teams = teams_data.get("teams", [])
-                
-                for team in teams:
-                    if "team_users" in team:
-                        for user in team["team_users"]:
-                            if "paola" in user.get("name", "").lower():
-                                results["paola_team_info"] = {
-                                    "team_name": team.get("name"),
-                                    "team_id": team.get("id"),
-                                    "user_name": user.get("name"),
-                                    "user_email": user.get("email"),
-                                    "user_id": user.get("id")
-                                }
-                                print(f"DEBUG: Paola encontrada na equipe: {team.get('name')}")
-                                break
+            def stored_paola_deals() -> Optional[List[Dict]]:
+                """Deals da Paola no banco local sincronizado (pelo índice de user_name); None sem banco"""
+                store = _self._synced_deal_store()
+                if store is None:
+                    return None
+                return [deal for user_name in store.find_deal_user_names("paola")
+                        for deal in store.get_deals(user_name=user_name)]
+            
+            def deals_of(house_only: bool) -> List[Dict]:
+                stored = stored_paola_deals()
+                if stored is None:
+                    filters = {"pipeline_name": "HOUSE"} if house_only else {}
+                    return paola_deals(_self.iter("deals", limit=1000, **filters), detailed=not house_only)
+                if house_only:
+                    stored = [deal for deal in stored if (deal.get("deal_pipeline") or {}).get("name") == "HOUSE"]
+                return paola_deals(stored, detailed=not house_only)
+            
+            # 1. Todos os deals, 2. deals do funil HOUSE e 3. equipes, em paralelo
+            logger.debug("Buscando deals, deals do funil HOUSE e equipes da Paola...")
+            fetched, errors = _self.fan_out({
+                "all_deals": lambda: deals_of(house_only=False),
+                "house_deals": lambda: deals_of(house_only=True),
+                "team": paola_team,
+            })
+            results["paola_all_deals"] = fetched.get("all_deals", [])
+            results["paola_house_deals"] = fetched.get("house_deals", [])
+            results["paola_team_info"] = fetched.get("team", {})
+            
+            logger.debug("Encontrados %s deals da Paola Chagas", len(results["paola_all_deals"]))
+            for i, deal in enumerate(results["paola_all_deals"]):
+                sample.debug(
+                    "Deal %s da Paola: ID=%s, Nome=%s, Pipeline=%s, Stage=%s, Status=%s, Rating=%s",
+                    i+1, deal['id'], deal['name'], deal['pipeline'], deal['stage'], deal['status'], deal['rating']
+                )
+            sample.summary("deals da Paola")
+            logger.debug("Encontrados %s deals da Paola no funil HOUSE", len(results["paola_house_deals"]))
             
             # 4. Comparação e análise
-            print(f"DEBUG: 4. Análise comparativa...")
+            logger.debug("4. Análise comparativa...")
             
             results["comparison"] = {
                 "total_deals": len(results["paola_all_deals"]),
@@ -1495,6 +1710,10 @@ class RDStationClient:
                 "possible_issues": []
             }
             
+            # Consultas que falharam ou estouraram o prazo (resultado parcial)
+            for name, error in errors.items():
+                results["comparison"]["possible_issues"].append(f"Consulta '{name}' incompleta: {error}")
+            
             # Identificar possíveis problemas
             if len(results["paola_house_deals"]) == 0:
                 results["comparison"]["possible_issues"].append("Nenhum deal da Paola encontrado no funil HOUSE")
@@ -1512,18 +1731,16 @@ class RDStationClient:
                 results["comparison"]["other_pipelines"] = list(other_pipelines)
                 results["comparison"]["possible_issues"].append(f"Deals encontrados em outros funis: {list(other_pipelines)}")
             
-            print(f"DEBUG: 🔍 Investigação da Paola Chagas concluída")
-            print(f"DEBUG: Resumo:")
-            print(f"  - Total de deals: {results['comparison']['total_deals']}")
-            print(f"  - Deals no HOUSE: {results['comparison']['house_deals']}")
-            print(f"  - Deals em outros funis: {results['comparison']['other_deals']}")
-            print(f"  - Equipe: {results['comparison']['team_info'].get('team_name', 'N/A')}")
-            print(f"  - Possíveis problemas: {results['comparison']['possible_issues']}")
+            logger.debug("🔍 Investigação da Paola Chagas concluída")
+            logger.debug("Resumo:")
+            logger.debug("  - Total de deals: %s", results['comparison']['total_deals'])
+            logger.debug("  - Deals no HOUSE: %s", results['comparison']['house_deals'])
+            logger.debug("  - Deals em outros funis: %s", results['comparison']['other_deals'])
+            logger.debug("  - Equipe: %s", results['comparison']['team_info'].get('team_name', 'N/A'))
+            logger.debug("  - Possíveis problemas: %s", results['comparison']['possible_issues'])
             
             return results
             
         except Exception as e:
-            print(f"DEBUG: Erro na investigação da Paola Chagas: {str(e)}")
-            import traceback
-            print(f"DEBUG: Traceback: {traceback.format_exc()}")
+            logger.warning("Erro na investigação da Paola Chagas: %s", e, exc_info=True)
             return {"error": str(e)} 
\ No newline at end of file
@@ -0,0 +1,427 @@
+"""
+Cache de respostas do cliente do CRM, independente do Streamlit
+"""
+import functools
+import hashlib
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from backend.api.circuit_breaker import track_families
+from backend.api.deadline import expired, remaining
+from backend.api.single_flight import FlightTimeout, SingleFlight
+from backend.storage.snapshots import SNAPSHOT_DATASETS, SnapshotStore, get_snapshot_store
+from backend.utils.instrumentation import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# Quantidade máxima de entradas mantidas (as menos usadas recentemente saem primeiro)
+CACHE_MAX_ENTRIES = int(os.getenv("RD_CACHE_MAX_ENTRIES", "256"))
+
+# TTL padrão (segundos) de cada conjunto de dados
+DEFAULT_TTL = 300
+DATASET_TTLS: Dict[str, float] = {
+    "crm_deals": 300,
+    "house_deals": 30,
+    "all_deals": 30,
+    "stages": 300,
+    "pipeline_stages": 300,
+    "stage_details": 300,
+    "team_pipelines": 300,
+    "house_stages": 300,
+    "all_users": 300,
+    "house_users": 300,
+    "team_users": 300,
+    "teams": 300,
+    "users": 300,
+    "all_users_no_date_limit": 300,
+    "house_users_no_date_limit": 300,
+    "paola_investigation": 300,
+}
+
+
+def _parse_ttl_overrides(value: str) -> Dict[str, float]:
+    """Lê overrides no formato "house_deals=60,teams=600" """
+    overrides = {}
+    for item in value.split(","):
+        name, _, ttl = item.partition("=")
+        if name.strip() and ttl.strip():
+            try:
+                overrides[name.strip()] = float(ttl)
+            except ValueError:
+                continue
+    return overrides
+
+
+DATASET_TTLS.update(_parse_ttl_overrides(os.getenv("RD_CACHE_TTLS", "")))
+
+# Stale-while-revalidate: após o TTL, o último valor bom continua sendo servido
+# (por até STALE_MAX_AGE segundos) enquanto uma thread em segundo plano o atualiza
+STALE_WHILE_REVALIDATE = os.getenv("RD_CACHE_SWR", "1") == "1"
+STALE_MAX_AGE = float(os.getenv("RD_CACHE_STALE_MAX_AGE", "3600"))
+SWR_DATASETS = {"crm_deals", "house_deals", "all_deals", "stages", "house_stages", "pipeline_stages"}
+REFRESH_WORKERS = 2
+
+# Por quanto tempo (segundos, além do TTL/stale) o último valor bom é mantido para servir com a API indisponível
+LAST_GOOD_MAX_AGE = float(os.getenv("RD_CACHE_LAST_GOOD_MAX_AGE", "86400"))
+
+
+def tenant_fingerprint(base_url: str, token: str) -> str:
+    """Identificador do par (base_url, token) sem expor o token"""
+    return hashlib.sha256(f"{base_url}|{token}".encode()).hexdigest()[:16]
+
+
+def normalize_params(params: Dict[str, Any]) -> Tuple:
+    """Parâmetros em forma canônica e hashable (ordem das chaves não importa)"""
+    def freeze(value: Any) -> Hashable:
+        if isinstance(value, dict):
+            return tuple(sorted((str(k), freeze(v)) for k, v in value.items()))
+        if isinstance(value, (list, tuple, set)):
+            items = [freeze(v) for v in value]
+            return tuple(sorted(items, key=repr) if isinstance(value, set) else items)
+        return value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+
+    return tuple(sorted((str(key), freeze(value)) for key, value in params.items()))
+
+
+class DegradedResult(Exception):
+    """Resultado de uma carga feita com a API indisponível (não substitui o último valor bom)"""
+
+    def __init__(self, value: Any):
+        super().__init__("API indisponível")
+        self.value = value
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at", "expires_at", "stale_until", "keep_until")
+
+    def __init__(self, value: Any, ttl: float, stale_ttl: float = 0, stored_at: Optional[float] = None):
+        self.value = value
+        now = time.time()
+        # `stored_at` informa quando o valor foi obtido (ex.: snapshot); a validade conta a partir de agora
+        self.stored_at = now if stored_at is None else stored_at
+        self.expires_at = now + ttl
+        self.stale_until = self.expires_at + stale_ttl
+        self.keep_until = self.stale_until + LAST_GOOD_MAX_AGE
+
+
+class ResponseCache:
+    """LRU com TTL por entrada e contadores de acerto/erro
+
+    As chaves são (tenant, dataset, parâmetros normalizados). Valores são
+    devolvidos sem cópia: quem lê deve tratá-los como somente leitura.
+    Entradas gravadas com `stale_ttl` continuam sendo servidas depois do TTL
+    (stale-while-revalidate) enquanto são recarregadas em segundo plano.
+    Com `snapshots`, os datasets de SNAPSHOT_DATASETS são gravados em disco a
+    cada carga e, na primeira carga de uma chave após o início do processo,
+    o snapshot é servido na hora como valor vencido enquanto a recarga roda
+    (chaves invalidadas têm o snapshot apagado). Entradas
+    vencidas ficam guardadas por mais LAST_GOOD_MAX_AGE segundos como último
+    valor bom: uma carga que termina em DegradedResult (API indisponível)
+    devolve esse valor em vez de gravar o resultado degradado, e com o prazo
+    da execução esgotado ele é servido sem esperar a API.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, snapshots: Optional[SnapshotStore] = None):
+        self.max_entries = max_entries
+        self.snapshots = snapshots
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_hits = 0
+        self.snapshot_hits = 0
+        self.fallback_hits = 0
+        self._refreshing: set = set()
+        self._refresh_executor: Optional[ThreadPoolExecutor] = None
+        self._dataset_stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, dataset: str, field: str):
+        stats = self._dataset_stats.setdefault(dataset, {"hits": 0, "stale_hits": 0, "misses": 0})
+        stats[field] += 1
+
+    def _lookup(self, key: Tuple) -> Tuple[Optional[_Entry], bool]:
+        """(entrada, ainda no TTL) sob o lock; vencidas além do stale contam como ausentes (e saem após keep_until)"""
+        dataset = key[1]
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and now < entry.stale_until:
+            self._entries.move_to_end(key)
+            fresh = now < entry.expires_at
+            if fresh:
+                self.hits += 1
+                self._count(dataset, "hits")
+            else:
+                self.stale_hits += 1
+                self._count(dataset, "stale_hits")
+            return entry, fresh
+        if entry is not None and now >= entry.keep_until:
+            del self._entries[key]
+        self.misses += 1
+        self._count(dataset, "misses")
+        return None, False
+
+    def get(self, key: Tuple) -> Tuple[bool, Any]:
+        """(True, valor) se houver entrada dentro do TTL; (False, None) caso contrário"""
+        with self._lock:
+            entry, fresh = self._lookup(key)
+        return (True, entry.value) if fresh else (False, None)
+
+    def age(self, key: Tuple) -> Optional[float]:
+        """Segundos desde que o valor em cache foi obtido; None se não houver valor"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else time.time() - entry.stored_at
+
+    def set(self, key: Tuple, value: Any, ttl: float, stale_ttl: float = 0, stored_at: Optional[float] = None):
+        """Grava uma entrada, descartando as menos usadas acima do limite"""
+        with self._lock:
+            self._entries[key] = _Entry(value, ttl, stale_ttl, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key: Tuple, loader: Callable[[], Any], ttl: float, stale_ttl: float = 0) -> Any:
+        """Valor em cache ou resultado de `loader` (carregado uma única vez por chave)
+
+        Um valor vencido dentro de `stale_ttl` é devolvido na hora e a recarga
+        roda em segundo plano. Resultados None (falha na busca) não são
+        guardados, então o último valor bom continua valendo.
+        """
+        with self._lock:
+            entry, fresh = self._lookup(key)
+        if entry is not None:
+            if not fresh:
+                self._refresh_in_background(key, loader, ttl, stale_ttl)
+            return entry.value
+
+        if expired():
+            # Sem tempo para buscar: último valor bom agora, recarga em segundo plano
+            found, value = self._last_good(key, "prazo da página esgotado")
+            if found:
+                self._refresh_in_background(key, loader, ttl, stale_ttl)
+                return value
+
+        snapshot = self._from_snapshot(key, stale_ttl or ttl)
+        if snapshot is not None:
+            self._refresh_in_background(key, loader, ttl, stale_ttl)
+            return snapshot
+
+        return self._shared_load(key, loader, ttl, stale_ttl)
+
+    def refresh(self, key: Tuple, loader: Callable[[], Any], ttl: float, stale_ttl: float = 0) -> Any:
+        """Recarrega `key` agora, independentemente do TTL (ex.: pré-carregamento)"""
+        return self._shared_load(key, loader, ttl, stale_ttl)
+
+    def _shared_load(self, key: Tuple, loader: Callable[[], Any], ttl: float, stale_ttl: float) -> Any:
+        """Carga única por chave; quem aguarda uma carga em andamento espera no máximo o que resta do prazo"""
+        try:
+            return self._flights.do(key, lambda: self._load(key, loader, ttl, stale_ttl), timeout=remaining())
+        except FlightTimeout:
+            return self._last_good(key, "prazo da página esgotado")[1]
+
+    def _last_good(self, key: Tuple, reason: str) -> Tuple[bool, Any]:
+        """(True, valor) da última entrada guardada para `key`, mesmo vencida; (False, None) se não houver"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            self.fallback_hits += 1
+        logger.warning("%s: servindo %s obtido há %.0fs", reason, key[1], time.time() - entry.stored_at)
+        return True, entry.value
+
+    def _load(self, key: Tuple, loader: Callable[[], Any], ttl: float, stale_ttl: float) -> Any:
+        try:
+            value = loader()
+        except DegradedResult as degraded:
+            found, last_good = self._last_good(key, "API indisponível ou prazo esgotado")
+            return last_good if found else degraded.value
+        if value is not None:
+            self.set(key, value, ttl, stale_ttl)
+            self._save_snapshot(key, value)
+        return value
+
+    def _from_snapshot(self, key: Tuple, stale_ttl: float) -> Any:
+        """Último valor gravado em disco para `key`, já inserido no cache como vencido (None se não houver)"""
+        if self.snapshots is None or key[1] not in SNAPSHOT_DATASETS:
+            return None
+        try:
+            snapshot = self.snapshots.load(key)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Snapshot de %s ilegível: %s", key[1], e)
+            return None
+        if snapshot is None:
+            return None
+
+        value, saved_at = snapshot
+        self.set(key, value, 0, stale_ttl, stored_at=saved_at)
+        with self._lock:
+            self.snapshot_hits += 1
+        logger.debug("Servindo snapshot de %s gravado há %.0fs", key[1], time.time() - saved_at)
+        return value
+
+    def _save_snapshot(self, key: Tuple, value: Any):
+        if self.snapshots is None or key[1] not in SNAPSHOT_DATASETS:
+            return
+        try:
+            self.snapshots.save(key, value)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Falha ao gravar snapshot de %s: %s", key[1], e)
+
+    def _discard_snapshot(self, key: Tuple):
+        """Um valor invalidado não pode voltar do disco como se fosse atual"""
+        if self.snapshots is None or key[1] not in SNAPSHOT_DATASETS:
+            return
+        try:
+            self.snapshots.discard(key)
+        except OSError as e:
+            logger.warning("Falha ao apagar snapshot de %s: %s", key[1], e)
+
+    def _refresh_in_background(self, key: Tuple, loader: Callable[[], Any], ttl: float, stale_ttl: float):
+        """Agenda a recarga de `key`, no máximo uma por chave ao mesmo tempo"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(
+                    max_workers=REFRESH_WORKERS, thread_name_prefix="cache-refresh"
+                )
+
+        def refresh():
+            try:
+                self._flights.do(key, lambda: self._load(key, loader, ttl, stale_ttl))
+            except Exception as e:
+                logger.warning("Falha ao atualizar %s em segundo plano: %s", key[1], e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_executor.submit(refresh)
+
+    def invalidate(self, tenant: Optional[str] = None, dataset: Optional[str] = None,
+                   predicate: Optional[Callable[[Tuple], bool]] = None) -> int:
+        """Remove as entradas que casam com os filtros; retorna quantas foram removidas"""
+        with self._lock:
+            keys = [
+                key for key in self._entries
+                if (tenant is None or key[0] == tenant)
+                and (dataset is None or key[1] == dataset)
+                and (predicate is None or predicate(key))
+            ]
+            for key in keys:
+                del self._entries[key]
+        for key in keys:
+            self._discard_snapshot(key)
+        return len(keys)
+
+    def discard(self, key: Tuple) -> bool:
+        """Remove uma entrada específica (e o snapshot dela); retorna se ela existia"""
+        with self._lock:
+            found = self._entries.pop(key, None) is not None
+        self._discard_snapshot(key)
+        return found
+
+    def clear(self):
+        """Remove todas as entradas (os contadores são mantidos)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de uso do cache"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "snapshot_hits": self.snapshot_hits,
+                "fallback_hits": self.fallback_hits,
+                "evictions": self.evictions,
+                "refreshing": len(self._refreshing),
+                "datasets": {name: dict(stats) for name, stats in self._dataset_stats.items()},
+            }
+
+
+_shared_cache: Optional[ResponseCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Cache compartilhado do processo (as chaves separam os tenants)"""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = ResponseCache(snapshots=get_snapshot_store())
+    return _shared_cache
+
+
+def cached(dataset: str):
+    """Guarda o resultado de um método do cliente no cache de respostas
+
+    A chave combina o tenant do cliente (`cache_tenant`), o `dataset` e os
+    argumentos da chamada já associados aos nomes dos parâmetros, então
+    `f("a", end="b")` e `f(start="a", end="b")` compartilham a entrada.
+    O TTL vem de DATASET_TTLS; datasets em SWR_DATASETS usam
+    stale-while-revalidate. `método.cache_key(cliente, ...)` devolve a chave
+    de uma chamada (ex.: para consultar a idade do valor) e
+    `método.refresh(cliente, ...)` recarrega a entrada ignorando o TTL.
+    Resultados de cargas em que algum endpoint usado por elas ficou
+    indisponível (`cliente.api_failing_since(início, famílias)`) ou que
+    terminaram com o prazo da execução esgotado (request_deadline) não
+    substituem o último valor bom guardado.
+    """
+    def decorator(method: Callable) -> Callable:
+        signature = inspect.signature(method)
+        self_name = next(iter(signature.parameters))
+
+        def cache_key(self, *args, **kwargs) -> Tuple:
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            params.pop(self_name)
+            return (self.cache_tenant, dataset, normalize_params(params))
+
+        def loader(self, *args, **kwargs) -> Callable[[], Any]:
+            def load():
+                started = time.time()
+                with track_families() as families:
+                    value = method(self, *args, **kwargs)
+                self.dataset_families[dataset] = families
+                if self.api_failing_since(started, families) or expired():
+                    raise DegradedResult(value)
+                return value
+            return load
+
+        def ttls() -> Tuple[float, float]:
+            ttl = DATASET_TTLS.get(dataset, DEFAULT_TTL)
+            return ttl, STALE_MAX_AGE if STALE_WHILE_REVALIDATE and dataset in SWR_DATASETS else 0
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            return self.response_cache.get_or_load(
+                cache_key(self, *args, **kwargs), loader(self, *args, **kwargs), *ttls()
+            )
+
+        def refresh(self, *args, **kwargs):
+            return self.response_cache.refresh(
+                cache_key(self, *args, **kwargs), loader(self, *args, **kwargs), *ttls()
+            )
+
+        wrapper.cache_dataset = dataset
+        wrapper.cache_key = cache_key
+        wrapper.refresh = refresh
+        return wrapper
+
+    return decorator
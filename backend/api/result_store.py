@@ -0,0 +1,167 @@
+"""
+Armazenamento compartilhado (somente leitura) dos resultados processados
+"""
+import functools
+import inspect
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.api.response_cache import normalize_params
+from backend.api.single_flight import SingleFlight
+from backend.models.data_models import DealBatch
+from backend.utils.instrumentation import get_logger
+
+
+logger = get_logger(__name__)
+
+# Quantidade máxima de resultados mantidos (as chaves incluem a versão dos dados, então não há TTL)
+RESULT_STORE_MAX_ENTRIES = int(os.getenv("RD_RESULT_STORE_MAX_ENTRIES", "64"))
+
+
+def _argument_key(value: Any) -> Hashable:
+    """Chave de um argumento: lotes de deals entram pela versão carimbada, o resto normalizado"""
+    if isinstance(value, DealBatch):
+        return ("deal_batch", value.fingerprint())
+    return normalize_params({"value": value})
+
+
+def freeze(value: Any) -> Any:
+    """Versão somente leitura de um resultado compartilhado entre sessões
+
+    DataFrames/Series têm os arrays das colunas marcados como não graváveis
+    (sem copiar os dados); dicionários viram MappingProxyType e listas
+    viram tuplas, recursivamente. O resto é devolvido como está.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        for array in value._mgr.arrays:
+            array = getattr(array, "_ndarray", array)
+            if isinstance(array, np.ndarray):
+                array.flags.writeable = False
+        return value
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+        return value
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def share(value: Any) -> Any:
+    """Referência a um resultado congelado para um chamador, sem copiar os dados
+
+    DataFrames/Series saem como cópia rasa: mesmos buffers (somente
+    leitura), mas um objeto próprio, então trocar ou criar colunas não
+    chega às outras sessões.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    return value
+
+
+class ResultStore:
+    """Resultados processados calculados uma única vez por processo
+
+    Todas as sessões reaproveitam o mesmo cálculo e os mesmos dados: o
+    resultado é congelado (freeze) ao ser guardado e cada chamador recebe
+    só uma referência rasa a ele (share), então a memória não cresce com o
+    número de sessões e escritas no lugar falham em vez de vazar para as
+    outras. Resultados None (falha ou dados ausentes) não são guardados: a
+    próxima chamada calcula de novo.
+    """
+
+    def __init__(self, max_entries: int = RESULT_STORE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key: Tuple, compute: Callable[[], Any]) -> Any:
+        """Resultado de `key` (calculado uma única vez, mesmo com chamadas simultâneas)"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return share(self._entries[key])
+            self.misses += 1
+
+        return share(self._flights.do(key, lambda: self._compute(key, compute)))
+
+    def _compute(self, key: Tuple, compute: Callable[[], Any]) -> Any:
+        value = compute()
+        if value is None:
+            return None
+        value = freeze(value)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        """Remove todos os resultados (os contadores são mantidos)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de uso do armazenamento"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_shared_store: Optional[ResultStore] = None
+_shared_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    """Armazenamento compartilhado do processo"""
+    global _shared_store
+    if _shared_store is None:
+        with _shared_store_lock:
+            if _shared_store is None:
+                _shared_store = ResultStore()
+    return _shared_store
+
+
+def shared_result(name: str):
+    """Guarda o resultado de um método de processamento no armazenamento compartilhado
+
+    A chave combina `name` e os argumentos da chamada (exceto o primeiro,
+    a instância); lotes de deals entram pela versão carimbada na busca
+    (DealBatch.fingerprint), sem percorrer o conteúdo.
+    """
+    def decorator(method: Callable) -> Callable:
+        signature = inspect.signature(method)
+        self_name = next(iter(signature.parameters))
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            key = (name,) + tuple(
+                (param, _argument_key(value)) for param, value in bound.arguments.items() if param != self_name
+            )
+            return get_result_store().get_or_compute(key, lambda: method(self, *args, **kwargs))
+
+        return wrapper
+
+    return decorator
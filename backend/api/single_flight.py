@@ -0,0 +1,82 @@
+"""
+Coalescência de requisições concorrentes idênticas (single-flight)
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class FlightTimeout(TimeoutError):
+    """A execução em andamento não terminou dentro do tempo de espera do chamador"""
+
+
+class _Flight:
+    """Execução em andamento compartilhada pelos chamadores de uma mesma chave"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Garante uma única execução por chave entre chamadas concorrentes
+
+    O primeiro chamador executa a função; os demais que chegam enquanto ela
+    está em andamento esperam e recebem o mesmo resultado (ou a mesma exceção).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Executa `fn` ou aguarda (até `timeout` segundos) a execução em andamento para a mesma chave
+
+        Quem só aguarda e estoura o `timeout` recebe FlightTimeout; a execução
+        continua e o resultado fica para os demais.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.executions += 1
+                leader = True
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            if not flight.done.wait(timeout):
+                raise FlightTimeout(f"Execução em andamento não terminou em {timeout:g}s")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+        return flight.result
+
+    def in_flight(self) -> int:
+        """Quantidade de chaves sendo executadas no momento"""
+        with self._lock:
+            return len(self._flights)
+
+
+def make_request_key(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None) -> tuple:
+    """Chave normalizada de uma requisição (endpoint + parâmetros + headers)"""
+    params_key = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+    headers_key = tuple(sorted((str(k).lower(), str(v)) for k, v in (headers or {}).items()))
+    return (url, params_key, headers_key)
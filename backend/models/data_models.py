@@ -1,12 +1,40 @@
 """
 Modelos de dados para o sistema
 """
-from dataclasses import dataclass
-from typing import Optional, List, Dict, Any
-from datetime import date
+import hashlib
+import math
+from array import array
 
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Union
+from datetime import date, datetime, timezone
 
-@dataclass
+
+def _to_epoch(value: Any) -> float:
+    """Converte um timestamp ISO 8601 da API em segundos desde a época (NaN se ausente)"""
+    if not value or not isinstance(value, str):
+        return math.nan
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return math.nan
+
+
+def _to_iso(epoch: Optional[float]) -> Optional[str]:
+    """Segundos desde a época em ISO 8601 com fuso UTC (None se ausente ou NaN; 0 é a própria época)"""
+    if epoch is None or math.isnan(epoch):
+        return None
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+def _nested_value(record: Dict, field: str, key: str) -> Optional[str]:
+    value = record.get(field)
+    return value.get(key) if isinstance(value, dict) else None
+
+
+@dataclass(slots=True)
 class Deal:
     """Modelo para representar um negócio"""
     id: str
@@ -16,9 +44,318 @@ class Deal:
     user_name: Optional[str] = None
     pipeline_id: Optional[str] = None
     pipeline_name: Optional[str] = None
+    created_at: Optional[float] = None
+    updated_at: Optional[float] = None
 
+    @classmethod
+    def from_api(cls, deal: Dict) -> "Deal":
+        """Cria um Deal a partir de um registro de /api/v1/deals"""
+        created_at = _to_epoch(deal.get("created_at"))
+        updated_at = _to_epoch(deal.get("updated_at"))
+        user_name = _nested_value(deal, "user", "name")
+        return cls(
+            id=deal.get("id") or deal.get("_id"),
+            name=deal.get("name"),
+            rating=deal.get("rating") or 0,
+            stage_name=_nested_value(deal, "deal_stage", "name") or "Sem Etapa",
+            user_name=user_name.strip() if user_name else None,
+            pipeline_id=_nested_value(deal, "deal_pipeline", "id"),
+            pipeline_name=_nested_value(deal, "deal_pipeline", "name"),
+            created_at=None if math.isnan(created_at) else created_at,
+            updated_at=None if math.isnan(updated_at) else updated_at
+        )
 
-@dataclass
+
+class DealBatch:
+    """Coleção colunar de negócios
+
+    Usuário, etapa e funil são codificados em dicionários (`users`, `stages`,
+    `pipeline_ids`/`pipeline_names`) e guardados como códigos inteiros; rating
+    e timestamps (epoch) ficam em arrays compactos. Código -1 indica ausência.
+    """
+
+    __slots__ = (
+        "ids", "names", "ratings", "user_codes", "stage_codes", "pipeline_codes",
+        "created_at", "updated_at", "users", "stages", "pipeline_ids", "pipeline_names",
+        "meta", "_positions", "_user_index", "_stage_index", "_pipeline_index", "_frame"
+    )
+
+    def __init__(self, meta: Optional[Dict[str, Any]] = None):
+        self.ids: List[str] = []
+        self.names: List[Optional[str]] = []
+        self.ratings = array("b")
+        self.user_codes = array("i")
+        self.stage_codes = array("i")
+        self.pipeline_codes = array("i")
+        self.created_at = array("d")
+        self.updated_at = array("d")
+        self.users: List[str] = []
+        self.stages: List[str] = []
+        self.pipeline_ids: List[Optional[str]] = []
+        self.pipeline_names: List[Optional[str]] = []
+        self.meta: Dict[str, Any] = dict(meta or {})
+        self._positions: Optional[Dict[str, int]] = None
+        self._user_index: Optional[Dict[str, int]] = None
+        self._stage_index: Optional[Dict[str, int]] = None
+        self._pipeline_index: Optional[Dict[Any, int]] = None
+        self._frame: Optional[pd.DataFrame] = None
+
+    @classmethod
+    def from_api_deals(cls, deals: Iterable[Dict], **meta) -> "DealBatch":
+        """Cria o lote a partir dos registros de /api/v1/deals"""
+        batch = cls(meta)
+        batch.upsert_many(deals)
+        return batch
+
+    @classmethod
+    def from_payload(cls, payload: Union["DealBatch", Dict, None]) -> Optional["DealBatch"]:
+        """Aceita um DealBatch ou uma resposta da API no formato {"deals": [...]}"""
+        if payload is None or isinstance(payload, DealBatch):
+            return payload
+        if not isinstance(payload, dict) or "deals" not in payload:
+            return None
+        meta = {key: value for key, value in payload.items() if key != "deals"}
+        return cls.from_api_deals(payload["deals"], **meta)
+
+    # -------- Construção --------
+
+    def _ensure_indexes(self):
+        if self._positions is None:
+            self._positions = {deal_id: i for i, deal_id in enumerate(self.ids)}
+            self._user_index = {name: i for i, name in enumerate(self.users)}
+            self._stage_index = {name: i for i, name in enumerate(self.stages)}
+            self._pipeline_index = {
+                (pipeline_id, name): i for i, (pipeline_id, name) in enumerate(zip(self.pipeline_ids, self.pipeline_names))
+            }
+
+    @staticmethod
+    def _encode(value, index: Dict, values: List) -> int:
+        if value is None:
+            return -1
+        code = index.get(value)
+        if code is None:
+            code = len(values)
+            index[value] = code
+            values.append(value)
+        return code
+
+    def _thaw(self):
+        """Copia para arrays graváveis as colunas lidas de um snapshot (memoryviews somente leitura)"""
+        for name in ("ratings", "user_codes", "stage_codes", "pipeline_codes", "created_at", "updated_at"):
+            column = getattr(self, name)
+            if isinstance(column, memoryview):
+                setattr(self, name, array(column.format, column.tobytes()))
+
+    def upsert(self, deal: Dict):
+        """Insere um registro da API ou substitui o de mesmo id"""
+        self._thaw()
+        self._ensure_indexes()
+        self._frame = None
+        self.meta.pop("fingerprint", None)
+        deal_id = deal.get("id") or deal.get("_id")
+        if deal_id is None:
+            return
+
+        user_name = _nested_value(deal, "user", "name")
+        user_name = user_name.strip() if user_name else None
+        pipeline_id = _nested_value(deal, "deal_pipeline", "id")
+        pipeline_name = _nested_value(deal, "deal_pipeline", "name")
+
+        rating = deal.get("rating")
+        rating = rating if isinstance(rating, int) and -128 <= rating <= 127 else 0
+        user_code = self._encode(user_name or None, self._user_index, self.users)
+        stage_code = self._encode(_nested_value(deal, "deal_stage", "name") or "Sem Etapa", self._stage_index, self.stages)
+        pipeline_code = -1
+        if pipeline_id is not None or pipeline_name is not None:
+            pipeline_code = self._pipeline_index.get((pipeline_id, pipeline_name), -1)
+            if pipeline_code == -1:
+                pipeline_code = len(self.pipeline_ids)
+                self._pipeline_index[(pipeline_id, pipeline_name)] = pipeline_code
+                self.pipeline_ids.append(pipeline_id)
+                self.pipeline_names.append(pipeline_name)
+
+        position = self._positions.get(deal_id)
+        if position is None:
+            self._positions[deal_id] = len(self.ids)
+            self.ids.append(deal_id)
+            self.names.append(deal.get("name"))
+            self.ratings.append(rating)
+            self.user_codes.append(user_code)
+            self.stage_codes.append(stage_code)
+            self.pipeline_codes.append(pipeline_code)
+            self.created_at.append(_to_epoch(deal.get("created_at")))
+            self.updated_at.append(_to_epoch(deal.get("updated_at")))
+        else:
+            self.names[position] = deal.get("name")
+            self.ratings[position] = rating
+            self.user_codes[position] = user_code
+            self.stage_codes[position] = stage_code
+            self.pipeline_codes[position] = pipeline_code
+            self.created_at[position] = _to_epoch(deal.get("created_at"))
+            self.updated_at[position] = _to_epoch(deal.get("updated_at"))
+
+    def upsert_many(self, deals: Iterable[Dict]) -> int:
+        """Insere/substitui vários registros; retorna quantos foram processados"""
+        count = 0
+        for deal in deals:
+            self.upsert(deal)
+            count += 1
+        return count
+
+    def copy(self) -> "DealBatch":
+        """Cópia independente (as colunas são copiadas, os dicionários também)"""
+        other = DealBatch(self.meta)
+        other.ids = list(self.ids)
+        other.names = list(self.names)
+        other.ratings = array("b", self.ratings)
+        other.user_codes = array("i", self.user_codes)
+        other.stage_codes = array("i", self.stage_codes)
+        other.pipeline_codes = array("i", self.pipeline_codes)
+        other.created_at = array("d", self.created_at)
+        other.updated_at = array("d", self.updated_at)
+        other.users = list(self.users)
+        other.stages = list(self.stages)
+        other.pipeline_ids = list(self.pipeline_ids)
+        other.pipeline_names = list(self.pipeline_names)
+        return other
+
+    def take(self, positions: Iterable[int]) -> "DealBatch":
+        """Novo lote só com as linhas em `positions` (mesmos dicionários de códigos)"""
+        positions = list(positions)
+        other = DealBatch(self.meta)
+        other.meta.pop("fingerprint", None)
+        other.ids = [self.ids[i] for i in positions]
+        other.names = [self.names[i] for i in positions]
+        other.ratings = array("b", (self.ratings[i] for i in positions))
+        other.user_codes = array("i", (self.user_codes[i] for i in positions))
+        other.stage_codes = array("i", (self.stage_codes[i] for i in positions))
+        other.pipeline_codes = array("i", (self.pipeline_codes[i] for i in positions))
+        other.created_at = array("d", (self.created_at[i] for i in positions))
+        other.updated_at = array("d", (self.updated_at[i] for i in positions))
+        other.users = list(self.users)
+        other.stages = list(self.stages)
+        other.pipeline_ids = list(self.pipeline_ids)
+        other.pipeline_names = list(self.pipeline_names)
+        return other
+
+    def position(self, deal_id: str) -> Optional[int]:
+        """Linha do deal com o id informado (None se não estiver no lote)"""
+        self._ensure_indexes()
+        return self._positions.get(deal_id)
+
+    # -------- Leitura --------
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, i: int) -> Deal:
+        user_code = self.user_codes[i]
+        pipeline_code = self.pipeline_codes[i]
+        created_at = self.created_at[i]
+        updated_at = self.updated_at[i]
+        return Deal(
+            id=self.ids[i],
+            name=self.names[i],
+            rating=self.ratings[i],
+            stage_name=self.stages[self.stage_codes[i]],
+            user_name=self.users[user_code] if user_code >= 0 else None,
+            pipeline_id=self.pipeline_ids[pipeline_code] if pipeline_code >= 0 else None,
+            pipeline_name=self.pipeline_names[pipeline_code] if pipeline_code >= 0 else None,
+            created_at=None if math.isnan(created_at) else created_at,
+            updated_at=None if math.isnan(updated_at) else updated_at
+        )
+
+    def __iter__(self) -> Iterator[Deal]:
+        for i in range(len(self.ids)):
+            yield self[i]
+
+    @staticmethod
+    def _column(values: array, dtype) -> np.ndarray:
+        # np.frombuffer não aceita buffers vazios de forma uniforme entre versões
+        return np.frombuffer(values, dtype=dtype) if len(values) else np.empty(0, dtype=dtype)
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame normalizado do lote, construído uma única vez
+
+        `user` e `stage` são categóricos montados direto dos códigos do lote;
+        `stage` é ordenado por DEFAULT_STAGE_ORDER seguido das etapas extras na
+        ordem em que aparecem. O DataFrame é descartado a cada `upsert`.
+        """
+        if self._frame is None:
+            stage_order = list(DEFAULT_STAGE_ORDER) + [stage for stage in self.stages if stage not in DEFAULT_STAGE_ORDER]
+            position = {stage: i for i, stage in enumerate(stage_order)}
+            remap = np.array([position[stage] for stage in self.stages], dtype=np.intc)
+
+            # Código -1 cai no último elemento (None)
+            pipeline_ids = np.array(self.pipeline_ids + [None], dtype=object)
+
+            self._frame = pd.DataFrame({
+                "id": np.array(self.ids, dtype=object),
+                "user": pd.Categorical.from_codes(self._column(self.user_codes, np.intc), categories=self.users),
+                "stage": pd.Categorical.from_codes(
+                    remap[self._column(self.stage_codes, np.intc)], categories=stage_order, ordered=True
+                ),
+                "pipeline_id": pipeline_ids[self._column(self.pipeline_codes, np.intc)],
+                "rating": self._column(self.ratings, np.int8),
+                "created_at": pd.to_datetime(self._column(self.created_at, np.float64), unit="s", utc=True),
+                "updated_at": pd.to_datetime(self._column(self.updated_at, np.float64), unit="s", utc=True)
+            })
+        return self._frame
+
+    def user_names(self) -> List[str]:
+        """Usuários (sem repetição, em ordem alfabética) que possuem deals no lote"""
+        used = set(self.user_codes)
+        return sorted(name for code, name in enumerate(self.users) if code in used and name)
+
+    def to_api_deals(self) -> List[Dict]:
+        """Registros no formato (projetado) de /api/v1/deals, para telas de debug (datas em UTC)"""
+        return [
+            {
+                "id": deal.id,
+                "name": deal.name,
+                "rating": deal.rating,
+                "user": {"name": deal.user_name} if deal.user_name else None,
+                "deal_stage": {"name": deal.stage_name},
+                "deal_pipeline": {"id": deal.pipeline_id, "name": deal.pipeline_name},
+                "created_at": _to_iso(deal.created_at),
+                "updated_at": _to_iso(deal.updated_at)
+            }
+            for deal in self
+        ]
+
+    def content_key(self) -> bytes:
+        """Resumo do conteúdo do lote (usado como chave de cache no lugar do lote inteiro)"""
+        digest = hashlib.blake2b(digest_size=16)
+        for column in (self.ratings, self.user_codes, self.stage_codes, self.pipeline_codes, self.created_at, self.updated_at):
+            digest.update(column.tobytes())
+        for values in (self.ids, self.users, self.stages, self.pipeline_ids, self.pipeline_names):
+            digest.update("\x1f".join(str(value) for value in values).encode())
+            digest.update(b"\x1e")
+        return digest.digest()
+
+    def fingerprint(self) -> str:
+        """Versão do conteúdo do lote, calculada uma única vez e guardada em meta["fingerprint"]
+
+        O cliente carimba o lote ao buscá-lo; processadores e gráficos usam
+        esse valor como chave de memoização (lotes iguais têm a mesma versão).
+        Qualquer `upsert` descarta o carimbo.
+        """
+        value = self.meta.get("fingerprint")
+        if value is None:
+            value = self.meta["fingerprint"] = self.content_key().hex()
+        return value
+
+    def __getstate__(self):
+        # Índices de construção são reconstruídos sob demanda, não precisam ir no pickle
+        self._thaw()
+        return {slot: getattr(self, slot) for slot in self.__slots__ if not slot.startswith("_")}
+
+    def __setstate__(self, state):
+        for slot in self.__slots__:
+            setattr(self, slot, state.get(slot))
+
+
+@dataclass(slots=True)
 class Stage:
     """Modelo para representar uma etapa do funil"""
     id: str
@@ -31,7 +368,7 @@ class Stage:
     description: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Pipeline:
     """Modelo para representar um funil de vendas"""
     id: str
@@ -76,8 +413,39 @@ class TeamMapping:
     users: List[str]
 
 
+@dataclass
+class ProbeResult:
+    """Resultado de um teste de endpoint (diagnóstico da API)"""
+    name: str
+    url: str
+    status_code: int = 0
+    success: bool = False
+    latency_ms: Optional[float] = None
+    size_bytes: int = 0
+    records: int = 0
+    error: Optional[str] = None
+    details: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Formato do relatório (campos do resultado mais os detalhes do endpoint)"""
+        report = {
+            "status_code": self.status_code,
+            "success": self.success,
+            "latency_ms": self.latency_ms,
+            "size_bytes": self.size_bytes,
+            "records": self.records,
+        }
+        if self.error is not None:
+            report["error"] = self.error
+        report.update(self.details)
+        return report
+
+
 # Constantes
 HOUSE_PIPELINE_ID = "689b59706e704a0024fc2374"
+
+# Período padrão do dashboard (últimos N dias até hoje)
+DEFAULT_WINDOW_DAYS = 30
 DEFAULT_STAGE_ORDER = [
     "LEADs", "LIGAÇÃO 1", "MENSAGEM", "LIGAÇÃO 2", "FOLLOW UP", 
     "AGENDAMENTO", "ATENDIMENTO REALIZADO", "NEGOCIAÇÃO", "FECHAMENTO", "PERDIDA"
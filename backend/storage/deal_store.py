@@ -0,0 +1,359 @@
+"""
+Armazenamento local (SQLite) de deals, etapas, usuários e equipes do CRM
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from backend.utils.instrumentation import get_logger
+
+
+logger = get_logger(__name__)
+
+# Diretório dos arquivos locais (configurável via ambiente; vazio desliga o armazenamento)
+DATA_DIR = os.getenv("RD_DATA_DIR", ".data")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deals (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    rating INTEGER,
+    win INTEGER,
+    user_id TEXT,
+    user_name TEXT,
+    stage_id TEXT,
+    stage_name TEXT,
+    pipeline_id TEXT,
+    pipeline_name TEXT,
+    amount_total REAL,
+    created_at TEXT,
+    updated_at TEXT,
+    closed_at TEXT,
+    status TEXT,
+    synced_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_deals_pipeline_id ON deals (pipeline_id);
+CREATE INDEX IF NOT EXISTS idx_deals_stage_name ON deals (stage_name);
+CREATE INDEX IF NOT EXISTS idx_deals_user_name ON deals (user_name);
+CREATE INDEX IF NOT EXISTS idx_deals_created_at ON deals (created_at);
+CREATE INDEX IF NOT EXISTS idx_deals_updated_at ON deals (updated_at);
+
+CREATE TABLE IF NOT EXISTS stages (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    nickname TEXT,
+    stage_order INTEGER,
+    pipeline_id TEXT,
+    pipeline_name TEXT,
+    objective TEXT,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_stages_pipeline_id ON stages (pipeline_id);
+
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    email TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_name ON users (name);
+
+CREATE TABLE IF NOT EXISTS teams (
+    id TEXT PRIMARY KEY,
+    name TEXT
+);
+
+CREATE TABLE IF NOT EXISTS team_users (
+    team_id TEXT,
+    user_name TEXT,
+    PRIMARY KEY (team_id, user_name)
+);
+"""
+
+DEAL_COLUMNS = [
+    "id", "name", "rating", "win", "user_id", "user_name", "stage_id", "stage_name",
+    "pipeline_id", "pipeline_name", "amount_total", "created_at", "updated_at", "closed_at", "status", "synced_at"
+]
+
+# Colunas acrescentadas depois da primeira versão do banco (adicionadas aos arquivos existentes)
+ADDED_DEAL_COLUMNS = {"status": "TEXT"}
+
+NAME_FIELDS = ["name", "full_name", "display_name", "username"]
+
+
+def _nested(deal: Dict, field: str, key: str) -> Optional[str]:
+    value = deal.get(field)
+    return value.get(key) if isinstance(value, dict) else None
+
+
+def _record_name(record: Dict) -> Optional[str]:
+    for field in NAME_FIELDS:
+        if record.get(field):
+            return str(record[field]).strip()
+    return None
+
+
+class DealStore:
+    """Banco SQLite (modo WAL) com os dados normalizados do CRM"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(deals)")}
+            for column, column_type in ADDED_DEAL_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE deals ADD COLUMN {column} {column_type}")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão da thread atual (sqlite3 não compartilha conexões entre threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -------- Escrita --------
+
+    def upsert_deals(self, deals: Iterable[Dict]) -> int:
+        """Insere ou atualiza deals no formato da API; retorna quantos foram gravados
+
+        Deals que já estão no banco com os mesmos dados não são regravados
+        (cada atualização da página só escreve as linhas que mudaram).
+        """
+        now = time.time()
+        rows = []
+        for deal in deals:
+            deal_id = deal.get("id") or deal.get("_id")
+            if not deal_id:
+                continue
+            win = deal.get("win")
+            rows.append((
+                deal_id,
+                deal.get("name"),
+                deal.get("rating"),
+                None if win is None else int(bool(win)),
+                _nested(deal, "user", "id"),
+                (_nested(deal, "user", "name") or "").strip() or None,
+                _nested(deal, "deal_stage", "id"),
+                _nested(deal, "deal_stage", "name"),
+                _nested(deal, "deal_pipeline", "id"),
+                _nested(deal, "deal_pipeline", "name"),
+                deal.get("amount_total"),
+                deal.get("created_at"),
+                deal.get("updated_at"),
+                deal.get("closed_at"),
+                deal.get("status"),
+                now
+            ))
+
+        if not rows:
+            return 0
+
+        placeholders = ", ".join("?" for _ in DEAL_COLUMNS)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in DEAL_COLUMNS[1:])
+        data_columns = DEAL_COLUMNS[1:-1]
+        changed = (f"({', '.join('deals.' + column for column in data_columns)}) IS NOT "
+                   f"({', '.join('excluded.' + column for column in data_columns)})")
+        with self._connection() as conn:
+            written = conn.total_changes
+            conn.executemany(
+                f"INSERT INTO deals ({', '.join(DEAL_COLUMNS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT(id) DO UPDATE SET {updates} WHERE {changed}",
+                rows
+            )
+            return conn.total_changes - written
+
+    def upsert_stages(self, stages: Iterable[Dict]) -> int:
+        """Insere ou atualiza etapas no formato da API"""
+        rows = [
+            (
+                stage.get("id"),
+                stage.get("name"),
+                stage.get("nickname"),
+                stage.get("order"),
+                _nested(stage, "deal_pipeline", "id"),
+                _nested(stage, "deal_pipeline", "name"),
+                stage.get("objective"),
+                stage.get("description")
+            )
+            for stage in stages
+            if isinstance(stage, dict) and stage.get("id")
+        ]
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO stages "
+                "(id, name, nickname, stage_order, pipeline_id, pipeline_name, objective, description) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def upsert_users(self, users: Iterable[Dict]) -> int:
+        """Insere ou atualiza usuários no formato da API"""
+        rows = [
+            (user.get("id") or _record_name(user), _record_name(user), user.get("email"))
+            for user in users
+            if isinstance(user, dict) and _record_name(user)
+        ]
+        with self._connection() as conn:
+            conn.executemany("INSERT OR REPLACE INTO users (id, name, email) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def replace_teams(self, teams_info: Dict[str, Dict]) -> int:
+        """Substitui o diretório de equipes ({nome: {"id", "name", "users"}})"""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM team_users")
+            conn.execute("DELETE FROM teams")
+            conn.executemany(
+                "INSERT OR REPLACE INTO teams (id, name) VALUES (?, ?)",
+                [(str(info.get("id")), name) for name, info in teams_info.items()]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO team_users (team_id, user_name) VALUES (?, ?)",
+                [(str(info.get("id")), user) for info in teams_info.values() for user in info.get("users", [])]
+            )
+        return len(teams_info)
+
+    # -------- Leitura --------
+
+    def get_deals(self, pipeline_id: Optional[str] = None, start_date: Optional[str] = None,
+                  end_date: Optional[str] = None, user_name: Optional[str] = None) -> List[Dict]:
+        """Consulta deals pelos índices e devolve no formato da API"""
+        clauses, args = [], []
+        if pipeline_id:
+            clauses.append("pipeline_id = ?")
+            args.append(pipeline_id)
+        if start_date:
+            clauses.append("created_at >= ?")
+            args.append(start_date)
+        if end_date:
+            # end_date é inclusivo: comparar com o início do dia seguinte
+            next_day = (date.fromisoformat(end_date[:10]) + timedelta(days=1)).isoformat()
+            clauses.append("created_at < ?")
+            args.append(next_day)
+        if user_name:
+            clauses.append("user_name = ?")
+            args.append(user_name.strip())
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connection().execute(f"SELECT * FROM deals {where} ORDER BY created_at", args).fetchall()
+        return [self._row_to_deal(row) for row in rows]
+
+    def count_deals(self, pipeline_id: Optional[str] = None) -> int:
+        """Quantidade de deals (de um funil, pelo índice de pipeline_id)"""
+        if pipeline_id:
+            row = self._connection().execute("SELECT COUNT(*) FROM deals WHERE pipeline_id = ?", (pipeline_id,)).fetchone()
+        else:
+            row = self._connection().execute("SELECT COUNT(*) FROM deals").fetchone()
+        return row[0]
+
+    def get_deal_user_names(self, pipeline_id: Optional[str] = None) -> List[str]:
+        """Responsáveis distintos dos deals (de um funil), sem carregar os deals"""
+        query = "SELECT DISTINCT user_name FROM deals WHERE user_name IS NOT NULL"
+        args: List[Any] = []
+        if pipeline_id:
+            query += " AND pipeline_id = ?"
+            args.append(pipeline_id)
+        rows = self._connection().execute(query + " ORDER BY user_name", args).fetchall()
+        return [row["user_name"] for row in rows]
+
+    def find_deal_user_names(self, fragment: str) -> List[str]:
+        """Responsáveis cujo nome contém `fragment` (sem diferenciar maiúsculas), lidos só do índice de user_name"""
+        fragment = fragment.lower()
+        return [name for name in self.get_deal_user_names() if fragment in name.lower()]
+
+    def get_stages(self, pipeline_id: Optional[str] = None) -> List[Dict]:
+        """Consulta etapas (opcionalmente de um funil) no formato da API"""
+        query = "SELECT * FROM stages"
+        args: List[Any] = []
+        if pipeline_id:
+            query += " WHERE pipeline_id = ?"
+            args.append(pipeline_id)
+        rows = self._connection().execute(query + " ORDER BY stage_order", args).fetchall()
+        return [
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "nickname": row["nickname"],
+                "order": row["stage_order"],
+                "objective": row["objective"],
+                "description": row["description"],
+                "deal_pipeline": {"id": row["pipeline_id"], "name": row["pipeline_name"]}
+            }
+            for row in rows
+        ]
+
+    def get_user_names(self) -> List[str]:
+        """Nomes de todos os usuários conhecidos"""
+        rows = self._connection().execute("SELECT DISTINCT name FROM users ORDER BY name").fetchall()
+        return [row["name"] for row in rows]
+
+    def get_teams(self) -> Dict[str, Dict]:
+        """Diretório de equipes no formato de fetch_teams_directly"""
+        conn = self._connection()
+        teams_info = {}
+        for team in conn.execute("SELECT id, name FROM teams ORDER BY name").fetchall():
+            users = conn.execute(
+                "SELECT user_name FROM team_users WHERE team_id = ? ORDER BY user_name", (team["id"],)
+            ).fetchall()
+            teams_info[team["name"]] = {
+                "id": team["id"],
+                "name": team["name"],
+                "users": [row["user_name"] for row in users]
+            }
+        return teams_info
+
+    @staticmethod
+    def _row_to_deal(row: sqlite3.Row) -> Dict:
+        win = row["win"]
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "rating": row["rating"],
+            "win": None if win is None else bool(win),
+            "user": {"id": row["user_id"], "name": row["user_name"]} if row["user_name"] else None,
+            "deal_stage": {"id": row["stage_id"], "name": row["stage_name"]},
+            "deal_pipeline": {"id": row["pipeline_id"], "name": row["pipeline_name"]},
+            "amount_total": row["amount_total"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "closed_at": row["closed_at"],
+            "status": row["status"]
+        }
+
+
+_stores: Dict[str, DealStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_deal_store(base_url: str, token: str) -> Optional[DealStore]:
+    """Banco local do par (base_url, token); None se o armazenamento estiver desligado"""
+    if not DATA_DIR:
+        return None
+
+    fingerprint = hashlib.sha256(f"{base_url}|{token}".encode()).hexdigest()[:16]
+    path = os.path.join(DATA_DIR, f"crm_{fingerprint}.sqlite3")
+
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            try:
+                store = DealStore(path)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("Armazenamento local indisponível: %s", e)
+                return None
+            _stores[path] = store
+
+    return store
@@ -0,0 +1,245 @@
+"""
+Snapshots colunares (mapeados em memória) dos últimos dados do dashboard
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from backend.models.data_models import DealBatch
+from backend.storage.deal_store import DATA_DIR
+from backend.utils.instrumentation import get_logger
+
+
+logger = get_logger(__name__)
+
+# Liga/desliga os snapshots (ficam em DATA_DIR/snapshots)
+SNAPSHOTS_ENABLED = os.getenv("RD_SNAPSHOTS", "1") == "1"
+
+# Datasets do cache de respostas gravados em snapshot (os que o dashboard abre primeiro)
+SNAPSHOT_DATASETS = {"house_deals", "house_stages", "teams", "users"}
+
+# Parâmetros de período: o snapshot de deals é um só por consulta e é recortado na leitura
+WINDOW_PARAMS = ("start_date", "end_date")
+
+MAGIC = b"RDSNAP01"
+ALIGNMENT = 8
+
+# Colunas numéricas do DealBatch e seus formatos (array/memoryview)
+DEAL_COLUMNS = {
+    "ratings": "b", "user_codes": "i", "stage_codes": "i", "pipeline_codes": "i",
+    "created_at": "d", "updated_at": "d",
+}
+# Colunas de texto do DealBatch, gravadas como índices no dicionário de strings (-1 = None)
+DEAL_STRING_COLUMNS = ("ids", "names", "users", "stages", "pipeline_ids", "pipeline_names")
+
+
+def _pack(header: Dict[str, Any], sections: Dict[str, bytes]) -> bytes:
+    """MAGIC | tamanho do cabeçalho | cabeçalho JSON | seções alinhadas em 8 bytes"""
+    layout = {}
+    offset = 0
+    for name, data in sections.items():
+        layout[name] = [offset, len(data)]
+        offset += len(data) + (-len(data) % ALIGNMENT)
+    header = dict(header, sections=layout)
+
+    header_bytes = json.dumps(header).encode()
+    header_bytes += b" " * (-(len(MAGIC) + 4 + len(header_bytes)) % ALIGNMENT)
+    parts = [MAGIC, struct.pack("<I", len(header_bytes)), header_bytes]
+    for data in sections.values():
+        parts.append(data)
+        parts.append(b"\0" * (-len(data) % ALIGNMENT))
+    return b"".join(parts)
+
+
+def _encode_strings(batch: DealBatch) -> Tuple[Dict[str, bytes], Dict[str, bytes]]:
+    """Dicionário de strings (offsets + bytes UTF-8) e as colunas de texto como índices nele"""
+    index: Dict[str, int] = {}
+    offsets = array("q", [0])
+    blob = bytearray()
+    columns = {}
+    for column in DEAL_STRING_COLUMNS:
+        codes = array("i")
+        for value in getattr(batch, column):
+            if value is None:
+                codes.append(-1)
+                continue
+            code = index.get(value)
+            if code is None:
+                code = index[value] = len(index)
+                blob += str(value).encode()
+                offsets.append(len(blob))
+            codes.append(code)
+        columns[column] = codes.tobytes()
+    return {"string_offsets": offsets.tobytes(), "string_data": bytes(blob)}, columns
+
+
+def _decode_strings(view: memoryview, sections: Dict[str, List[int]]) -> List[str]:
+    offsets = _section(view, sections, "string_offsets").cast("q")
+    data = bytes(_section(view, sections, "string_data"))
+    return [data[offsets[i]:offsets[i + 1]].decode() for i in range(len(offsets) - 1)]
+
+
+def _section(view: memoryview, sections: Dict[str, List[int]], name: str) -> memoryview:
+    offset, length = sections[name]
+    return view[offset:offset + length]
+
+
+def _window_positions(batch: DealBatch, start: str, end: str) -> List[int]:
+    """Linhas criadas entre `start` e `end` (dias inteiros no fuso do servidor)"""
+    low = datetime.fromisoformat(str(start)[:10]).timestamp()
+    high = (datetime.fromisoformat(str(end)[:10]) + timedelta(days=1)).timestamp()
+    return [i for i, created_at in enumerate(batch.created_at) if low <= created_at < high]
+
+
+class SnapshotStore:
+    """Arquivos de snapshot, um por (tenant, dataset, parâmetros sem o período)
+
+    Lotes de deals são gravados em colunas (arrays compactos mais um
+    dicionário de strings) e lidos via mmap: as colunas numéricas do lote
+    devolvido apontam direto para as páginas do arquivo, compartilhadas por
+    todos os processos do servidor que abrirem o mesmo snapshot. Etapas e
+    equipes são pequenas e ficam em uma seção JSON. A gravação é atômica
+    (arquivo temporário + rename), então leitores nunca veem um arquivo
+    pela metade. Cada arquivo é lido no máximo uma vez por processo (só
+    serve para o início a frio): depois de lido, gravado ou descartado, o
+    valor atual é o do cache em memória ou o da API.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._written: Dict[str, str] = {}
+        # Arquivos já lidos, gravados ou descartados neste processo (não são lidos de novo)
+        self._consulted: Set[str] = set()
+        self.loads = 0
+        self.saves = 0
+
+    def _path(self, key: Tuple) -> Tuple[str, Dict[str, Any]]:
+        """Arquivo do snapshot de uma chave do cache e os parâmetros de período dela"""
+        tenant, dataset, params = key
+        window = {name: value for name, value in params if name in WINDOW_PARAMS}
+        rest = [item for item in params if item[0] not in WINDOW_PARAMS]
+        digest = hashlib.sha256(repr(rest).encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"{tenant}_{dataset}_{digest}.snap"), window
+
+    def save(self, key: Tuple, value: Any) -> bool:
+        """Grava o snapshot de uma chave do cache; retorna False se nada mudou desde a última gravação"""
+        path, window = self._path(key)
+        if isinstance(value, DealBatch):
+            version = value.fingerprint()
+            string_sections, string_columns = _encode_strings(value)
+            sections = {name: getattr(value, name).tobytes() for name in DEAL_COLUMNS}
+            sections.update(string_sections)
+            sections.update(string_columns)
+            meta = {k: v for k, v in value.meta.items() if k != "fingerprint"}
+            header = {"kind": "deal_batch", "rows": len(value), "meta": meta}
+        else:
+            data = json.dumps(value, ensure_ascii=False, default=str).encode()
+            version = hashlib.blake2b(data, digest_size=16).hexdigest()
+            sections = {"json": data}
+            header = {"kind": "json"}
+
+        with self._lock:
+            if self._written.get(path) == version:
+                return False
+            header.update(version=version, window=window, saved_at=time.time())
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(_pack(header, sections))
+                os.replace(tmp_path, path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            self._written[path] = version
+            self._consulted.add(path)
+            self.saves += 1
+        return True
+
+    def load(self, key: Tuple) -> Optional[Tuple[Any, float]]:
+        """(valor, momento da gravação) do snapshot de uma chave do cache; None se não houver
+
+        Deals de outro período são recortados para o período pedido (o valor
+        é só um ponto de partida até a próxima atualização). Só a primeira
+        leitura de cada arquivo no processo devolve o snapshot.
+        """
+        path, window = self._path(key)
+        with self._lock:
+            if path in self._consulted:
+                return None
+            self._consulted.add(path)
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        view = memoryview(mapped)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            return None
+        (header_length,) = struct.unpack_from("<I", view, len(MAGIC))
+        data_start = len(MAGIC) + 4 + header_length
+        header = json.loads(bytes(view[len(MAGIC) + 4:data_start]))
+        sections = header["sections"]
+        body = view[data_start:]
+
+        if header["kind"] == "json":
+            value = json.loads(bytes(_section(body, sections, "json")))
+        else:
+            strings = _decode_strings(body, sections)
+            value = DealBatch(header.get("meta"))
+            for name, fmt in DEAL_COLUMNS.items():
+                setattr(value, name, _section(body, sections, name).cast(fmt))
+            for name in DEAL_STRING_COLUMNS:
+                codes = _section(body, sections, name).cast("i")
+                setattr(value, name, [strings[code] if code >= 0 else None for code in codes])
+            if window and window != header.get("window"):
+                value = value.take(_window_positions(value, window["start_date"], window["end_date"]))
+                value.meta = {"total": len(value), "has_more": False}
+            value.meta["fingerprint"] = header["version"] if window == header.get("window") else value.fingerprint()
+
+        with self._lock:
+            self.loads += 1
+        return value, header["saved_at"]
+
+    def discard(self, key: Tuple) -> bool:
+        """Apaga o snapshot de uma chave invalidada (e não o lê mais neste processo); retorna se existia"""
+        path, _ = self._path(key)
+        with self._lock:
+            self._consulted.add(path)
+            self._written.pop(path, None)
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                return False
+        return True
+
+
+_snapshot_store: Optional[SnapshotStore] = None
+_snapshot_store_lock = threading.Lock()
+
+
+def get_snapshot_store() -> Optional[SnapshotStore]:
+    """Snapshots do processo; None se estiverem desligados ou o diretório não puder ser criado"""
+    global _snapshot_store
+    if not SNAPSHOTS_ENABLED or not DATA_DIR:
+        return None
+    if _snapshot_store is None:
+        with _snapshot_store_lock:
+            if _snapshot_store is None:
+                try:
+                    _snapshot_store = SnapshotStore(os.path.join(DATA_DIR, "snapshots"))
+                except OSError as e:
+                    logger.warning("Snapshots indisponíveis: %s", e)
+                    return None
+    return _snapshot_store
@@ -1,11 +1,20 @@
 """
 Funções utilitárias para o sistema
 """
+import functools
+import os
 from datetime import datetime
+import pandas as pd
 import streamlit as st
-from typing import List, Dict
+from typing import Any, Callable, List, Dict, Optional
 import hashlib
 
+from backend.api.deadline import request_deadline
+
+
+# Intervalo (segundos) da atualização automática das seções de dados; 0 desliga
+AUTO_REFRESH_SECONDS = int(os.getenv("RD_AUTO_REFRESH_SECONDS", "300"))
+
 
 def show_last_update():
     """Mostra quando os dados foram atualizados pela última vez"""
@@ -13,6 +22,76 @@ def show_last_update():
     st.caption(f"🕐 Última atualização: {now.strftime('%d/%m/%Y %H:%M:%S')}")
 
 
+def format_data_age(age_seconds: Optional[float]) -> str:
+    """Formata a idade dos dados (ex.: "12 segundos", "3 minutos")"""
+    seconds = int(age_seconds or 0)
+    if seconds < 60:
+        return f"{seconds} segundo{'s' if seconds != 1 else ''}"
+    minutes = seconds // 60
+    if minutes < 60:
+        return f"{minutes} minuto{'s' if minutes != 1 else ''}"
+    hours = minutes // 60
+    return f"{hours} hora{'s' if hours != 1 else ''}"
+
+
+def show_data_age(age_seconds: Optional[float], unavailable_since: Optional[float] = None):
+    """Mostra há quanto tempo os dados exibidos foram obtidos do CRM (com aviso se a API estiver indisponível)"""
+    if unavailable_since is not None:
+        since = datetime.fromtimestamp(unavailable_since).strftime('%d/%m/%Y %H:%M:%S')
+        shown = f" (dados de {format_data_age(age_seconds)} atrás)" if age_seconds is not None else ""
+        st.warning(f"⚠️ CRM indisponível desde {since}: exibindo os últimos dados obtidos{shown}")
+        return
+    if age_seconds is None:
+        show_last_update()
+        return
+    st.caption(f"🕐 Dados de {format_data_age(age_seconds)} atrás")
+
+
+def auto_refresh_fragment(run_every: Optional[float] = AUTO_REFRESH_SECONDS) -> Callable:
+    """Decorador que transforma uma seção em fragmento reexecutado a cada `run_every` segundos
+    
+    Só o fragmento roda de novo no timer (sem recarregar a página nem o
+    script inteiro). Usa st.fragment quando disponível e
+    st.experimental_fragment nas versões anteriores. Cada execução tem o
+    próprio orçamento de tempo (request_deadline); dentro da execução da
+    página vale o que restar do orçamento dela.
+    """
+    fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            with request_deadline():
+                return fn(*args, **kwargs)
+        return fragment(run_every=run_every or None)(run)
+
+    return decorator
+
+
+def frame_fingerprint(df: Optional[pd.DataFrame]) -> str:
+    """Resumo do conteúdo de um DataFrame pequeno (ex.: agregados de um gráfico)"""
+    if df is None:
+        return ""
+    digest = hashlib.sha1(",".join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def reuse_if_unchanged(key: str, fingerprint: str, build: Callable[[], Any]) -> Any:
+    """Devolve o objeto guardado na sessão sob `key` se `fingerprint` não mudou; senão o reconstrói
+    
+    Evita refazer figuras quando os agregados são os mesmos da execução
+    anterior; a figura idêntica também sai do cache de mensagens do
+    Streamlit em vez de ser reenviada ao navegador.
+    """
+    cached = st.session_state.get(key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    value = build()
+    st.session_state[key] = (fingerprint, value)
+    return value
+
+
 def format_date_range(start_date, end_date):
     """Formata intervalo de datas para exibição"""
     return f"{start_date.strftime('%d/%m/%Y')} - {end_date.strftime('%d/%m/%Y')}"
@@ -0,0 +1,98 @@
+"""
+Logging e instrumentação do backend (níveis, formatação preguiçosa e amostragem)
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+# Nível dos logs do backend (configurável via ambiente; em produção só avisos e erros)
+LOG_LEVEL = os.getenv("RD_LOG_LEVEL", "WARNING").upper()
+
+# Máximo de mensagens repetitivas (ex.: uma por deal) registradas por chamada
+LOG_SAMPLE_LIMIT = int(os.getenv("RD_LOG_SAMPLE_LIMIT", "5"))
+
+# Parâmetros de requisição que nunca devem aparecer nos logs
+SECRET_PARAMS = {"token", "access_token", "authorization"}
+
+ROOT_LOGGER = "dashboard_crm"
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+def _configure_root() -> logging.Logger:
+    root = logging.getLogger(ROOT_LOGGER)
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(getattr(logging, LOG_LEVEL, logging.WARNING))
+        root.propagate = False
+    return root
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger de um módulo do backend (ex.: get_logger(__name__))"""
+    _configure_root()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def redact_params(params: Optional[Dict]) -> Dict:
+    """Cópia dos parâmetros com credenciais mascaradas, para registro"""
+    return {key: "***" if str(key).lower() in SECRET_PARAMS else value for key, value in (params or {}).items()}
+
+
+class Lazy:
+    """Adia o cálculo de um argumento de log até a mensagem ser de fato formatada"""
+
+    __slots__ = ("fn",)
+
+    def __init__(self, fn: Callable[[], Any]):
+        self.fn = fn
+
+    def __str__(self) -> str:
+        return str(self.fn())
+
+
+class LogSampler:
+    """Limita as mensagens de um laço a `limit` por chamada
+
+    Crie um por chamada do método; `debug` custa só uma comparação quando o
+    nível DEBUG está desligado. `summary` registra quantas foram suprimidas.
+    """
+
+    __slots__ = ("logger", "limit", "enabled", "count")
+
+    def __init__(self, logger: logging.Logger, limit: int = LOG_SAMPLE_LIMIT):
+        self.logger = logger
+        self.limit = limit
+        self.enabled = logger.isEnabledFor(logging.DEBUG)
+        self.count = 0
+
+    def debug(self, msg: str, *args: Any):
+        if not self.enabled:
+            return
+        self.count += 1
+        if self.count <= self.limit:
+            self.logger.debug(msg, *args, stacklevel=2)
+
+    def summary(self, label: str = "mensagens"):
+        """Registra quantas mensagens do laço foram omitidas pela amostragem"""
+        if self.enabled and self.count > self.limit:
+            self.logger.debug("... %d %s omitidas (amostragem de %d)", self.count - self.limit, label, self.limit,
+                              stacklevel=2)
+
+
+@contextmanager
+def log_timing(logger: logging.Logger, label: str, level: int = logging.DEBUG) -> Iterator[None]:
+    """Registra a duração de um bloco (sem custo se o nível estiver desligado)"""
+    if not logger.isEnabledFor(level):
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        logger.log(level, "%s levou %.3fs", label, time.perf_counter() - started, stacklevel=3)
@@ -4,6 +4,8 @@ Componentes de filtros para o frontend
 import streamlit as st
 from datetime import date, timedelta
 
+from backend.models.data_models import DEFAULT_WINDOW_DAYS
+
 
 class FilterComponents:
     """Componentes para filtros da interface"""
@@ -12,7 +14,7 @@ class FilterComponents:
     def render_date_filters():
         """Define período padrão (sem campos na UI)"""
         today = date.today()
-        start_default = today - timedelta(days=30)
+        start_default = today - timedelta(days=DEFAULT_WINDOW_DAYS)
         
         # Não renderiza inputs; apenas retorna o período padrão
         start_date = start_default
@@ -32,12 +34,17 @@ class FilterComponents:
         return selected_team
     
     @staticmethod
-    def render_refresh_button():
-        """Renderiza botão de atualização"""
+    def render_refresh_button(client, start_date, end_date):
+        """Renderiza botão de atualização (recarrega só os deals do HOUSE do período)"""
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
             if st.button("🔄 Atualizar Dados", help="Força uma atualização imediata dos dados"):
-                st.cache_data.clear()
+                # Etapas, usuários e equipes continuam em cache; os DataFrames processados
+                # mudam de chave sozinhos quando os deals mudam
+                with st.spinner("Atualizando deals..."):
+                    client.refresh_dataset(
+                        "fetch_house_funnel_data", start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+                    )
                 st.rerun()
     
     @staticmethod
@@ -4,15 +4,26 @@ Página principal do dashboard
 import streamlit as st
 import pandas as pd
 from datetime import date
-import requests
+from typing import Optional
 
 from backend.api.rd_station_client import RDStationClient
+from backend.api.prefetch import start_prefetch
+from backend.api.http_session import get_shared_session
 from backend.api.data_processor import DataProcessor
-from backend.utils.helpers import show_last_update, format_file_name
+from backend.api.deadline import expired as deadline_expired
+from backend.utils.helpers import (
+    auto_refresh_fragment, frame_fingerprint, reuse_if_unchanged, show_data_age, show_last_update, format_file_name
+)
 from frontend.components.charts import ChartComponents
 from frontend.components.filters import FilterComponents, render_debug_section, render_stage_details_section
 
 
+@st.cache_resource
+def get_rd_station_client(base_url: str, token: str) -> RDStationClient:
+    """Cliente compartilhado entre reruns e sessões (reaproveita as conexões do pool)"""
+    return RDStationClient(base_url, token)
+
+
 def render_dashboard_page():
     """Renderiza a página principal do dashboard"""
     st.title("🏠 Dashboard Funil - HOUSE")
@@ -27,21 +38,21 @@ def render_dashboard_page():
     # Status da conexão
     FilterComponents.render_connection_status(base_url, token, start_date, end_date)
     
+    # Inicializar clientes
+    client = get_rd_station_client(base_url, token)
+    processor = DataProcessor()
+    
     # Botão de atualização
-    FilterComponents.render_refresh_button()
+    FilterComponents.render_refresh_button(client, start_date, end_date)
     
     # (Removido) Botão de debug de funil
     
     # Tabs (apenas Comparativo por Usuário)
     tab = st.tabs(["👥 Comparativo por Usuário"])
     
-    # Inicializar clientes
-    client = RDStationClient(base_url, token)
-    processor = DataProcessor()
-    
     # Aba única: Comparativo por Usuário
     with tab[0]:
-        render_comparative_tab(client, processor, start_date, end_date)
+        render_comparative_tab(client, processor)
 
 
 def render_funnel_debug_section(base_url: str, token: str):
@@ -61,7 +72,8 @@ def render_funnel_debug_section(base_url: str, token: str):
             st.info(f"🌐 **URL da API:** `{url}`")
             st.info(f"🔑 **Token:** `{token[:10]}...`")
             
-            response = requests.get(url, headers={"accept": "application/json"}, params=params, timeout=30)
+            session = get_shared_session()
+            response = session.get(url, params=params, timeout=30)
             
             if response.status_code == 200:
                 data = response.json()
@@ -80,7 +92,7 @@ def render_funnel_debug_section(base_url: str, token: str):
                     "limit": 10
                 }
                 
-                house_response = requests.get(house_url, headers={"accept": "application/json"}, params=house_params, timeout=30)
+                house_response = session.get(house_url, params=house_params, timeout=30)
                 
                 if house_response.status_code == 200:
                     house_data = house_response.json()
@@ -118,6 +130,10 @@ def render_stages_tab(client: RDStationClient, processor: DataProcessor, base_ur
         if test_button:
             test_connectivity(client, base_url, token)
         
+        # Diagnóstico de todos os endpoints do HOUSE (em paralelo, com prazo total)
+        if st.button("🩺 Testar Endpoints do HOUSE", key="probe_house_endpoints"):
+            render_endpoint_probes(client)
+        
         # Buscar etapas do Funil - HOUSE
         if st.button("🎯 Buscar Etapas do Funil - HOUSE", key="fetch_house_stages"):
             fetch_and_display_stages(client, processor, base_url, token)
@@ -125,39 +141,57 @@ def render_stages_tab(client: RDStationClient, processor: DataProcessor, base_ur
         st.info("ℹ️ Configure a URL base e o token na sidebar para consultar os estágios do Funil - HOUSE")
 
 
-def render_comparative_tab(client: RDStationClient, processor: DataProcessor, start_date, end_date):
+def render_comparative_tab(client: RDStationClient, processor: DataProcessor):
     """Renderiza aba de comparativo por usuário"""
     if client.token and client.base_url:
-        show_last_update()
+        render_comparative_section(client, processor)
+    else:
+        st.info("ℹ️ Configure a URL base e o token na sidebar para ver o comparativo por usuário.")
+
+
+@auto_refresh_fragment()
+def render_comparative_section(client: RDStationClient, processor: DataProcessor):
+    """Seção de dados do comparativo (reexecutada sozinha a cada AUTO_REFRESH_SECONDS)"""
+    # Período recalculado a cada execução do fragmento (não o da última execução da página)
+    start_date, end_date = FilterComponents.render_date_filters()
+    start_date_str = start_date.strftime("%Y-%m-%d")
+    end_date_str = end_date.strftime("%Y-%m-%d")
+    
+    # Mantém os dados do dashboard aquecidos em segundo plano enquanto a seção estiver sendo vista
+    start_prefetch(client)
+    
+    # Buscar dados comparativos - APENAS do Funil HOUSE (com cache aquecido, responde na hora)
+    comparative_data = client.fetch_house_funnel_data(start_date_str, end_date_str)
+    
+    show_data_age(
+        client.get_data_age("fetch_house_funnel_data", start_date_str, end_date_str),
+        client.unavailable_since("fetch_house_funnel_data")
+    )
+    if deadline_expired():
+        st.caption("⏱️ Tempo limite da página atingido: exibindo os dados em cache enquanto a atualização termina")
+    
+    st.header("👥 Comparativo por Usuário - Funil HOUSE")
+    st.caption("Análise comparativa de negócios entre usuários do Funil - HOUSE")
+    
+    if comparative_data is not None:
         
-        st.header("👥 Comparativo por Usuário - Funil HOUSE")
-        st.caption("Análise comparativa de negócios entre usuários do Funil - HOUSE")
+        # (Removidos) botões de ações
         
-        # Converter datas para string
-        start_date_str = start_date.strftime("%Y-%m-%d")
-        end_date_str = end_date.strftime("%Y-%m-%d")
+        # (Removidos) usuários disponíveis
         
-        # Buscar dados comparativos - APENAS do Funil HOUSE
-        comparative_data = client.fetch_house_funnel_data(start_date_str, end_date_str)
+        # Processar dados para o gráfico comparativo (só quando a versão dos dados muda)
+        fingerprint = comparative_data.fingerprint()
+        comparative_df = reuse_if_unchanged(
+            "comparative_df", fingerprint, lambda: processor.process_comparative_funnel_data(comparative_data)
+        )
         
-        if comparative_data:
-            
-            # (Removidos) botões de ações
-            
-            # (Removidos) usuários disponíveis
-            
-            # Processar dados para o gráfico comparativo
-            comparative_df = processor.process_comparative_funnel_data(comparative_data)
-            
-            if comparative_df is not None and not comparative_df.empty:
-                render_comparative_charts(comparative_df, start_date, end_date)
-                # (Removida) seção de análise por equipes
-            else:
-                st.warning("⚠️ Não foi possível processar os dados para o gráfico comparativo.")
+        if comparative_df is not None and not comparative_df.empty:
+            render_comparative_charts(comparative_df, start_date, end_date, fingerprint)
+            # (Removida) seção de análise por equipes
         else:
-            st.error("❌ Falha ao conectar com o CRM para buscar dados comparativos.")
+            st.warning("⚠️ Não foi possível processar os dados para o gráfico comparativo.")
     else:
-        st.info("ℹ️ Configure a URL base e o token na sidebar para ver o comparativo por usuário.")
+        st.error("❌ Falha ao conectar com o CRM para buscar dados comparativos.")
 
 
 def test_connectivity(client: RDStationClient, base_url: str, token: str):
@@ -180,6 +214,32 @@ def test_connectivity(client: RDStationClient, base_url: str, token: str):
         st.error(f"❌ Erro na conexão: {str(e)}")
 
 
+def render_endpoint_probes(client: RDStationClient):
+    """Mostra os testes dos endpoints do HOUSE à medida que cada um termina"""
+    status = st.empty()
+    table = st.empty()
+    rows = []
+    
+    status.info("🔄 Testando endpoints...")
+    for result in client.probe_house_endpoints():
+        rows.append({
+            "Teste": result.name,
+            "Status": "✅" if result.success else "❌",
+            "Código": result.status_code,
+            "Latência (ms)": round(result.latency_ms) if result.latency_ms is not None else None,
+            "Tamanho (KB)": round(result.size_bytes / 1024, 1),
+            "Registros": result.records,
+            "Erro": result.error or "",
+        })
+        table.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    
+    succeeded = sum(1 for row in rows if row["Status"] == "✅")
+    if succeeded == len(rows):
+        status.success(f"✅ {succeeded} de {len(rows)} endpoints responderam")
+    else:
+        status.warning(f"⚠️ {succeeded} de {len(rows)} endpoints responderam")
+
+
 def fetch_and_display_stages(client: RDStationClient, processor: DataProcessor, base_url: str, token: str):
     """Busca e exibe etapas do funil HOUSE"""
     with st.spinner("🔄 Consultando etapas do Funil - HOUSE..."):
@@ -312,10 +372,9 @@ def show_all_stages_debug(client: RDStationClient, house_stages_data):
     try:
         # Buscar todas as etapas para debug
         all_stages_url = f"{client.base_url}/api/v1/deal_stages"
-        all_stages_headers = {"accept": "application/json"}
         all_stages_params = {"token": client.token}
         
-        all_stages_response = requests.get(all_stages_url, headers=all_stages_headers, params=all_stages_params, timeout=30)
+        all_stages_response = client.session.get(all_stages_url, params=all_stages_params, timeout=30)
         
         if all_stages_response.status_code == 200:
             all_stages_data = all_stages_response.json()
@@ -363,13 +422,16 @@ def analyze_data_structure(house_stages_data):
                 st.write(f"- **{key}**: {value}")
 
 
-def render_comparative_charts(comparative_df: pd.DataFrame, start_date, end_date):
+def render_comparative_charts(comparative_df: pd.DataFrame, start_date, end_date, fingerprint: Optional[str] = None):
     """Renderiza gráficos comparativos"""
     # Criar gráfico de barras empilhadas
     st.subheader("📊 Comparativo de Negócios por Usuário")
     
-    # Gráfico principal
-    fig = ChartComponents.create_comparative_bar_chart(comparative_df, "group")
+    # Gráfico principal (reaproveitado enquanto a versão dos dados não muda)
+    fig = reuse_if_unchanged(
+        "comparative_chart", fingerprint or frame_fingerprint(comparative_df),
+        lambda: ChartComponents.create_comparative_bar_chart(comparative_df, "group")
+    )
     st.plotly_chart(fig, use_container_width=True)
     
     # (Removido) seletor de tipo de visualização e gráfico empilhado
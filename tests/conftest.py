@@ -0,0 +1,21 @@
+"""
+Configuração dos testes: raiz do repositório no sys.path (para importar `backend`)
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.storage import deal_store, snapshots  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_data_dir(tmp_path, monkeypatch):
+    """Banco local e snapshots de cada teste em um diretório temporário (nunca no .data do repositório)"""
+    data_dir = str(tmp_path / "data")
+    monkeypatch.setattr(deal_store, "DATA_DIR", data_dir)
+    monkeypatch.setattr(snapshots, "DATA_DIR", data_dir)
+    monkeypatch.setattr(snapshots, "_snapshot_store", None)
+    return data_dir
@@ -0,0 +1,39 @@
+"""
+Testes da negociação do esquema de autenticação por família de endpoints
+"""
+import io
+
+import requests
+
+from backend.api.rate_limiter import TokenBucket
+from backend.api.rd_station_client import RDStationClient
+
+
+class SchemeSession:
+    """Sessão que recusa o token na query (401) e responde `bearer_status` ao header Authorization"""
+
+    def __init__(self, bearer_status: int):
+        self.bearer_status = bearer_status
+
+    def get(self, url, headers=None, params=None, timeout=None, stream=False):
+        response = requests.Response()
+        bearer = (headers or {}).get("Authorization", "").startswith("Bearer")
+        response.status_code = self.bearer_status if bearer else 401
+        if response.status_code == 429:
+            response.headers["Retry-After"] = "0"
+        response.raw = io.BytesIO(b'{"users": []}')
+        return response
+
+
+def test_scheme_is_remembered_only_after_a_successful_response():
+    session = SchemeSession(bearer_status=429)
+    client = RDStationClient("http://crm-auth.test", "token", session=session,
+                             rate_limiter=TokenBucket(1000, 1000))
+    url = "http://crm-auth.test/api/v1/users"
+
+    assert client._send(url, {}, client.headers, 5).status_code == 429
+    assert "users" not in client.auth.known(client.base_url)
+
+    session.bearer_status = 200
+    assert client._send(url, {}, client.headers, 5).status_code == 200
+    assert client.auth.known(client.base_url)["users"] == "bearer"
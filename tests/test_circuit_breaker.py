@@ -0,0 +1,63 @@
+"""
+Testes do circuit breaker por família de endpoints no envio das requisições
+"""
+import io
+
+import pytest
+import requests
+
+from backend.api.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from backend.api.deadline import DeadlineExceeded, request_deadline
+from backend.api.rate_limiter import TokenBucket
+from backend.api.rd_station_client import RDStationClient
+
+
+class OkSession:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, headers=None, params=None, timeout=None, stream=False):
+        self.calls += 1
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(b'{"users": []}')
+        return response
+
+
+def open_breaker(base_url: str, family: str):
+    breaker = get_circuit_breaker(base_url, family)
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    return breaker
+
+
+def test_open_circuit_fails_without_spending_a_token():
+    limiter = TokenBucket(0.001, 1)
+    session = OkSession()
+    client = RDStationClient("http://crm-open.test", "token", session=session, rate_limiter=limiter)
+    open_breaker(client.base_url, "users")
+
+    # Com prazo, uma regressão (esperar pelo token antes do circuito) falha em vez de travar
+    with request_deadline(1):
+        for _ in range(3):
+            with pytest.raises(CircuitOpenError):
+                client._send(f"{client.base_url}/api/v1/users", {}, client.headers, 5)
+
+    # O único token continua livre para os endpoints saudáveis
+    assert session.calls == 0
+    assert limiter.acquire(timeout=0)
+
+
+def test_half_open_trial_is_released_when_no_token_arrives_in_time():
+    limiter = TokenBucket(0.001, 1)
+    assert limiter.acquire(timeout=0)
+    client = RDStationClient("http://crm-halfopen.test", "token", session=OkSession(), rate_limiter=limiter)
+    breaker = open_breaker(client.base_url, "users")
+    breaker._retry_at = 0.0
+
+    with request_deadline(0.1), pytest.raises(DeadlineExceeded):
+        client._send(f"{client.base_url}/api/v1/users", {}, client.headers, 5)
+
+    # A tentativa não foi enviada: a próxima chamada pode fazer o teste
+    assert breaker.state == breaker.OPEN
+    assert breaker.allow()
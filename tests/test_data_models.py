@@ -0,0 +1,20 @@
+"""
+Testes do lote colunar de deals (DealBatch)
+"""
+from datetime import datetime
+
+from backend.models.data_models import DealBatch
+
+
+def test_api_deals_keep_the_instant_in_utc():
+    batch = DealBatch.from_payload({"deals": [
+        {"id": "d1", "created_at": "2025-08-12T10:00:00.000-03:00", "updated_at": "1970-01-01T00:00:00+00:00"},
+        {"id": "d2", "created_at": None, "updated_at": "data inválida"},
+    ]})
+
+    first, second = batch.to_api_deals()
+    assert first["created_at"] == "2025-08-12T13:00:00+00:00"
+    assert datetime.fromisoformat(first["created_at"]) == datetime.fromisoformat("2025-08-12T10:00:00-03:00")
+    # Zero é a própria época, não "sem data"
+    assert first["updated_at"] == "1970-01-01T00:00:00+00:00"
+    assert second["created_at"] is None and second["updated_at"] is None
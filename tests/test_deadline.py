@@ -0,0 +1,65 @@
+"""
+Testes do prazo da execução nas chamadas que aguardam outras (requisições compartilhadas e diagnóstico)
+"""
+import io
+import json
+import threading
+import time
+
+import requests
+
+from backend.api.deadline import request_deadline
+from backend.api.rate_limiter import TokenBucket
+from backend.api.rd_station_client import RDStationClient
+
+
+class BlockingSession:
+    """Sessão cujas respostas só saem depois de `release` (simula uma paginação lenta já em andamento)"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def get(self, url, headers=None, params=None, timeout=None, stream=False):
+        self.started.set()
+        self.release.wait(5)
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(json.dumps({"deals": [{"id": "d1"}], "has_more": False}).encode())
+        return response
+
+
+def test_joining_a_pagination_in_flight_respects_the_callers_deadline():
+    session = BlockingSession()
+    client = RDStationClient("http://crm-joined.test", "token", session=session,
+                             rate_limiter=TokenBucket(1000, 1000))
+    params = {"limit": 100}
+    # Paginação sem prazo (como a do pré-carregamento), presa na primeira página
+    background = threading.Thread(target=client._fetch_deals_paginated, args=(params,))
+    background.start()
+    try:
+        assert session.started.wait(5)
+        started = time.monotonic()
+        with request_deadline(0.2):
+            client._fetch_deals_paginated(params)
+        assert time.monotonic() - started < 1
+    finally:
+        session.release.set()
+        background.join(5)
+
+
+def test_probe_waits_for_the_rate_limiter_only_until_the_deadline():
+    # Um token por segundo: com o prazo de 0.2s nenhum teste consegue o seu
+    limiter = TokenBucket(1.0, 1)
+    assert limiter.acquire(timeout=0)
+    client = RDStationClient("http://crm-probe.test", "token", session=BlockingSession(), rate_limiter=limiter)
+
+    started = time.monotonic()
+    results = list(client.probe_house_endpoints(deadline=0.2))
+    elapsed = time.monotonic() - started
+
+    assert results and all(not result.success for result in results)
+    # Os testes desistem do token sozinhos, sem ocupar os workers depois do prazo
+    time.sleep(0.2)
+    assert limiter._waiting == 0
+    assert elapsed < 1
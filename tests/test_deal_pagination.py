@@ -0,0 +1,68 @@
+"""
+Testes da paginação concorrente de deals (resultado completo ou nenhum)
+"""
+import io
+import json
+
+import requests
+
+from backend.api.rate_limiter import TokenBucket
+from backend.api.rd_station_client import RDStationClient
+from backend.storage.deal_store import DealStore
+
+
+class FakePagedSession:
+    """Sessão que serve /api/v1/deals em páginas e responde 503 nas páginas de `failing`"""
+
+    def __init__(self, total: int, page_size: int, failing=(), with_total: bool = True):
+        self.deals = [{"id": f"d{i}", "name": f"Deal {i}"} for i in range(total)]
+        self.page_size = page_size
+        self.failing = set(failing)
+        self.with_total = with_total
+
+    def get(self, url, headers=None, params=None, timeout=None, stream=False):
+        page = int(params.get("page", 1))
+        response = requests.Response()
+        if page in self.failing:
+            response.status_code = 503
+            response.headers["Retry-After"] = "0"
+            response.raw = io.BytesIO(b"{}")
+            return response
+        chunk = self.deals[(page - 1) * self.page_size:page * self.page_size]
+        body = {"deals": chunk, "has_more": page * self.page_size < len(self.deals)}
+        if self.with_total:
+            body["total"] = len(self.deals)
+        response.status_code = 200
+        response.raw = io.BytesIO(json.dumps(body).encode())
+        return response
+
+
+def make_client(session: FakePagedSession, store: DealStore) -> RDStationClient:
+    # Base própria: as 503 abrem o circuito de deals só deste endereço
+    return RDStationClient(f"http://crm-{id(session)}.test", "token", session=session,
+                           rate_limiter=TokenBucket(1000, 1000), deal_store=store)
+
+
+def test_all_pages_are_merged(tmp_path):
+    store = DealStore(str(tmp_path / "crm.sqlite3"))
+    data = make_client(FakePagedSession(total=25, page_size=10), store)._fetch_deals_paginated({"limit": 10})
+
+    assert [deal["id"] for deal in data["deals"]] == [f"d{i}" for i in range(25)]
+    assert data["has_more"] is False
+    assert len(store.get_deals()) == 25
+
+
+def test_failed_page_discards_the_whole_pagination(tmp_path):
+    store = DealStore(str(tmp_path / "crm.sqlite3"))
+    session = FakePagedSession(total=25, page_size=10, failing={2})
+
+    assert make_client(session, store)._fetch_deals_paginated({"limit": 10}) is None
+    assert store.get_deals() == []
+
+
+def test_failed_page_without_total_discards_the_whole_pagination(tmp_path):
+    store = DealStore(str(tmp_path / "crm.sqlite3"))
+    session = FakePagedSession(total=25, page_size=10, failing={3}, with_total=False)
+
+    assert make_client(session, store)._fetch_deals_paginated({"limit": 10}) is None
+    assert store.get_deals() == []
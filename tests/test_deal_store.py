@@ -0,0 +1,95 @@
+"""
+Testes do banco local de deals e das análises servidas por ele
+"""
+import io
+import json
+
+import requests
+
+from backend.api.rate_limiter import TokenBucket
+from backend.api.rd_station_client import RDStationClient
+from backend.storage.deal_store import DealStore
+
+
+HOUSE_ID = "689b59706e704a0024fc2374"
+
+
+def make_deal(deal_id: str, user: str, pipeline_id: str, pipeline_name: str, minute: int) -> dict:
+    return {
+        "id": deal_id, "name": f"Deal {deal_id}", "status": "ongoing", "rating": 1,
+        "user": {"id": user.lower(), "name": user},
+        "deal_stage": {"id": "s1", "name": "LEADs"},
+        "deal_pipeline": {"id": pipeline_id, "name": pipeline_name},
+        "created_at": "2026-10-01T10:00:00+00:00",
+        "updated_at": f"2026-10-01T10:{minute:02d}:00+00:00",
+    }
+
+
+DEALS = [
+    make_deal("d1", "Paola Chagas", HOUSE_ID, "HOUSE", 50),
+    make_deal("d2", "Paola Chagas", "other", "OUTRO", 40),
+    make_deal("d3", "Maria Eduarda", HOUSE_ID, "HOUSE", 30),
+    make_deal("d4", "Ana", "other", "OUTRO", 20),
+]
+
+
+class FakeCRMSession:
+    """Sessão com /api/v1/deals (ordenado por updated_at decrescente) e /api/v1/teams; conta os GETs de deals"""
+
+    def __init__(self):
+        self.deal_requests = 0
+
+    def get(self, url, headers=None, params=None, timeout=None, stream=False):
+        if url.endswith("/deals"):
+            self.deal_requests += 1
+            body = {"deals": DEALS, "total": len(DEALS), "has_more": False}
+        else:
+            body = {"teams": [{"id": "t1", "name": "Equipe HOUSE", "team_users": [{"name": "Paola Chagas"}]}]}
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(json.dumps(body).encode())
+        return response
+
+
+def test_indexed_queries(tmp_path):
+    store = DealStore(str(tmp_path / "crm.sqlite3"))
+    store.upsert_deals(DEALS)
+
+    assert store.count_deals() == 4
+    assert store.count_deals(HOUSE_ID) == 2
+    assert store.get_deal_user_names(HOUSE_ID) == ["Maria Eduarda", "Paola Chagas"]
+    assert store.find_deal_user_names("PAOLA") == ["Paola Chagas"]
+    assert [deal["status"] for deal in store.get_deals(user_name="Paola Chagas")] == ["ongoing", "ongoing"]
+
+
+def test_unchanged_deals_are_not_rewritten(tmp_path):
+    store = DealStore(str(tmp_path / "crm.sqlite3"))
+    assert store.upsert_deals(DEALS) == 4
+    assert store.upsert_deals(DEALS) == 0
+    assert store.upsert_deals([dict(DEALS[0], status="won")]) == 1
+
+
+def test_paola_investigation_is_served_from_the_store(tmp_path):
+    session = FakeCRMSession()
+    client = RDStationClient("http://crm-store.test", "token", session=session,
+                             rate_limiter=TokenBucket(1000, 1000), deal_store=DealStore(str(tmp_path / "crm.sqlite3")))
+
+    results = client.investigate_paola_chagas_data()
+
+    assert sorted(deal["id"] for deal in results["paola_all_deals"]) == ["d1", "d2"]
+    assert [deal["id"] for deal in results["paola_house_deals"]] == ["d1"]
+    assert results["comparison"]["other_pipelines"] == ["OUTRO"]
+    assert results["paola_team_info"]["team_name"] == "Equipe HOUSE"
+    # Uma busca completa de todos os deals e, na outra consulta, só a página de alterações
+    assert session.deal_requests <= 2
+
+
+def test_house_users_are_served_from_the_store(tmp_path):
+    session = FakeCRMSession()
+    client = RDStationClient("http://crm-users.test", "token", session=session,
+                             rate_limiter=TokenBucket(1000, 1000), deal_store=DealStore(str(tmp_path / "crm.sqlite3")))
+
+    results = client.fetch_house_users_comprehensive()
+
+    assert results["house_users_via_deals"] == ["Maria Eduarda", "Paola Chagas"]
+    assert results["total_deals"] == 2
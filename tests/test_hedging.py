@@ -0,0 +1,59 @@
+"""
+Testes das requisições de reserva (hedging) e das latências usadas como gatilho
+"""
+import itertools
+import threading
+import time
+
+from backend.api.hedging import HedgeBudget, LatencyTracker, MIN_LATENCY_SAMPLES, hedged
+
+
+HEDGE_DELAY = 0.05
+SLOW_PRIMARY = 5.0
+
+
+def test_hedged_latency_counts_from_the_original_request():
+    """Quando a reserva vence, a amostra inclui a espera pela original (o p95 não cai para perto de zero)"""
+    tracker = LatencyTracker()
+    budget = HedgeBudget(ratio=1.0)
+    release = threading.Event()
+    calls = itertools.count()
+
+    def send():
+        # Chamadas pares são originais presas; ímpares são reservas que respondem na hora
+        if next(calls) % 2 == 0:
+            release.wait(SLOW_PRIMARY)
+            return "primary"
+        return "hedge"
+
+    try:
+        for _ in range(MIN_LATENCY_SAMPLES):
+            budget.record_request()
+            assert hedged(send, HEDGE_DELAY, budget, lambda: True, tracker) == "hedge"
+    finally:
+        release.set()
+
+    assert budget.stats()["wins"] == MIN_LATENCY_SAMPLES
+    p95 = tracker.percentile()
+    assert p95 is not None
+    assert HEDGE_DELAY <= p95 < SLOW_PRIMARY
+
+
+def test_hedged_records_one_sample_per_call():
+    """A requisição perdedora não gera amostra própria"""
+    tracker = LatencyTracker()
+    budget = HedgeBudget(ratio=1.0)
+    budget.record_request()
+
+    def send():
+        time.sleep(HEDGE_DELAY * 2)
+        return "ok"
+
+    started = time.monotonic()
+    assert hedged(send, HEDGE_DELAY, budget, lambda: True, tracker) == "ok"
+    elapsed = time.monotonic() - started
+    time.sleep(HEDGE_DELAY * 3)
+
+    assert budget.stats()["hedges"] == 1
+    assert len(tracker._samples) == 1
+    assert HEDGE_DELAY * 2 <= tracker._samples[0] <= elapsed
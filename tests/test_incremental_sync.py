@@ -0,0 +1,109 @@
+"""
+Testes da busca incremental de deals (tráfego proporcional às alterações)
+"""
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import requests
+
+from backend.api.rate_limiter import TokenBucket
+from backend.api.rd_station_client import RDStationClient
+
+
+BASE = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+class FakeDealsSession:
+    """Sessão que serve /api/v1/deals ordenado por updated_at decrescente e registra as páginas pedidas"""
+
+    def __init__(self, total: int, changed: int):
+        # Os `changed` primeiros deals foram alterados depois da marca d'água (BASE)
+        self.deals = [
+            {"id": f"d{i}", "name": f"Deal {i}", "created_at": (BASE - timedelta(days=1)).isoformat(),
+             "updated_at": (BASE + timedelta(minutes=changed - i) if i < changed
+                            else BASE - timedelta(minutes=i)).isoformat()}
+            for i in range(total)
+        ]
+        self.requests = []
+        # Status das próximas respostas (ex.: 429/503 para simular uma falha passageira da API)
+        self.status = 200
+
+    def get(self, url, headers=None, params=None, timeout=None, stream=False):
+        limit, page = int(params["limit"]), int(params.get("page", 1))
+        self.requests.append((limit, page))
+        response = requests.Response()
+        response.status_code = self.status
+        if self.status != 200:
+            response.headers["Retry-After"] = "0"
+            response.raw = io.BytesIO(b"{}")
+            return response
+        chunk = self.deals[(page - 1) * limit:page * limit]
+        body = {"deals": chunk, "total": len(self.deals), "has_more": page * limit < len(self.deals)}
+        response.raw = io.BytesIO(json.dumps(body).encode())
+        return response
+
+    @property
+    def rows_requested(self) -> int:
+        return sum(limit for limit, _ in self.requests)
+
+
+def make_client(session: FakeDealsSession, base_url: str = "http://crm.test") -> RDStationClient:
+    return RDStationClient(base_url, f"token-{id(session)}", session=session,
+                           rate_limiter=TokenBucket(1000, 1000), deal_store=None)
+
+
+def test_few_changes_fetch_a_small_page():
+    session = FakeDealsSession(total=500, changed=3)
+    changed = make_client(session)._fetch_deals_changed_since({"limit": 1000}, BASE)
+
+    assert [deal["id"] for deal in changed] == ["d0", "d1", "d2"]
+    assert session.requests == [(10, 1)]
+
+
+def test_page_grows_while_every_deal_is_new():
+    session = FakeDealsSession(total=500, changed=50)
+    changed = make_client(session)._fetch_deals_changed_since({"limit": 1000}, BASE)
+
+    assert [deal["id"] for deal in changed] == [f"d{i}" for i in range(50)]
+    # 10 + 10 + 20 + 40: cada página começa onde a anterior terminou
+    assert session.requests == [(10, 1), (10, 2), (20, 2), (40, 2)]
+    assert session.rows_requested == 80
+
+
+def test_page_size_stops_growing_at_the_api_maximum():
+    session = FakeDealsSession(total=1000, changed=700)
+    changed = make_client(session)._fetch_deals_changed_since({"limit": 1000}, BASE)
+
+    assert len(changed) == 700
+    assert max(limit for limit, _ in session.requests) == 160
+    assert session.rows_requested < 700 + 160
+
+
+def test_failed_page_raises_instead_of_returning_none():
+    session = FakeDealsSession(total=50, changed=5)
+    session.status = 429
+    client = make_client(session, "http://crm-failing.test")
+
+    with pytest.raises(requests.HTTPError):
+        client._fetch_deals_changed_since({"limit": 1000}, BASE)
+
+
+def test_transient_error_keeps_incremental_sync_by_day():
+    session = FakeDealsSession(total=50, changed=5)
+    client = make_client(session, "http://crm-transient.test")
+    params = {"start_date": "2026-09-25", "end_date": "2026-10-01", "limit": 1000}
+    assert len(client._sync_deals_by_day(params)) == 50
+
+    # 429 esgota as novas tentativas sem abrir o circuito
+    session.status = 429
+    client._sync_deals_by_day(params)
+    (state,) = client._sync_states.values()
+    assert state.incremental_supported
+
+    # De volta ao normal, a sincronização seguinte é incremental (uma página pequena)
+    session.status = 200
+    session.requests.clear()
+    assert len(client._sync_deals_by_day(params)) == 50
+    assert session.requests == [(10, 1)]
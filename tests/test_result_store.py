@@ -0,0 +1,59 @@
+"""
+Testes do armazenamento compartilhado de resultados (uma cópia dos dados por processo)
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.api.result_store import ResultStore, freeze, share
+
+
+def make_frame() -> pd.DataFrame:
+    return pd.DataFrame({"Usuário": ["Ana", "Bia"], "Etapa": ["LEADs", "MENSAGEM"], "Quantidade": [3, 5]})
+
+
+def test_callers_share_the_same_buffers():
+    store = ResultStore()
+    first = store.get_or_compute(("comparative",), make_frame)
+    second = store.get_or_compute(("comparative",), make_frame)
+
+    assert first is not second
+    for column in first.columns:
+        assert np.shares_memory(first[column].to_numpy(), second[column].to_numpy())
+    assert store.stats()["hits"] == 1
+
+
+def test_shared_frame_rejects_writes_in_place():
+    store = ResultStore()
+    first = store.get_or_compute(("comparative",), make_frame)
+    second = store.get_or_compute(("comparative",), make_frame)
+
+    with pytest.raises(ValueError):
+        first.loc[0, "Quantidade"] = 99
+    # Trocar a coluna inteira só muda o objeto de quem trocou
+    first["Quantidade"] = [0, 0]
+    assert second["Quantidade"].tolist() == [3, 5]
+
+
+def test_none_is_not_stored():
+    store = ResultStore()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return None
+
+    assert store.get_or_compute(("missing",), compute) is None
+    assert store.get_or_compute(("missing",), compute) is None
+    assert len(calls) == 2
+
+
+def test_frozen_payload_is_shared_and_read_only():
+    payload = freeze({"deals": [{"id": "d1", "user": {"name": "Ana"}}], "total": 1})
+
+    assert share(payload) is payload
+    assert payload["deals"][0]["user"]["name"] == "Ana"
+    with pytest.raises(TypeError):
+        payload["deals"][0]["user"]["name"] = "Bia"
+    with pytest.raises(TypeError):
+        payload["total"] = 2